@@ -0,0 +1,384 @@
+"""End-to-end benchmark of the discovery pipeline against fixture replies.
+
+Runs discovery_graph on the sample upload scaled to each row count. Groq,
+Serper and product pages are served by the in-process stand-ins in
+yards.utils.fakes, which replay a fixtures directory and synthesize the rest.
+The default, benchmarks/synthetic_fixtures, is hand-written in the recording
+layout (no LLM replies), so numbers measure the pipeline against the fakes,
+not recorded provider behaviour; pass --fixtures with a directory captured
+via YARDS_RECORD_SESSIONS=1 to replay a real session.
+Every size runs in a fresh interpreter so peak RSS is per run. Per-stage
+latency percentiles, throughput, peak RSS and LLM token counts are written
+as JSON, optionally compared against a baseline run.
+
+    python benchmarks/discovery_bench.py --rows 100 1000
+    python benchmarks/discovery_bench.py --rows 100 --baseline benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+SRC_DIR = ROOT_DIR / "src"
+FIXTURES_DIR = BENCH_DIR / "synthetic_fixtures"
+RESULTS_DIR = BENCH_DIR / "results"
+DEFAULT_SOURCE = ROOT_DIR / "uploads" / "original_files" / "SG Passion4Cricket LLC_20251106_110818.xlsx"
+UPLOAD_COLUMNS = ["SKU Code", "Title", "Main Category"]
+
+# (module, function, stage) timed on every call
+STAGES = [
+    ("yards.utils.scrape_data", "detect_brand", "brand"),
+    ("yards.utils.scrape_data", "search_serper", "search"),
+    ("yards.utils.scrape_data", "fetch_shopify_product", "fetch_json"),
+    ("yards.utils.scrape_data", "fetch_html", "fetch_http"),
+    ("yards.utils.scrape_data", "fetch_page_in_thread", "fetch_browser"),
+    ("yards.utils.scrape_data", "parse_product_html_async", "parse"),
+    ("yards.agents.discovery_agent", "scrape_product", "scrape"),
+    ("yards.agents.discovery_agent", "expand_variants", "expand"),
+    ("yards.agents.discovery_agent", "process_row", "row"),
+]
+# Modules whose call_task is timed per task class as llm_<task>
+LLM_CALLERS = ["yards.utils.scrape_data", "yards.agents.discovery_agent"]
+
+# Metrics compared against a baseline: (path in a run, True if higher is better)
+COMPARED_METRICS = [
+    (("wall_seconds",), False),
+    (("rows_per_second",), True),
+    (("peak_rss_mb",), False),
+    (("llm", "input_tokens"), False),
+    (("llm", "output_tokens"), False),
+]
+
+
+# ----------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------
+def scale_upload(source, rows, path, unique_titles=False):
+    """Write `rows` rows of the source sheet to `path`, cycling through it.
+
+    Repeated rows get a "-<cycle>" SKU suffix so they are not deduped as
+    unchanged; with `unique_titles` the Title is suffixed as well.
+    """
+    from openpyxl import Workbook, load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    sheet_rows = workbook.worksheets[0].iter_rows(values_only=True)
+    header = [str(name).strip() if name is not None else "" for name in next(sheet_rows)]
+    positions = [header.index(column) for column in UPLOAD_COLUMNS]
+    base = [[values[i] for i in positions] for values in sheet_rows if values[positions[1]]]
+    workbook.close()
+
+    output = Workbook(write_only=True)
+    sheet = output.create_sheet("SG")
+    sheet.append(UPLOAD_COLUMNS)
+    for index in range(rows):
+        cycle, position = divmod(index, len(base))
+        sku, title, category = base[position]
+        if cycle:
+            sku = f"{sku}-{cycle}"
+            title = f"{title} {cycle}" if unique_titles else title
+        sheet.append([sku, title, category])
+    output.save(path)
+
+
+# ----------------------------------------------------------
+# Child process: one benchmark run
+# ----------------------------------------------------------
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+    return {
+        "count": len(ordered),
+        "total": round(sum(ordered), 4),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": round(rank(50), 4),
+        "p90": round(rank(90), 4),
+        "p99": round(rank(99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def install_timers(samples):
+    import importlib
+
+    def timed(fn, stage):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    samples.setdefault(stage, []).append(time.perf_counter() - started)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    samples.setdefault(stage, []).append(time.perf_counter() - started)
+        return wrapper
+
+    def timed_task(fn):
+        @functools.wraps(fn)
+        async def wrapper(task, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(task, *args, **kwargs)
+            finally:
+                samples.setdefault(f"llm_{task}", []).append(time.perf_counter() - started)
+        return wrapper
+
+    for module_name, attribute, stage in STAGES:
+        module = importlib.import_module(module_name)
+        setattr(module, attribute, timed(getattr(module, attribute), stage))
+    for module_name in LLM_CALLERS:
+        module = importlib.import_module(module_name)
+        module.call_task = timed_task(module.call_task)
+
+
+def peak_rss_mb(who):
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_once(upload_path):
+    from yards.graphs.discovery_graph import get_discovery_graph, DiscoveryState
+    from yards.utils.events import CURRENT_JOB, get_channel
+    from yards.utils.prompts import USAGE
+
+    samples = {}
+    install_timers(samples)
+
+    job_id = f"bench-{uuid.uuid4().hex[:8]}"
+    CURRENT_JOB.set(job_id)
+    channel = get_channel(job_id)
+    state = DiscoveryState(user_id=job_id, file_path=str(upload_path), filename=Path(upload_path).name, file_hash="")
+
+    started = time.perf_counter()
+    await get_discovery_graph().ainvoke(state, config={"configurable": {"thread_id": job_id}})
+    wall = time.perf_counter() - started
+
+    finished = channel.latest.get("job_completed") or channel.latest.get("job_failed") or {}
+    return wall, finished, samples, USAGE.totals(None)
+
+
+def child_main(args):
+    # Benchmarks measure our own overhead: lift provider rate limits unless asked not to
+    if not args.rate_limits:
+        from yards.utils.config import LLM_MODELS
+
+        for model_config in LLM_MODELS.values():
+            model_config["rpm"] = model_config["tpm"] = None
+
+    wall, finished, samples, usage = asyncio.run(run_once(args.upload))
+
+    # Reap the parse workers so RUSAGE_CHILDREN includes them
+    import yards.utils.scrape_data as scrape_data
+    if scrape_data.get_parse_pool.cache_info().currsize:
+        scrape_data.get_parse_pool().shutdown(wait=True)
+
+    result = {
+        "rows": args.run_one,
+        "status": finished.get("stage", "unknown"),
+        "wall_seconds": round(wall, 3),
+        "rows_per_second": round(args.run_one / wall, 3) if wall else None,
+        "products": finished.get("products"),
+        "rows_processed": finished.get("processed"),
+        "rows_reused": finished.get("reused"),
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_rss_children_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "llm": usage,
+        "stages": {stage: percentiles(values) for stage, values in sorted(samples.items())},
+    }
+    with open(args.result_file, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+
+# ----------------------------------------------------------
+# Parent process
+# ----------------------------------------------------------
+def child_env(args, workdir):
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")])),
+        "YARDS_LLM_PROVIDER": "fake",
+        "YARDS_SEARCH_PROVIDER": "fake",
+        "YARDS_PAGE_PROVIDER": "fake",
+        "YARDS_RECORDINGS_DIR": str(Path(args.fixtures).resolve()),
+        "RESULT_STORE_PATH": str(Path(workdir) / "results.sqlite3"),
+        "LLM_CACHE_PATH": str(Path(workdir) / "llm_cache.sqlite3"),
+        "FAKE_LLM_LATENCY": str(args.llm_latency),
+        "FAKE_SEARCH_LATENCY": str(args.search_latency),
+        "FAKE_PAGE_LATENCY": str(args.page_latency),
+        "FAKE_429_RATE": str(args.error_rate_429),
+        "FAKE_SEED": str(args.seed),
+    })
+    if not args.llm_cache:
+        env["LLM_CACHE_DISABLED"] = "1"
+    return env
+
+
+def run_size(args, rows):
+    workdir = tempfile.mkdtemp(prefix=f"yards-bench-{rows}-")
+    try:
+        upload = Path(workdir) / "uploads" / "original_files" / f"bench_{rows}.xlsx"
+        upload.parent.mkdir(parents=True)
+        scale_upload(args.source, rows, upload, args.unique_titles)
+
+        result_file = Path(workdir) / "result.json"
+        command = [sys.executable, __file__, "--run-one", str(rows), "--upload", str(upload),
+                   "--result-file", str(result_file)]
+        if args.rate_limits:
+            command.append("--rate-limits")
+        log_path = Path(workdir) / "pipeline.log"
+        with open(log_path, "w", encoding="utf-8") as log:
+            # cwd = workdir keeps uploads/updated_files and caches out of the repo
+            proc = subprocess.run(command, cwd=workdir, env=child_env(args, workdir),
+                                  stdout=None if args.verbose else log, stderr=subprocess.STDOUT)
+        if proc.returncode != 0 or not result_file.exists():
+            tail = log_path.read_text(encoding="utf-8", errors="replace").splitlines()[-20:]
+            raise RuntimeError(f"benchmark run for {rows} rows failed:\n" + "\n".join(tail))
+        return json.loads(result_file.read_text(encoding="utf-8"))
+    finally:
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def metric(run, path):
+    value = run
+    for key in path:
+        value = (value or {}).get(key)
+    return value
+
+
+def compare(report, baseline, tolerance):
+    """Print run-vs-baseline deltas; return the regressions beyond `tolerance`."""
+    regressions = []
+    previous = {run["rows"]: run for run in baseline.get("runs", [])}
+    for run in report["runs"]:
+        base = previous.get(run["rows"])
+        if not base:
+            continue
+        checks = list(COMPARED_METRICS) + [
+            (("stages", stage, "p90"), False) for stage in run["stages"] if stage in base.get("stages", {})
+        ]
+        print(f"\n{run['rows']} rows vs baseline ({baseline.get('meta', {}).get('commit')})")
+        for path, higher_is_better in checks:
+            new, old = metric(run, path), metric(base, path)
+            if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "❌" if worse > tolerance else "  "
+            print(f"  {flag} {'.'.join(path):<28} {old:>12.3f} → {new:>12.3f}  ({change:+.1%})")
+            if worse > tolerance:
+                regressions.append((run["rows"], ".".join(path), change))
+    return regressions
+
+
+def print_summary(report):
+    for run in report["runs"]:
+        llm = run["llm"]
+        print(f"\n{run['rows']} rows: {run['wall_seconds']}s, {run['rows_per_second']} rows/s, "
+              f"{run['products']} products, peak RSS {run['peak_rss_mb']} MB, "
+              f"LLM {llm['calls']} calls / {llm['input_tokens']} in / {llm['output_tokens']} out tokens")
+        print(f"  {'stage':<16} {'count':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+        for stage, stats in run["stages"].items():
+            if stats["count"]:
+                print(f"  {stage:<16} {stats['count']:>7} {stats['p50'] * 1000:>9.1f} "
+                      f"{stats['p90'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--source", default=str(DEFAULT_SOURCE), help="xlsx upload to scale")
+    parser.add_argument("--fixtures", default=str(FIXTURES_DIR),
+                        help="fixtures dir to replay (synthetic by default, or a YARDS_RECORD_SESSIONS=1 capture)")
+    parser.add_argument("--output", default=None, help="result JSON path (default benchmarks/results/)")
+    parser.add_argument("--baseline", default=None, help="earlier result JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="relative slowdown counted as a regression (exit code 1)")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--page-latency", type=float, default=0.2)
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limits", action="store_true", help="enforce the configured model RPM/TPM")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache enabled")
+    parser.add_argument("--unique-titles", action="store_true", help="suffix titles of repeated rows")
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output")
+    # internal: a single run in the child interpreter
+    parser.add_argument("--run-one", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--upload", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        sys.path.insert(0, str(SRC_DIR))
+        child_main(args)
+        return
+
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {key: value for key, value in vars(args).items()
+                         if key not in ("run_one", "upload", "result_file", "baseline", "output")},
+        },
+        "runs": [],
+    }
+    for rows in args.rows:
+        print(f"▶ {rows} rows ...", flush=True)
+        report["runs"].append(run_size(args, rows))
+
+    output = Path(args.output or RESULTS_DIR / f"discovery-{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print_summary(report)
+    print(f"\n📄 Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Measure how long it takes to import the yards service.
+
+Runs `python -X importtime` in a fresh interpreter so nothing is already
+cached, then prints the wall-clock time and the slowest imports.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module yards.main --top 20 --max-seconds 1
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+
+def parse_importtime(stderr):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return rows
+
+
+def measure(module, python=sys.executable):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")]))
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        print(proc.stderr.splitlines()[-1] if proc.stderr else "import failed", file=sys.stderr)
+        sys.exit(proc.returncode)
+    return elapsed, parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="yards.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-seconds", type=float, default=None,
+                        help="exit non-zero if the import takes longer than this")
+    args = parser.parse_args()
+
+    elapsed, rows = measure(args.module)
+    print(f"import {args.module}: {elapsed:.3f}s wall, {len(rows)} modules")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    if args.max_seconds is not None and elapsed > args.max_seconds:
+        print(f"❌ import took longer than {args.max_seconds}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Time catalog post-processing (yards.utils.postprocess) on a synthetic output CSV.
+
+Builds a Shopify CSV shaped like the pipeline's output (variant rows per
+title, defaults filled, messy prices and weights, duplicate and invalid
+rows mixed in), then times read, clean, write and the rejects file.
+
+    python benchmarks/postprocess_bench.py --rows 100000
+    python benchmarks/postprocess_bench.py --rows 100000 --max-seconds 10
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+PRICES = ["Rs. {:,}.00", "{}", "₹{:,}", "${} - ${}", "N/A"]
+WEIGHTS = ["500", "1.2 kg", "16 oz", "2lb", "", "heavy"]
+OPTION_VALUES = ["SH", "LH", "Youth", "Junior", "Small", ""]
+
+
+def synthetic_catalog(rows, seed=0):
+    import pandas as pd
+    from yards.utils.config import SHOPIFY_HEADERS, VARIANT_ROW_DEFAULTS
+
+    rng = random.Random(seed)
+    titles = [f"SG Cricket Product {i}" for i in range(max(1, rows // 4))]
+
+    def price():
+        template = rng.choice(PRICES)
+        return template.format(rng.randint(100, 99999), rng.randint(100, 99999))
+
+    df = pd.DataFrame({header: [""] * rows for header in SHOPIFY_HEADERS})
+    for column, value in VARIANT_ROW_DEFAULTS.items():
+        df[column] = value
+    df["Title"] = [rng.choice(titles) for _ in range(rows)]
+    df["Handle"] = [rng.choice(["", "sg-bat"]) for _ in range(rows)]
+    df["Option1 Name"] = "Size"
+    df["Option1 Value"] = [rng.choice(OPTION_VALUES) for _ in range(rows)]
+    df["Variant Price"] = [price() for _ in range(rows)]
+    df["Variant Grams"] = [rng.choice(WEIGHTS) for _ in range(rows)]
+    df["Body (HTML)"] = "<p>" + "Premium English willow cricket bat. " * 8 + "</p>"
+    df["SEO Title"] = df["Title"]
+    df["Image Src"] = "https://cdn.example.com/products/bat.jpg"
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-seconds", type=float, default=None, help="exit 1 when slower than this")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(SRC_DIR))
+    from yards.utils.postprocess import postprocess_csv
+
+    with tempfile.TemporaryDirectory() as workdir:
+        output_file = os.path.join(workdir, "catalog.csv")
+        synthetic_catalog(args.rows, args.seed).to_csv(output_file, index=False)
+        size_mb = os.path.getsize(output_file) / 1e6
+
+        started = time.perf_counter()
+        report = postprocess_csv(output_file)
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.rows} rows ({size_mb:.1f} MB) in {elapsed:.2f}s "
+          f"({args.rows / elapsed:,.0f} rows/s): {report['rows_out']} kept, {report['rejected']} rejected")
+    if args.max_seconds is not None and elapsed > args.max_seconds:
+        print(f"❌ slower than {args.max_seconds}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,151 @@
 import json
-import os, pandas as pd, csv, re, asyncio
-from yards.utils.config import SHOPIFY_HEADERS, PROMPT_TEMPLATES
-from yards.utils.utils import llm_init, call_llm
-from yards.utils.scrape_data import get_multi_source_product_pages
-
-llm, prompt = llm_init()
+import os, asyncio
+from yards.utils.config import (
+    PROMPT_TEMPLATES, ROW_FINGERPRINT_COLUMNS, SCRAPE_CONCURRENCY, PRODUCT_COPY_FIELDS, POSTPROCESS_OUTPUT,
+)
+from yards.utils.llm_router import call_task
+from yards.utils.scrape_data import scrape_product
+from yards.utils.json_extract import parse_products, parse_json
+from yards.utils.fetcher import has_required_fields
+from yards.utils.variants import expand_variants, apply_product_copy, clean_html_line
+from yards.utils.prompts import extraction_system_prompt, split_to_budget, USAGE
+from yards.utils.result_store import get_result_store, row_fingerprint
+from yards.utils.spreadsheet import aiter_row_batches
+from yards.utils.events import CURRENT_JOB, publish
+from yards.utils.profiler import finish_job_profile
+from yards.utils.exporters import open_exporters, export_path, convert_csv
+from yards.utils.postprocess import postprocess_csv
+from yards.utils.metrics import span, traced, CACHE_HITS, CACHE_MISSES, JOBS, ROWS_WRITTEN
 
 # -------- Helper Functions --------
-MAX_TOKENS_PER_REQUEST = 4000  # stay well below Groq 6000 TPM limit
-
-def chunk_text(text, max_length=MAX_TOKENS_PER_REQUEST):
-    """Split text into manageable chunks (approx tokens)."""
+def chunk_text(text, max_length=None):
+    """Split text into chunks that fit the request token budget next to the extraction prompt."""
+    if max_length is None:
+        return split_to_budget(text, extraction_system_prompt())
     return [text[i:i + max_length] for i in range(0, len(text), max_length)]
 
-def sanitize_json(text: str) -> str:
-    """Try to fix malformed JSON returned by LLM."""
-    text = re.sub(r'\\(?!["\\/bfnrtu])', r'\\\\', text)
-    text = re.sub(r',\s*([}\]])', r'\1', text)
-    if not text.startswith("[") and not text.startswith("{"):
-        start = text.find("[")
-        if start != -1:
-            text = text[start:]
-    if text.count('"') % 2 != 0:
-        text += '"'
-    return text
+def build_repair_prompt(result, chunk):
+    """Ask again for just the objects that failed validation or were cut off."""
+    extracted_titles = [p.get("Title") for p in result["products"]]
+    parts = [f"Already extracted: {json.dumps(extracted_titles, ensure_ascii=False)}"]
+    for failed in result["failed"]:
+        parts.append(f"Invalid object ({'; '.join(failed['errors'])}):\n{failed['fragment']}")
+    if result["truncated"]:
+        parts.append(f"Your answer was cut off here; finish this object and any products after it:\n{result['truncated']}")
+    parts.append(f"Scraped data:\n{chunk}")
+    return "\n\n".join(parts)
+
+
+async def extract_products(user_prompt, chunk):
+    response = await call_task(
+        "extract",
+        extraction_system_prompt(),
+        user_prompt,
+        json_mode=True,
+    )
+    result = parse_products(response.content)
+    products = result["products"]
+
+    if result["failed"] or result["truncated"]:
+        print(f"🩹 Re-asking for {len(result['failed'])} invalid"
+              f"{' + truncated' if result['truncated'] else ''} product(s)")
+        repair_response = await call_task(
+            "extract",
+            f"{extraction_system_prompt()}\n{PROMPT_TEMPLATES['repair_products']}",
+            build_repair_prompt(result, chunk),
+            json_mode=True,
+        )
+        products.extend(parse_products(repair_response.content)["products"])
+
+    return products
+
+
+def build_user_prompt(chunk, part, parts):
+    # Everything static lives in the system prompt; only the scraped data varies
+    return f"Scraped data (part {part} of {parts}):\n{chunk}"
+
+
+COPY_SOURCE_CHARS = 3000  # scraped description sent to the copywriting call
+
+
+def build_copy_input(scraped, title):
+    """Compact JSON view of a scraped product for the copywriting call."""
+    variants = scraped.get("Variants") or []
+    facts = {
+        "Title": scraped.get("Title") or title,
+        "Vendor": scraped.get("Vendor") or "",
+        "Type": scraped.get("Type") or "",
+        "Tags": scraped.get("Tags") or "",
+        "Options": sorted({str(v.get("Size") or v.get("Option1")) for v in variants if v.get("Size") or v.get("Option1")}),
+        "Description": clean_html_line(scraped.get("Body (HTML)"))[:COPY_SOURCE_CHARS],
+    }
+    return json.dumps(facts, ensure_ascii=False)
+
+
+async def write_product_copy(scraped, title):
+    """One LLM call per product for the free-text fields; {} if it fails."""
+    try:
+        response = await call_task(
+            "copy",
+            PROMPT_TEMPLATES['product_copy'],
+            build_copy_input(scraped, title),
+            json_mode=True,
+            json_array=False,
+        )
+        copy = parse_json(response.content)
+    except Exception as e:
+        print(f"⚠️ Error writing copy for {title}: {e}")
+        return {}
+    if not isinstance(copy, dict):
+        return {}
+    return {field: copy[field] for field in PRODUCT_COPY_FIELDS if copy.get(field)}
+
+
+async def extract_with_llm(title, scraped):
+    """Full LLM extraction, for pages without structured product/variant data."""
+    chunks = chunk_text(str(scraped))
+    products = []
+    for i, chunk in enumerate(chunks, start=1):
+        print(f"🧩 Processing {title} chunk {i}/{len(chunks)} (length={len(chunk)})")
+        try:
+            extracted = await extract_products(build_user_prompt(chunk, i, len(chunks)), chunk)
+            products.extend(extracted)
+            publish("chunk_extracted", title=title, part=i, parts=len(chunks), products=len(extracted))
+        except Exception as e:
+            print(f"⚠️ Error extracting JSON for {title} chunk {i}: {e}")
+    return products
+
+
+@traced("row")
+async def process_row(row):
+    """Scrape one catalog row and build its Shopify rows.
+
+    Structured pages are expanded into variant rows without the LLM, which
+    then only writes the product copy; anything else goes through full
+    LLM extraction.
+    """
+    title = str(row["Title"]).strip()
+    scraped = await scrape_product(title)
+    if not scraped:
+        return []
+
+    if not has_required_fields(scraped):
+        return await extract_with_llm(title, scraped)
+
+    rows = expand_variants(scraped, title)
+    copy = await write_product_copy(scraped, title)
+    publish("variants_expanded", title=title, variants=len(rows), llm_fields=sorted(copy))
+    return apply_product_copy(rows, copy)
+
+
+def is_blank(value):
+    return value is None or value != value or str(value).strip() == ""
 
 
 # -------- Main Discovery Step --------
 async def discovery_step(state):
+    if state.get("user_id"):
+        CURRENT_JOB.set(state["user_id"])
     UPDATED_DIR = os.path.join("uploads", "updated_files")
     os.makedirs(UPDATED_DIR, exist_ok=True)
 
@@ -35,106 +153,121 @@ async def discovery_step(state):
         file_path = state.get("file_path", "")
         filename = state.get("filename", "")
         if not os.path.exists(file_path):
+            JOBS.inc(status="failed")
+            publish("job_failed", error="File not found", profile_file=await finish_job_profile())
             return {"status": 404, "message": "File not found..."}
 
-        product_titles = []
-        missing_info = []
-
         print(f"Processing file: {filename}")
         file_extension = os.path.splitext(filename)[1].lower()
         filename_no_ext = os.path.splitext(filename)[0]
-
-        # --- Load product titles ---
-        if file_extension == ".csv":
-            file_info = pd.read_csv(file_path)
-        elif file_extension in [".xlsx", ".xls"]:
-            file_info = pd.read_excel(file_path)
-        else:
+        if file_extension not in [".csv", ".xlsx", ".xls"]:
             raise ValueError("Unsupported file format")
 
-        for data in file_info.to_dict(orient="records"):
-            title = data.get("Title", "")
-            if pd.notna(title) and title.strip() != "":
-                product_titles.append(title)
-                missing_info.append(title)
-
-        # --- Scrape product data ---
-        scraper_response = await get_multi_source_product_pages(product_titles)
-
-        if not scraper_response:
-            chunks = [f"{PROMPT_TEMPLATES['user_prompt_prod_details']}\n\n(No scraped data found — skip processing)"]
-        else:
-            raw_scraped = str(scraper_response)
-            chunks = chunk_text(raw_scraped)
-
-        all_products = []
-
-        # --- Process each chunk through LLM ---
-        for i, chunk in enumerate(chunks, start=1):
-            print(f"🧩 Processing chunk {i}/{len(chunks)} (length={len(chunk)})")
-            user_prompt = (
-                f"{PROMPT_TEMPLATES['user_prompt_prod_details']}\n\n"
-                f"💡 Variant Expansion Rule (critical):\n"
-                f"- Detect variant-defining fields such as Size, Grade, Weight, Model, or Color from scraped data.\n"
-                f"- Map them to Shopify Option fields:\n"
-                f"  * 'Size' → Option1 Name/Value\n"
-                f"  * 'Color' → Option2 Name/Value\n"
-                f"  * 'Grade', 'Edition', 'Profile' → Option1 Name/Value (if Size not present)\n"
-                f"- Ensure each variant becomes a **separate JSON object** with its Option1 Value populated.\n\n"
-                f"Scraped data (part {i} of {len(chunks)}):\n{chunk}"
-            )
-
+        store = get_result_store()
+        output_file = os.path.join(UPDATED_DIR, f"{filename_no_ext}.csv")
+        # Bounded hand-off between the reader and the scrape workers keeps memory flat
+        queue = asyncio.Queue(maxsize=SCRAPE_CONCURRENCY * 2)
+        counts = {"rows": 0, "reused": 0, "processed": 0, "products": 0, "incomplete": 0}
+        publish("job_started", filename=filename, output_file=output_file)
 
-            try:
-                extractor_response = await call_llm(
-                    llm,
-                    prompt,
-                    PROMPT_TEMPLATES['get_column_details'],
-                    user_prompt,
-                )
+        export_formats = state.get("export_formats") or []
+        # Extra formats are exported from the post-processed CSV once the job is done
+        with open_exporters(output_file, [] if POSTPROCESS_OUTPUT else export_formats) as exporters:
 
-                raw_json = extractor_response.content.strip()
-                raw_json = sanitize_json(raw_json)                
+            def emit(products):
+                for fmt, exporter in exporters.items():
+                    with span(f"{fmt}_write"):
+                        exporter.write(products)
+                ROWS_WRITTEN.inc(len(products))
+                counts["products"] += len(products)
+                publish("rows_written", count=len(products), total=counts["products"])
 
+            # --- Stream rows, dedupe, and serve unchanged rows from the row store ---
+            async def read_rows():
+                seen = set()
                 try:
-                    extracted = json.loads(raw_json)
-                except json.JSONDecodeError:
-                    extracted = json.loads(sanitize_json(raw_json))
+                    async for batch in aiter_row_batches(file_path, ["Title", *ROW_FINGERPRINT_COLUMNS]):
+                        fresh = []
+                        for row in batch:
+                            if is_blank(row.get("Title")):
+                                continue
+                            fingerprint = row_fingerprint(row)
+                            if fingerprint not in seen:
+                                seen.add(fingerprint)
+                                fresh.append((fingerprint, row))
+                        counts["rows"] += len(fresh)
+                        publish("rows_read", count=len(batch), unique=counts["rows"])
 
-                if isinstance(extracted, dict):
-                    extracted = [extracted]
-                elif isinstance(extracted, str):
-                    try:
-                        extracted = json.loads(extracted)
-                    except:
-                        extracted = []
+                        cached = await asyncio.to_thread(store.get_rows, [fp for fp, _ in fresh])
+                        for fingerprint, row in fresh:
+                            if fingerprint in cached:
+                                counts["reused"] += 1
+                                CACHE_HITS.inc(cache="row")
+                                emit(cached[fingerprint])
+                            else:
+                                CACHE_MISSES.inc(cache="row")
+                                await queue.put((fingerprint, row))
+                finally:
+                    for _ in range(SCRAPE_CONCURRENCY):
+                        await queue.put(None)
 
-                all_products.extend(extracted)
-
-            except Exception as e:
-                print(f"⚠️ Error extracting JSON for chunk {i}: {e}")
+            # --- Scrape + extract new/changed rows as they arrive ---
+            async def worker():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    fingerprint, row = item
+                    complete = False
+                    try:
+                        products = await process_row(row)
+                        counts["processed"] += 1
+                        if products:
+                            complete = await asyncio.to_thread(store.put_rows, fingerprint, str(row["Title"]), products)
+                            emit(products)
+                    except Exception as e:
+                        print(f"⚠️ Error processing {row.get('Title')}: {e}")
+                    if not complete:
+                        counts["incomplete"] += 1
 
-            # Respect rate limit between calls
-            await asyncio.sleep(1)
+            await asyncio.gather(read_rows(), *(worker() for _ in range(SCRAPE_CONCURRENCY)))
 
-        # --- Write merged results to CSV ---
-        output_file = os.path.join(UPDATED_DIR, f"{filename_no_ext}.csv")
-        with open(output_file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=SHOPIFY_HEADERS)
-            writer.writeheader()
+        print(f"♻️ Reused {counts['reused']} unchanged rows, processed {counts['processed']} new or changed rows")
+        print(f"✅ Completed extraction for {filename_no_ext}, total products: {counts['products']}")
 
-            for item in all_products:
-                if not isinstance(item, dict):
-                    continue
-                for key, value in list(item.items()):
-                    if isinstance(value, list):
-                        item[key] = ", ".join(map(str, value))
-                writer.writerow(item)
+        validation = None
+        if POSTPROCESS_OUTPUT:
+            try:
+                with span("postprocess"):
+                    validation = await asyncio.to_thread(postprocess_csv, output_file)
+                publish("catalog_validated", **validation)
+            except Exception as e:
+                print(f"⚠️ Post-processing failed, keeping the raw CSV: {e}")
+            for fmt in export_formats:
+                with span(f"{fmt}_write"):
+                    await asyncio.to_thread(convert_csv, output_file, fmt)
 
-        print(f"✅ Completed extraction for {filename_no_ext}, total products: {len(all_products)}")
+        # Only a catalog where every row came back complete is served for an identical re-upload;
+        # otherwise the incomplete record replaces any older one and the next upload re-scrapes
+        if state.get("file_hash"):
+            if counts["incomplete"]:
+                print(f"⚠️ {counts['incomplete']} rows failed or came back incomplete; not reusing this catalog")
+            await asyncio.to_thread(store.put, state["file_hash"], file_path, output_file,
+                                    complete=not counts["incomplete"])
+        usage = USAGE.pop(CURRENT_JOB.get())
+        print(f"🧮 LLM usage: {usage['calls']} calls ({usage['cache_hits']} cached), "
+              f"{usage['input_tokens']} in / {usage['output_tokens']} out tokens, ${usage['cost_usd']:.4f}")
+        JOBS.inc(status="completed")
+        exports = {fmt: export_path(output_file, fmt) for fmt in export_formats}
+        profile_file = await finish_job_profile(output_file)
+        publish("job_completed", output_file=output_file, exports=exports, validation=validation, usage=usage,
+                profile_file=profile_file, **counts)
+        return {"output_file": output_file, "exports": exports, "profile_file": profile_file}
 
     except Exception as e:
         print(f"❌ Error in discovery_step: {e}")
+        JOBS.inc(status="failed")
+        publish("job_failed", error=str(e), profile_file=await finish_job_profile())
 
         
         
@@ -1,25 +1,26 @@
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph.message import AnyMessage, add_messages
-from typing import Annotated, List
-from yards.agents.discovery_agent import discovery_step
-from yards.agents.rag_agent import RagAgent
-from fastapi import WebSocket
-from yards.utils.config import CONNECTED_CLIENTS
-
-class DiscoveryState(dict):    
+from functools import lru_cache
+from yards.utils.events import publish
+
+class DiscoveryState(dict):
     user_id: str = ""
     file_path: str = ""
     filename: str = ""
+    file_hash: str = ""
+    output_file: str = ""
+    export_formats: list = None
+    exports: dict = None
+    profile_file: str = ""
 
-def send_to_client(state):
-    client_id = state["user_id"]
+def send_to_client(state, stage, **data):
+    publish(stage, job_id=state["user_id"], **data)
 
 
 async def rag_node(state):
     try:
+        from yards.agents.rag_agent import RagAgent
+
         rag_agent = RagAgent()
-        
+
         query = state.get("user_input", "")
         doc_values = rag_agent.retrieve(query, k=3)
         state["doc_values"] = doc_values
@@ -30,7 +31,7 @@ async def rag_node(state):
 
 
 def execution_agent(state):
-    return 
+    return
 
 
 def redirect_node(state):
@@ -39,17 +40,33 @@ def redirect_node(state):
     return "discovery"
 
 
-workflow = StateGraph(DiscoveryState)
-# workflow.add_node("rag", rag_node)
-
 async def process_file(state):
+    from yards.agents.discovery_agent import discovery_step
+
     return await discovery_step(state)
 
-workflow.add_node("discovery", process_file)
 
-# workflow.add_edge("discovery", "rag")
+@lru_cache(maxsize=None)
+def get_discovery_graph():
+    # langgraph and the agents are only imported when the graph is first built
+    from langgraph.graph import StateGraph
+    from langgraph.checkpoint.memory import MemorySaver
+
+    workflow = StateGraph(DiscoveryState)
+    # workflow.add_node("rag", rag_node)
+
+    workflow.add_node("discovery", process_file)
+
+    # workflow.add_edge("discovery", "rag")
+
+    workflow.set_entry_point("discovery")
+
+    memory = MemorySaver()
+    return workflow.compile(checkpointer=memory)
 
-workflow.set_entry_point("discovery")
 
-memory = MemorySaver()
-discovery_graph = workflow.compile(checkpointer=memory)
\ No newline at end of file
+def __getattr__(name):
+    # Keep `from yards.graphs.discovery_graph import discovery_graph` working
+    if name == "discovery_graph":
+        return get_discovery_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
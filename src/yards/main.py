@@ -1,10 +1,15 @@
 import json
+import time
 import uuid
-from fastapi import FastAPI, File, UploadFile
+import asyncio
+import multiprocessing
+import threading
+from contextlib import asynccontextmanager, nullcontext
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
 from pathlib import Path
 import sys, os
 import uvicorn
-from datetime import datetime
 # from yards.main import app
 
 if getattr(sys, "frozen", False):
@@ -14,51 +19,266 @@ else:
 
 sys.path.insert(0, str(base_path))
 
-from yards.graphs.discovery_graph import discovery_graph, DiscoveryState
-from yards.utils.config import CONNECTED_CLIENTS
+from yards.graphs.discovery_graph import get_discovery_graph, DiscoveryState
+from yards.utils.config import CONNECTED_CLIENTS, PROFILE_JOBS, WARM_UP_SHUTDOWN_TIMEOUT_SECONDS
+from yards.utils.llm_client import close_http_clients
+from yards.utils.fetcher import close_scrape_client
+from yards.utils.uploads import save_upload, UploadTooLarge
+from yards.utils.result_store import get_result_store
+from yards.utils.events import CURRENT_JOB, publish, get_channel, sse_stream
+from yards.utils.profiler import JobProfiler, CURRENT_PROFILER, finish_job_profile
+from yards.utils.exporters import ExportUnavailable, get_exporter_class, parse_formats, convert_csv
+from yards.utils.downloads import (
+    RangeNotSatisfiable,
+    parse_range,
+    file_validators,
+    if_range_matches,
+    accepts_gzip,
+    iter_file_version,
+    gzip_chunks,
+)
+from yards.utils.metrics import span, render_prometheus, CACHE_HITS, CACHE_MISSES, JOBS
 
 UPLOAD_DIR = os.path.join("uploads", "original_files")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-app = FastAPI()
+
+def warm_up(stop):
+    """Build the graph, LLM client and scraper stack so the first upload doesn't pay for it.
+
+    Runs in a worker thread, which cancelling can't interrupt: `stop` (a
+    threading.Event) is checked between steps instead.
+    """
+    try:
+        get_discovery_graph()
+        if stop.is_set():
+            return
+        from yards.utils.utils import llm_init
+        llm_init()
+        if stop.is_set():
+            return
+        from yards.utils.scrape_data import warm_up as warm_scraper
+        warm_scraper(stop)
+        if not stop.is_set():
+            print("🔥 Heavy components warmed up")
+    except Exception as e:
+        print(f"⚠️ Warm-up failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm in a worker thread so the server binds its port immediately
+    warm_stop = threading.Event()
+    warm_task = asyncio.create_task(asyncio.to_thread(warm_up, warm_stop))
+    yield
+    warm_stop.set()
+    try:
+        # The step in progress (an import, Chromium) still has to return; don't wait forever
+        await asyncio.wait_for(asyncio.shield(warm_task), WARM_UP_SHUTDOWN_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print("⚠️ Warm-up still running at shutdown; not waiting for it")
+    await close_http_clients()
+    await close_scrape_client()
+    scrape_data = sys.modules.get("yards.utils.scrape_data")
+    if scrape_data:
+        scrape_data.shutdown_parse_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+
+async def run_discovery(client_id, state, profile=False):
+    CURRENT_JOB.set(client_id)
+    config={"configurable":{"thread_id":client_id}}
+    profiler = JobProfiler(client_id) if profile else None
+    # discovery_step writes the profile before it publishes the terminal event
+    CURRENT_PROFILER.set(profiler)
+    try:
+        async with profiler or nullcontext():
+            state = await get_discovery_graph().ainvoke(state, config=config)
+        CONNECTED_CLIENTS[client_id]["state"] = state
+    except Exception as e:
+        print(f"Error with client {client_id}: {e}")
+        profile_file = await finish_job_profile(job_output_file(client_id))
+        publish("job_failed", error=str(e), profile_file=profile_file)
+    return state
+
+
+def job_links(client_id):
+    return {"events": f"/jobs/{client_id}/events", "result": f"/jobs/{client_id}/result",
+            "download": f"/jobs/{client_id}/download"}
+
 
 @app.post("/upload")
-async def discovery_endpoint(file: UploadFile = File(...)):
+async def discovery_endpoint(file: UploadFile = File(...), wait: bool = False, profile: bool = False,
+                             formats: str = ""):
+    # Extra output formats written alongside the CSV, e.g. formats=parquet,jsonl
+    try:
+        export_formats = parse_formats(formats)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     client_id = str(uuid.uuid4())
     CONNECTED_CLIENTS[client_id] = {
         "state": DiscoveryState()
-    }    
-
-    try:        
-        filename = file.filename
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        print(f"Received file: {filename}, saving to: {file_path}")            
-        if os.path.exists(file_path):
-            name, ext = os.path.splitext(filename)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{name}_{timestamp}{ext}"
-            file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
+    }
 
-        state = CONNECTED_CLIENTS[client_id]["state"]
-        state['user_id'] = client_id
-        state['file_path'] = file_path
-        state['filename'] = filename
+    try:
+        async with span("upload"):
+            upload = await save_upload(file, UPLOAD_DIR)
+    except UploadTooLarge as e:
+        CONNECTED_CLIENTS.pop(client_id, None)
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Identical content already processed with the current pipeline and prompts
+    output_file = await asyncio.to_thread(get_result_store().get, upload["sha256"])
+    if output_file:
+        CACHE_HITS.inc(cache="result")
+        JOBS.inc(status="cached")
+        print(f"♻️ {upload['filename']} matches an earlier upload, reusing {output_file}")
+        await asyncio.to_thread(os.remove, upload["file_path"])
+        CONNECTED_CLIENTS[client_id]["state"]["output_file"] = output_file
+        publish("job_completed", job_id=client_id, output_file=output_file, cached=True)
+        return {"client_id": client_id, "output_file": output_file, "cached": True, **job_links(client_id)}
+
+    CACHE_MISSES.inc(cache="result")
+    filename = upload["filename"]
+    file_path = upload["file_path"]
+    print(f"Received file: {filename} ({upload['size']} bytes), saved to: {file_path}")
+
+    state = CONNECTED_CLIENTS[client_id]["state"]
+    state['user_id'] = client_id
+    state['file_path'] = file_path
+    state['filename'] = filename
+    state['file_hash'] = upload["sha256"]
+    state['export_formats'] = export_formats
+
+    # Run in the background; progress is streamed from /jobs/{client_id}/events
+    task = asyncio.create_task(run_discovery(client_id, state, profile=profile or PROFILE_JOBS))
+    CONNECTED_CLIENTS[client_id]["task"] = task
+    if wait:
+        state = await task
+        return {"client_id": client_id, "output_file": state.get("output_file"), "profile_file": state.get("profile_file"),
+                "exports": state.get("exports"),
+                "cached": False, **job_links(client_id)}
+    return {"client_id": client_id, "cached": False, **job_links(client_id)}
+
+
+def job_output_file(job_id):
+    client = CONNECTED_CLIENTS.get(job_id)
+    if client and client["state"].get("output_file"):
+        return client["state"]["output_file"]
+    # Still running: the output path is announced when the job starts
+    channel = get_channel(job_id, create=False)
+    started = channel.latest.get("job_started") if channel else None
+    return started.get("output_file") if started else None
+
+
+def job_final_event(job_id):
+    """Terminal event rebuilt from a finished job's state (None while it runs), for evicted channels."""
+    client = CONNECTED_CLIENTS.get(job_id)
+    if not client or job_running(job_id):
+        return None
+    state = client["state"]
+    event = {"job_id": job_id, "ts": time.time(), "replayed": True}
+    if state.get("output_file"):
+        return {**event, "stage": "job_completed", "output_file": state["output_file"],
+                "exports": state.get("exports"), "profile_file": state.get("profile_file")}
+    return {**event, "stage": "job_failed", "error": "Job finished without output"}
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if job_id not in CONNECTED_CLIENTS and get_channel(job_id, create=False) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return StreamingResponse(
+        sse_stream(job_id, final_event=job_final_event(job_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    # Serves whatever has been written so far while the job is still running
+    output_file = job_output_file(job_id)
+    if not output_file or not os.path.exists(output_file):
+        raise HTTPException(status_code=404, detail="No output yet")
+    return FileResponse(output_file, media_type="text/csv", filename=os.path.basename(output_file))
+
+
+def job_running(job_id):
+    task = CONNECTED_CLIENTS.get(job_id, {}).get("task")
+    return task is not None and not task.done()
+
+
+@app.get("/jobs/{job_id}/download")
+async def job_download(job_id: str, request: Request, format: str = "csv"):
+    """Stream a job's catalog as csv, jsonl (gzip JSON Lines) or parquet.
+
+    Supports single byte ranges (resumable downloads, guarded by ETag /
+    If-Range and refused while the CSV is still being written) and, for CSV,
+    gzip transfer encoding. Other formats are converted from the CSV on
+    first request once the job has finished.
+    """
+    output_file = job_output_file(job_id)
+    if not output_file or not os.path.exists(output_file):
+        raise HTTPException(status_code=404, detail="No output yet")
+    try:
+        exporter = get_exporter_class(format)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    path = output_file
+    if exporter is not get_exporter_class("csv"):
+        if job_running(job_id):
+            raise HTTPException(status_code=409, detail=f"{format} export is available once the job completes")
+        path = await asyncio.to_thread(convert_csv, output_file, format.lower())
+
+    # The file is opened when the body streams; iter_file_version checks it still matches this stat
+    stat = await asyncio.to_thread(os.stat, path)
+    size = stat.st_size
+    # A CSV still being written has no stable byte offsets to resume from
+    resumable = not (path == output_file and job_running(job_id))
+    headers = {"Accept-Ranges": "bytes" if resumable else "none",
+               "Content-Disposition": f'attachment; filename="{os.path.basename(path)}"',
+               **file_validators(stat)}
+    byte_range = None
+    if resumable and if_range_matches(request.headers.get("if-range"), headers):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            raise HTTPException(status_code=416, detail="Range not satisfiable",
+                                headers={"Content-Range": f"bytes */{size}"})
+
+    if byte_range:
+        start, end = byte_range
+        headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+        return StreamingResponse(iter_file_version(path, stat, start, end), status_code=206,
+                                 media_type=exporter.media_type, headers=headers)
+    if exporter.compressible and accepts_gzip(request.headers.get("accept-encoding")):
+        # The ETag names the identity bytes; the gzipped body gets its own
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding",
+                        "ETag": headers["ETag"][:-1] + '-gzip"'})
+        chunks = iter_file_version(path, stat, 0, size - 1, strict=resumable)
+        return StreamingResponse(gzip_chunks(chunks), media_type=exporter.media_type, headers=headers)
+    # Stop at the stat'ed size: a running job keeps appending to its CSV
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(iter_file_version(path, stat, 0, size - 1, strict=resumable),
+                             media_type=exporter.media_type, headers=headers)
+
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
-        config={"configurable":{"thread_id":client_id}}
-        
-        state = await discovery_graph.ainvoke(state, config=config)
-        CONNECTED_CLIENTS[client_id]["state"] = state
-    except Exception as e:
-        print(f"Error with client {client_id}: {e}")
 
 # 🔹 Example: Send a message to a specific client from outside
 async def send_to_client(client_id: str, message: dict):
-    client = CONNECTED_CLIENTS.get(client_id)
+    publish(message.get("stage", "message"), job_id=client_id, **{k: v for k, v in message.items() if k != "stage"})
         
 def main():    
+    multiprocessing.freeze_support()
     uvicorn.run(app, host="127.0.0.1", port=8000)
 
 if __name__ == "__main__":    
@@ -11,6 +11,7 @@ from qdrant_client.models import (
 from sentence_transformers import SentenceTransformer
 import uuid, re, os
 import time
+from typing import Optional
 # from yards.utils.config import QDRANT_HOST, QDRANT_API_KEY, GROQ_API_KEY
 from groq import Groq
 from dotenv import load_dotenv
@@ -188,6 +189,53 @@ def get_session_history(user_id: str, session_id: str, limit: int = 10):
     return [r.payload['message'] for r in results]
 
 
+def recall(user_id: str, session_id: str, query: str, k: int = 5, half_life: Optional[float] = None):
+    """Return the k past messages of a session most relevant to `query`.
+
+    Runs a vector search restricted to the session through the user_id /
+    session_id keyword indexes. When `half_life` (seconds) is given, each
+    similarity (clamped at 0) is decayed by 0.5 ** (age / half_life), so the
+    ranking trades relevance for recency: a recent turn can outrank an older,
+    more similar one. Messages come back in chronological order, ready to
+    drop into a prompt.
+    """
+    session_filter = Filter(
+        must=[
+            FieldCondition(key="user_id", match=MatchValue(value=str(user_id))),
+            FieldCondition(key="session_id", match=MatchValue(value=str(session_id)))
+        ]
+    )
+
+    # Over-fetch when decaying so older-but-similar hits can be displaced.
+    limit = k * 4 if half_life else k
+
+    try:
+        results = client.search(
+            collection_name=collection_name,
+            query_vector=embed(query),
+            query_filter=session_filter,
+            limit=limit,
+            with_payload=True
+        )
+    except Exception as e:
+        print(f"Error during recall: {e}")
+        return []
+
+    now = time.time()
+    scored = []
+    for r in results:
+        timestamp = float(r.payload.get("timestamp") or now)
+        score = r.score
+        if half_life:
+            # Clamp first: decaying a negative similarity would move old, unrelated turns up
+            score = max(score, 0.0) * 0.5 ** (max(now - timestamp, 0.0) / half_life)
+        scored.append((score, timestamp, r.payload))
+
+    top = sorted(scored, key=lambda item: item[0], reverse=True)[:k]
+    top.sort(key=lambda item: item[1])
+    return [{"role": p["role"], "message": p["message"]} for _, _, p in top]
+
+
 def embed(text: str):
     return embedder.encode(text).tolist()
 
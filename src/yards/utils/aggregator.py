@@ -0,0 +1,215 @@
+import asyncio
+import re
+import time
+from urllib.parse import urlsplit, urlunsplit
+from yards.utils.config import (
+    JUNK_LINK_DOMAINS,
+    TRUSTED_RETAILERS,
+    MERGE_REQUIRED_FIELDS,
+    LISTING_PATH_MARKERS,
+    PRODUCT_PATH_MARKERS,
+)
+from yards.utils.events import publish
+
+# Variant fields compared when deciding two scraped variants are the same one
+VARIANT_KEY_FIELDS = ["Option1", "Size", "Variant Name"]
+
+
+# ----------------------------------------------------------
+# Link selection
+# ----------------------------------------------------------
+def _host(url):
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalize_link(url):
+    """Drop query string, fragment and trailing slash so duplicate hits collapse."""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+def source_priority(url, official_domain=None):
+    """0 for the brand's official site, 1 for trusted retailers, 2 for anything else."""
+    host = _host(url)
+    if official_domain and (host == official_domain or host.endswith("." + official_domain)):
+        return 0
+    if any(host == shop or host.endswith("." + shop) for shop in TRUSTED_RETAILERS):
+        return 1
+    return 2
+
+
+def is_listing_url(url):
+    """Collection, category and search pages: they list many products, not the one searched for."""
+    path = urlsplit(url).path.lower().rstrip("/") + "/"
+    if any(marker in path for marker in PRODUCT_PATH_MARKERS):
+        return False
+    return any(marker in path for marker in LISTING_PATH_MARKERS)
+
+
+def link_rank(url, official_domain=None):
+    """Sort key: product pages before listing pages, then source priority."""
+    return (is_listing_url(url), source_priority(url, official_domain))
+
+
+def rank_links(result_lists, official_domain=None, limit=None):
+    """Merge Serper organic result lists into one deduped, priority-ordered link list.
+
+    Junk hosts (video/social sites) are dropped and listing pages rank after
+    every product page. Within a priority level the search order is kept,
+    earlier result lists first.
+    """
+    seen = set()
+    ranked = []
+    for results in result_lists:
+        for result in results or []:
+            link = result.get("link") or ""
+            if not link or any(junk in link for junk in JUNK_LINK_DOMAINS):
+                continue
+            key = normalize_link(link)
+            if key in seen:
+                continue
+            seen.add(key)
+            ranked.append(link)
+    ranked.sort(key=lambda link: link_rank(link, official_domain))
+    return ranked[:limit] if limit else ranked
+
+
+# ----------------------------------------------------------
+# Field merging
+# ----------------------------------------------------------
+def _blank(value):
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _variant_key(variant):
+    sku = str(variant.get("Variant SKU") or "").strip().lower()
+    if sku:
+        return ("sku", sku)
+    for field in VARIANT_KEY_FIELDS:
+        value = variant.get(field)
+        if not _blank(value):
+            return ("name", re.sub(r"\s+", " ", str(value)).strip().lower())
+    return None
+
+
+def merge_variants(variant_lists):
+    """Variants of the highest-priority source that has any, deduped.
+
+    Lower-priority sources never add variants (retailers name sizes
+    differently), they only fill blank fields of variants that match by SKU
+    or option name.
+    """
+    merged = []
+    index = {}
+    for variants in variant_lists:
+        adopt = not merged
+        for variant in variants or []:
+            if not isinstance(variant, dict):
+                continue
+            key = _variant_key(variant)
+            existing = index.get(key) if key else None
+            if existing is not None:
+                for field, value in variant.items():
+                    if _blank(existing.get(field)) and not _blank(value):
+                        existing[field] = value
+            elif adopt:
+                copy = dict(variant)
+                merged.append(copy)
+                if key:
+                    index[key] = copy
+    return merged
+
+
+def _as_list(value):
+    if _blank(value):
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def merge_products(products):
+    """Merge scraped products (highest priority first): first non-blank value per field wins."""
+    products = [p for p in products if p]
+    if not products:
+        return None
+
+    merged = {}
+    images = []
+    for product in products:
+        for field, value in product.items():
+            if field in ("Variants", "Image Src", "Source URL"):
+                continue
+            if _blank(merged.get(field)) and not _blank(value):
+                merged[field] = value
+        for src in _as_list(product.get("Image Src")):
+            if src not in images:
+                images.append(src)
+
+    merged["Source URL"] = products[0].get("Source URL")
+    merged["Sources"] = [p.get("Source URL") for p in products if p.get("Source URL")]
+    merged["Image Src"] = images
+    merged["Variants"] = merge_variants(p.get("Variants") for p in products)
+    if _blank(merged.get("Variant Price")):
+        prices = [v.get("Variant Price") for v in merged["Variants"] if not _blank(v.get("Variant Price"))]
+        if prices:
+            merged["Variant Price"] = prices[0]
+    return merged
+
+
+def is_complete(product):
+    return bool(product) and all(not _blank(product.get(field)) for field in MERGE_REQUIRED_FIELDS)
+
+
+# ----------------------------------------------------------
+# Concurrent fetch
+# ----------------------------------------------------------
+async def aggregate_sources(title, links, extract, official_domain=None, deadline=None):
+    """Fetch `links` concurrently with `extract(url)` and merge them by priority.
+
+    Returns as soon as the merge of the finished sources is complete and no
+    better-ranked source (by link rank, then search position) is still running, or when `deadline` seconds have
+    passed; whatever is still in flight is cancelled (a browser render
+    already handed to a thread finishes in the background).
+    """
+    if not links:
+        return None
+
+    started = time.monotonic()
+    tasks = {asyncio.ensure_future(extract(link)): (index, link) for index, link in enumerate(links)}
+    ranks = [(link_rank(link, official_domain), index) for index, link in enumerate(links)]
+    results = {}
+    pending = set(tasks)
+    merged = None
+    try:
+        while pending:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - (time.monotonic() - started)
+                if timeout <= 0:
+                    print(f"[⏱️ Deadline hit for {title}; merging {len(results)}/{len(links)} sources]")
+                    break
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, link = tasks[task]
+                try:
+                    product = task.result()
+                except Exception as e:
+                    print(f"[WARN] Failed to extract from {link}: {e}")
+                    publish("page_failed", title=title, url=link, error=str(e))
+                    continue
+                if product:
+                    results[index] = product
+                    publish("page_fetched", title=title, url=link)
+
+            merged = merge_products(results[i] for i in sorted(results))
+            best_done = min((ranks[i] for i in results), default=None)
+            best_pending = min((ranks[tasks[task][0]] for task in pending), default=None)
+            if is_complete(merged) and (best_pending is None or best_done < best_pending):
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if merged:
+        publish("sources_merged", title=title, sources=merged["Sources"], complete=is_complete(merged))
+    return merged
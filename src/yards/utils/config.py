@@ -1,3 +1,5 @@
+import os
+
 HOSTNAME = "127.0.0.1"
 USERNAME = "root1"
 PASSWORD = "123"
@@ -5,6 +7,169 @@ DATABASE = "retail"
 
 CONNECTED_CLIENTS = {}
 
+# ----------------------------------------------------------
+# LLM clients (see yards.utils.llm_client)
+# ----------------------------------------------------------
+DEFAULT_LLM_MODEL = "llama-3.1-8b-instant"
+
+LLM_MODELS = {
+    "llama-3.1-8b-instant": {
+        "temperature": 0,
+        "timeout": 60,        # seconds per request
+        "max_retries": 3,     # retries on 429 / 5xx / timeouts, with jittered backoff
+        "json_mode": True,    # supports response_format={"type": "json_object"}
+        "input_cost_per_million": 0.05,   # USD, for per-call cost reporting
+        "output_cost_per_million": 0.08,
+        "rpm": 30,            # per-key rate limits enforced by the router
+        "tpm": 6000,
+    },
+    "llama-3.3-70b-versatile": {
+        "temperature": 0,
+        "timeout": 90,
+        "max_retries": 3,
+        "json_mode": True,
+        "input_cost_per_million": 0.59,
+        "output_cost_per_million": 0.79,
+        "rpm": 30,
+        "tpm": 12000,
+    },
+}
+
+# Model routing (yards.utils.llm_router): task class -> models in order of preference.
+# Load spills to the next model (and key) when one is rate limited or failing.
+LLM_ROUTES = {
+    "classify": ["llama-3.1-8b-instant", "llama-3.3-70b-versatile"],  # brand disambiguation
+    "copy": ["llama-3.1-8b-instant", "llama-3.3-70b-versatile"],      # per-product listing copy
+    "extract": ["llama-3.3-70b-versatile", "llama-3.1-8b-instant"],   # full Shopify JSON extraction
+}
+LLM_ROUTER_MAX_ATTEMPTS = 6
+
+LLM_MAX_CONCURRENCY = 4          # in-flight LLM requests across the whole process
+LLM_HTTP_MAX_CONNECTIONS = 20
+LLM_HTTP_KEEPALIVE_SECONDS = 60
+LLM_RETRY_BASE_SECONDS = 1.0
+LLM_RETRY_MAX_SECONDS = 20.0
+
+# Per-request token budget (Groq free tier: 6000 TPM); scraped data fills what the prompt leaves
+LLM_REQUEST_TOKEN_BUDGET = 6000
+LLM_OUTPUT_TOKEN_RESERVE = 2000
+
+# ----------------------------------------------------------
+# Discovery pipeline
+# ----------------------------------------------------------
+READ_BATCH_ROWS = 200        # spreadsheet rows pulled from the reader thread at a time
+SCRAPE_CONCURRENCY = 4       # catalog rows scraped + extracted in parallel
+
+# Tiered page fetching: Shopify product JSON -> plain HTTP GET -> headless Chromium
+SCRAPE_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+SCRAPE_HTTP_TIMEOUT_SECONDS = 10
+SCRAPE_HTTP_MAX_CONNECTIONS = 50
+# A page is good enough (no browser needed) once these are filled
+REQUIRED_SCRAPE_FIELDS = ["Title", "Body (HTML)"]
+
+# Multi-source aggregation: top organic results per title, merged by source priority
+SERPER_SEARCH_URL = "https://google.serper.dev/search"
+SERPER_TIMEOUT_SECONDS = 10
+MAX_SOURCES_PER_TITLE = 3
+TITLE_DEADLINE_SECONDS = 45  # stop waiting on slow sources and merge what arrived
+JUNK_LINK_DOMAINS = ["youtube", "facebook", "reddit", "pinterest", "instagram"]
+TRUSTED_RETAILERS = [
+    "cricketstoreonline.com", "sportsuncle.com", "prodirectcricket.com",
+    "owisports.com", "itsjustcricket.co.uk",
+]
+# Category/listing pages rank below product pages (a product path inside one still counts as a product)
+LISTING_PATH_MARKERS = ["/collections/", "/category/", "/categories/", "/product-category/", "/search/"]
+PRODUCT_PATH_MARKERS = ["/products/", "/product/"]
+# A merged product stops waiting on lower-priority sources once these are filled
+MERGE_REQUIRED_FIELDS = ["Title", "Body (HTML)", "Image Src", "Variant Price"]
+
+# CPU-bound HTML parsing runs in this many worker processes (0 = parse on the event loop)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Headless rendering: per-site readiness strategies live on the site adapters
+PAGE_READY_TIMEOUT_MS = 8000
+BLOCKED_RESOURCE_TYPES = ["image", "font", "media"]
+BLOCKED_REQUEST_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googleadservices.com",
+    "facebook.net", "facebook.com", "connect.facebook.net", "hotjar.com", "clarity.ms",
+    "analytics.tiktok.com", "bat.bing.com", "snapchat.com", "klaviyo.com", "nr-data.net",
+]
+BROWSER_TIMEOUT_SECONDS = 40  # ceiling for one headless render; the adaptive timeout is usually far lower
+
+# Circuit breakers (yards.utils.resilience): one per dependency and key (LLM deployment,
+# search provider, site domain). Timeouts adapt to the observed latency percentiles
+# between min_timeout and max_timeout; "hedge" sends a second request once the first
+# is slower than HEDGE_PERCENTILE of recent calls.
+RESILIENCE_SETTINGS = {
+    "llm": {"min_timeout": 30, "max_timeout": 90, "failure_threshold": 3, "reset_seconds": 30, "hedge": False},
+    "search": {"min_timeout": 2, "max_timeout": SERPER_TIMEOUT_SECONDS, "failure_threshold": 5,
+               "reset_seconds": 30, "hedge": True},
+    "http": {"min_timeout": 3, "max_timeout": SCRAPE_HTTP_TIMEOUT_SECONDS, "failure_threshold": 3,
+             "reset_seconds": 60, "hedge": True},
+    "browser": {"min_timeout": 10, "max_timeout": BROWSER_TIMEOUT_SECONDS, "failure_threshold": 2,
+                "reset_seconds": 120, "hedge": False},
+}
+LATENCY_WINDOW = 200       # recent latencies kept per breaker
+LATENCY_MIN_SAMPLES = 10   # until then: max_timeout and no hedging
+TIMEOUT_PERCENTILE = 0.99
+TIMEOUT_MULTIPLIER = 2.0
+HEDGE_PERCENTILE = 0.95
+
+# ----------------------------------------------------------
+# Uploads
+# ----------------------------------------------------------
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 100 * 1024 * 1024))
+
+# Shutdown waits this long for an in-progress startup warm-up step to return
+WARM_UP_SHUTDOWN_TIMEOUT_SECONDS = 5
+
+# ----------------------------------------------------------
+# Job profiling (yards.utils.profiler): per upload with ?profile=true, or every job with YARDS_PROFILE=1
+# ----------------------------------------------------------
+PROFILE_JOBS = os.getenv("YARDS_PROFILE") == "1"
+PROFILE_INTERVAL_SECONDS = float(os.getenv("YARDS_PROFILE_INTERVAL", 0.01))
+PROFILE_MAX_DEPTH = 64
+PROFILE_DIR = os.path.join("uploads", "profiles")  # used when a job produced no output CSV
+
+# ----------------------------------------------------------
+# Provider stand-ins (yards.utils.fakes) for offline benchmarking (benchmarks/discovery_bench.py)
+# ----------------------------------------------------------
+LLM_PROVIDER = os.getenv("YARDS_LLM_PROVIDER", "groq")          # "groq" | "fake"
+SEARCH_PROVIDER = os.getenv("YARDS_SEARCH_PROVIDER", "serper")  # "serper" | "fake"
+PAGE_PROVIDER = os.getenv("YARDS_PAGE_PROVIDER", "http")        # "http" | "fake" (recorded/synthetic pages)
+RECORDINGS_DIR = os.getenv("YARDS_RECORDINGS_DIR", os.path.join("uploads", "recordings"))
+RECORD_SESSIONS = os.getenv("YARDS_RECORD_SESSIONS") == "1"    # append live LLM/Serper replies to RECORDINGS_DIR
+
+FAKE_PROVIDER_SETTINGS = {
+    "llm_latency_seconds": float(os.getenv("FAKE_LLM_LATENCY", 0.5)),   # time to first token
+    "llm_tokens_per_second": float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", 500)),
+    "search_latency_seconds": float(os.getenv("FAKE_SEARCH_LATENCY", 0.3)),
+    "page_latency_seconds": float(os.getenv("FAKE_PAGE_LATENCY", 0.2)),
+    "browser_latency_seconds": float(os.getenv("FAKE_BROWSER_LATENCY", 2.0)),
+    "latency_jitter": 0.2,                                               # +/- fraction of each latency
+    "error_rate_429": float(os.getenv("FAKE_429_RATE", 0)),             # injected 429s per request
+    "retry_after_seconds": 2,
+    "search_rpm": 300,
+    "seed": int(os.getenv("FAKE_SEED", 0)),
+}
+
+# ----------------------------------------------------------
+# Persistent caches
+# ----------------------------------------------------------
+CACHE_DIR = os.path.join("uploads", "cache")
+
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 50000
+
+# Bump when scraping/extraction logic changes so cached catalog results are not reused
+PIPELINE_VERSION = "2"
+
+# Input columns that, together with the normalized Title, decide whether a row changed
+ROW_FINGERPRINT_COLUMNS = ["SKU Code", "Main Category"]
+# Extracted rows are re-scraped after this long, and right away if they were stored incomplete
+ROW_RESULT_TTL_SECONDS = 7 * 24 * 3600
+
 SHOPIFY_HEADERS = [
     "Handle","Title","Body (HTML)","Vendor","Product Category","Type","Tags","Published",
     "Option1 Name","Option1 Value","Option2 Name","Option2 Value","Option3 Name","Option3 Value",
@@ -20,6 +185,45 @@ SHOPIFY_HEADERS = [
     "Compare At Price / International","Status"
 ]
 
+# Deterministic variant expansion (yards.utils.variants): values for every generated row
+VARIANT_ROW_DEFAULTS = {
+    "Published": "TRUE",
+    "Status": "active",
+    "Gift Card": "FALSE",
+    "Variant Inventory Policy": "deny",
+    "Variant Fulfillment Service": "manual",
+    "Variant Requires Shipping": "TRUE",
+    "Variant Taxable": "TRUE",
+}
+# The only fields the LLM writes for a product with structured variants, once per product
+PRODUCT_COPY_FIELDS = ["Body (HTML)", "SEO Title", "SEO Description", "Tags", "Product Category", "Type"]
+
+# Typed columns for Parquet / JSONL exports (yards.utils.exporters); the rest are text
+SHOPIFY_COLUMN_TYPES = {
+    "Variant Grams": "int", "Variant Inventory Qty": "int", "Image Position": "int",
+    "Variant Price": "float", "Variant Compare At Price": "float", "Cost per item": "float",
+    "Price / United States": "float", "Compare At Price / United States": "float",
+    "Price / International": "float", "Compare At Price / International": "float",
+    "Published": "bool", "Gift Card": "bool", "Variant Requires Shipping": "bool", "Variant Taxable": "bool",
+    "Google Shopping / Custom Product": "bool", "Included / United States": "bool",
+    "Included / International": "bool",
+}
+EXPORT_BATCH_ROWS = 10_000            # Parquet row group size, rows per conversion batch
+DOWNLOAD_CHUNK_BYTES = 256 * 1024     # streamed download chunk size
+
+# Catalog post-processing (yards.utils.postprocess): runs on the finished CSV before export
+POSTPROCESS_OUTPUT = os.getenv("YARDS_POSTPROCESS", "1") == "1"
+REQUIRED_SHOPIFY_VALUES = ["Handle", "Title", "Option1 Value", "Variant Price"]
+# Same on every row of a handle (filled from the first row that has them)
+PRODUCT_LEVEL_COLUMNS = [
+    "Title", "Body (HTML)", "Vendor", "Product Category", "Type", "Tags", "Published",
+    "Option1 Name", "Option2 Name", "Option3 Name", "SEO Title", "SEO Description", "Status",
+]
+WEIGHT_UNIT_GRAMS = {
+    "g": 1, "gm": 1, "gms": 1, "gram": 1, "grams": 1, "kg": 1000, "kgs": 1000,
+    "lb": 453.592, "lbs": 453.592, "oz": 28.3495,
+}
+
 PROMPT_TEMPLATES = {
    "get_product_urls": """
          You are an expert eCommerce research assistant.
@@ -54,167 +258,38 @@ PROMPT_TEMPLATES = {
          - Escape all double quotes (") as ".
    """,
    
+   "json_mode_suffix": """
+         - JSON mode is on: wrap the array in an object as {"products": [ ... ]}.
+   """,
+
+   "repair_products": """
+         Some product objects from your previous JSON answer were invalid or cut off.
+         Return ONLY the corrected or missing product objects as a JSON array, using the same Shopify fields.
+         Do not repeat products that are listed as already extracted.
+   """,
+
+   "product_copy": """
+         You are an eCommerce copywriter and SEO specialist for a cricket equipment store.
+         You get one scraped product as JSON. Write its Shopify listing copy and return ONE JSON object with exactly these keys:
+         - "Body (HTML)": the product description as one clean <p>...</p> line, no newlines, based only on the scraped facts.
+         - "SEO Title": at most 70 characters.
+         - "SEO Description": at most 320 characters, plain text.
+         - "Tags": comma-separated keywords (brand, type, material, player level).
+         - "Product Category": Shopify product category path, e.g. "Sporting Goods > Athletics > Cricket > Cricket Bats".
+         - "Type": short product type, e.g. "Cricket Bat".
+         Do not invent prices, SKUs or specifications. Return pure JSON only.
+   """,
+
    "user_prompt_prod_details": """
-        You are an intelligent eCommerce data extraction and structuring assistant.
-
-        Your task is to extract and return complete Shopify-compatible product JSON data, ensuring that each product variant becomes a separate, fully populated product JSON object in the output array.
-
-        ---
-
-        1️⃣ Identify Reliable Product Source  
-        For each product title:  
-        - **Preferred:** Identify the correct brand and use only its official domain:  
-          • SG → https://www.sgcricket.com/  
-          • Kookaburra → https://www.kookaburra.biz/  
-          • Gray-Nicolls → https://www.gray-nicolls.co.uk/  
-          • MRF → https://www.mrfsports.com/  
-          • SS → https://www.sstoncricket.com/  
-        - **Fallback:** If no brand domain matches or is inaccessible, search and extract from other **trustworthy e-commerce sites** such as:  
-          • https://www.cricketstoreonline.com/  
-          • https://www.sportsuncle.com/  
-          • https://www.prodirectcricket.com/  
-          • https://www.owisports.com/  
-          • https://www.itsjustcricket.co.uk/  
-          • https://www.amazon.in/ (only if official or manufacturer listings are unavailable)  
-        - Skip completely if no reliable data is found.
-
-        ---
-
-        2️⃣ Extract Product Details  
-        From the chosen reliable site, extract or infer:  
-        - Core Fields: Title, Vendor, Product Category, Type, Tags  
-        - Variant Fields: Size, Color, Weight, Model, Edition, Grade, Profile, Age Group  
-        - Pricing & Inventory: SKU, Price, Compare At Price, Inventory, Barcode, Weight, Tax  
-        - SEO: SEO Title, SEO Description  
-        - Images: Main product images + variant-specific images  
-        If a field is unavailable, leave it empty ("") or [].
-
-        ---
-
-        3️⃣ Body (HTML)  
-        - Wrap product description inside a single <p> tag.  
-        - It should be valid HTML (<p> ... </p>).  
-        - Remove newlines, extra whitespace, and invisible characters like Â or \u00A0.  
-        - Escape double quotes ( " → \" ).  
-        - The final description must be one clean HTML line.
-
-        ---
-
-        4️⃣ Handle (Slug)  
-        If not available, generate it by:  
-        1. Lowercasing the title.  
-        2. Replacing all non-alphanumeric characters with "-".  
-        3. Trimming leading and trailing hyphens.  
-        Example: SG RP 250 English Willow Str8bat → sg-rp-250-english-willow-str8bat
-
-        ---
-
-        5️⃣ Variant Expansion Rules (Critical)  
-        Step 1: Detect Options  
-        Identify all available options — e.g.,  
-        "Option1 Name": "Size" with values ["SH", "6", "5"],  
-        "Option2 Name": "Color" with values ["Blue", "Red"], etc.  
-
-        Step 2: Expand Variants  
-        For every combination of option values (cartesian product), generate a separate full product JSON object.  
-        Each variant object must include all shared product-level fields and replace only variant-specific ones (Option values, SKU, Price, Barcode, Variant Image, etc.)
-
-        Example:  
-        Size → ["SH", "6", "5"] → 3 variant objects.  
-        Size × Color → 3 × 2 → 6 variant objects.
-
-        Each variant JSON must be independent and complete.
-
-        ---
-
-        6️⃣ Image Extraction  
-        - Only include valid absolute URLs (http/https).  
-        - Convert relative paths to absolute using site domain.  
-        - Exclude placeholder or broken images.  
-        - Always include main product image in "Image Src".  
-        - Include variant-specific image in "Variant Image" if available.
-
-        ---
-
-        7️⃣ SEO & Categorization  
-        Extract or derive:  
-        - SEO Title, SEO Description  
-        - Product Category (from breadcrumbs or URL path)  
-        - Google Shopping attributes: Gender, Age Group, Condition, MPN  
-        Leave blank if unavailable.
-
-        ---
-
-        8️⃣ Output Format  
-        Return only a **valid JSON array** (no Markdown, no commentary).  
-        Each element represents one variant object in this structure:
-
-        [
-          {
-            "Handle": "",
-            "Title": "",
-            "Body (HTML)": "",
-            "Vendor": "",
-            "Product Category": "",
-            "Type": "",
-            "Tags": "",
-            "Published": "",
-            "Option1 Name": "",
-            "Option1 Value": "",
-            "Option2 Name": "",
-            "Option2 Value": "",
-            "Option3 Name": "",
-            "Option3 Value": "",
-            "Variant SKU": "",
-            "Variant Grams": "",
-            "Variant Inventory Tracker": "",
-            "Variant Inventory Qty": "",
-            "Variant Inventory Policy": "",
-            "Variant Fulfillment Service": "",
-            "Variant Price": "",
-            "Variant Compare At Price": "",
-            "Variant Requires Shipping": "",
-            "Variant Taxable": "",
-            "Variant Barcode": "",
-            "Image Src": [],
-            "Image Position": "",
-            "Image Alt Text": "",
-            "Gift Card": "",
-            "SEO Title": "",
-            "SEO Description": "",
-            "Google Shopping / Google Product Category": "",
-            "Google Shopping / Gender": "",
-            "Google Shopping / Age Group": "",
-            "Google Shopping / MPN": "",
-            "Google Shopping / Condition": "",
-            "Google Shopping / Custom Product": "",
-            "Variant Image": [],
-            "Variant Weight Unit": "",
-            "Variant Tax Code": "",
-            "Cost per item": "",
-            "Included / United States": "",
-            "Price / United States": "",
-            "Compare At Price / United States": "",
-            "Included / International": "",
-            "Price / International": "",
-            "Compare At Price / International": "",
-            "Status": ""
-          }
-        ]
-
-        ---
-
-        9️⃣ Output Formatting Rules  
-        - Return **pure JSON only** — no Markdown or explanations.  
-        - Each variant = one complete JSON object.  
-        - Duplicate shared fields across all variants.  
-        - Always validate JSON structure before returning.  
-        - Ensure no stray or invalid characters (like Â, Â , or \u00A0).
-
-        ---
-
-        🔟 Final Instruction  
-        Now process the following product titles and return **only the JSON array** as described above — ensuring each variant combination becomes a separate, clean, valid product JSON object.
+         Turn the scraped product data in the user message into Shopify product rows.
 
+         Rules:
+         - One object per variant: every combination of option values gets its own object, with the shared product fields repeated on each.
+         - Options: Size → Option1; Color → Option2; Grade, Edition or Profile → Option1 when there is no Size. Fill both "OptionN Name" and "OptionN Value".
+         - Body (HTML): one clean <p>...</p> line; no newlines, Â or \u00A0.
+         - Handle: the page's handle, else the lowercased title with every non-alphanumeric run replaced by "-" and no leading/trailing "-".
+         - Images: absolute http(s) URLs only; main image in "Image Src", variant image in "Variant Image".
+         - Product Category, SEO and Google Shopping fields: from breadcrumbs, URL path or meta tags, else blank.
+         - Use only the scraped data. Leave anything unknown blank; never invent prices or SKUs.
    """
 }
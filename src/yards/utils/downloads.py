@@ -0,0 +1,109 @@
+import os
+import re
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+from yards.utils.config import DOWNLOAD_CHUNK_BYTES
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+GZIP_PATTERN = re.compile(r"(?:^|,)\s*(?:gzip|\*)\s*(?:;\s*q=(?P<q>[0-9.]+))?\s*(?:,|$)")
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+class FileChanged(OSError):
+    """The file was rewritten after its response headers were built."""
+
+
+def parse_range(header, size):
+    """A single `bytes=start-end` Range header -> inclusive (start, end), or None for the whole file.
+
+    Multi-range and malformed headers are ignored (the whole file is sent),
+    as RFC 9110 allows.
+    """
+    match = RANGE_PATTERN.match((header or "").strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+def file_validators(stat):
+    """ETag (size + mtime) and Last-Modified headers for an os.stat result."""
+    return {
+        "ETag": f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+
+
+def if_range_matches(header, validators):
+    """Whether a Range may be honoured under `If-Range` (absent header = yes).
+
+    The file is rewritten in place (partial output, post-processing), so a
+    resumed download must only get a range of the version it started on;
+    otherwise the whole file is sent (RFC 9110 13.1.5).
+    """
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith(('"', "W/")):
+        # Strong comparison: weak tags never match
+        return header == validators["ETag"]
+    try:
+        return parsedate_to_datetime(header) == parsedate_to_datetime(validators["Last-Modified"])
+    except (TypeError, ValueError):
+        return False
+
+
+def accepts_gzip(header):
+    match = GZIP_PATTERN.search((header or "").lower())
+    return bool(match) and (match.group("q") is None or float(match.group("q")) > 0)
+
+
+def iter_file(source, start=0, end=None, chunk_size=DOWNLOAD_CHUNK_BYTES):
+    """Yield bytes start..end (inclusive) of a file (a path or an open binary file) without loading it whole."""
+    with (open(source, "rb") if isinstance(source, (str, os.PathLike)) else source) as f:
+        f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def iter_file_version(path, stat, start=0, end=None, chunk_size=DOWNLOAD_CHUNK_BYTES, strict=True):
+    """iter_file for the version of `path` that `stat` (and so the response headers) describes.
+
+    The file is only opened once the body starts streaming, so a response
+    that is never sent holds no handle. With `strict`, a file rewritten in
+    between raises FileChanged rather than mixing versions; without it, a
+    file that only grew (a running job's CSV) is read up to `end`.
+    """
+    with open(path, "rb") as f:
+        current = os.fstat(f.fileno())
+        if strict and (current.st_size, current.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            raise FileChanged(path)
+        yield from iter_file(f, start, end, chunk_size)
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a byte stream on the fly (Content-Encoding: gzip)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+import json
+import time
+from collections import deque
+
+EVENT_HISTORY = 500           # events replayed to late subscribers
+EVENT_QUEUE_SIZE = 1000       # per-subscriber backlog before events are dropped
+EVENT_RETENTION_SECONDS = 900 # keep a finished job's channel around for late readers
+
+# Job the current task is working for; inherited by tasks spawned from it
+CURRENT_JOB = contextvars.ContextVar("current_job", default=None)
+
+TERMINAL_STAGES = {"job_completed", "job_failed"}
+
+
+class JobChannel:
+    """In-process pub/sub channel carrying the progress events of one job."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.history = deque(maxlen=EVENT_HISTORY)
+        self.latest = {}
+        self.subscribers = set()
+        self.closed = False
+
+    def publish(self, event):
+        self.history.append(event)
+        self.latest[event["stage"]] = event
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass  # slow reader: drop rather than stall the pipeline
+        if event["stage"] in TERMINAL_STAGES:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+    async def subscribe(self):
+        """Yield past events, then live ones until the job finishes."""
+        queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        backlog = list(self.history)
+        self.subscribers.add(queue)
+        try:
+            for event in backlog:
+                yield event
+            if self.closed:
+                return
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self.subscribers.discard(queue)
+
+
+CHANNELS = {}
+
+
+def get_channel(job_id, create=True):
+    channel = CHANNELS.get(job_id)
+    if channel is None and create:
+        channel = CHANNELS[job_id] = JobChannel(job_id)
+    return channel
+
+
+def publish(stage, job_id=None, **data):
+    """Publish a progress event for `job_id` (defaults to the job of the current task)."""
+    job_id = job_id or CURRENT_JOB.get()
+    if job_id is None:
+        return
+    channel = get_channel(job_id)
+    channel.publish({"job_id": job_id, "stage": stage, "ts": time.time(), **data})
+    if stage in TERMINAL_STAGES:
+        try:
+            asyncio.get_running_loop().call_later(EVENT_RETENTION_SECONDS, CHANNELS.pop, job_id, None)
+        except RuntimeError:
+            pass
+
+
+def format_sse(event):
+    return f"event: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+async def sse_stream(job_id, keepalive_seconds=15, final_event=None):
+    """Server-sent event stream for a job, with comment keep-alives while idle.
+
+    `final_event` is given for a job that has already finished: if its
+    channel has been evicted, that one terminal event is sent and the
+    stream ends instead of waiting on a channel nobody will publish to.
+    """
+    channel = get_channel(job_id, create=final_event is None)
+    if channel is None:
+        yield format_sse(final_event)
+        return
+    events = channel.subscribe().__aiter__()
+    next_event = asyncio.ensure_future(events.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_event}, timeout=keepalive_seconds)
+            if not done:
+                yield ": keep-alive\n\n"
+                continue
+            try:
+                event = next_event.result()
+            except StopAsyncIteration:
+                return
+            yield format_sse(event)
+            next_event = asyncio.ensure_future(events.__anext__())
+    finally:
+        next_event.cancel()
+        try:
+            await next_event
+        except (asyncio.CancelledError, StopAsyncIteration):
+            pass
+        await events.aclose()
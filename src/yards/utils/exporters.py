@@ -0,0 +1,217 @@
+import csv
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from importlib.util import find_spec
+from yards.utils.config import SHOPIFY_HEADERS, SHOPIFY_COLUMN_TYPES, EXPORT_BATCH_ROWS
+
+TRUE_VALUES = {"true", "yes", "1", "y"}
+FALSE_VALUES = {"false", "no", "0", "n"}
+
+
+class ExportUnavailable(ValueError):
+    """Unknown export format, or its optional dependency isn't installed."""
+
+
+# ----------------------------------------------------------
+# Values
+# ----------------------------------------------------------
+def flatten_value(value):
+    """Lists (tags, images) become the comma-joined text Shopify expects."""
+    return ", ".join(map(str, value)) if isinstance(value, list) else value
+
+
+def to_number(value, kind):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = value
+    else:
+        text = str(value).replace(",", "").strip()
+        if not text:
+            return None
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+    if number != number:  # NaN
+        return None
+    return int(number) if kind == "int" else float(number)
+
+
+def to_bool(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    return None
+
+
+def typed_row(item):
+    """One product dict -> every SHOPIFY_HEADERS column with its export type."""
+    row = {}
+    for column in SHOPIFY_HEADERS:
+        value = flatten_value(item.get(column))
+        kind = SHOPIFY_COLUMN_TYPES.get(column, "str")
+        if kind in ("int", "float"):
+            row[column] = to_number(value, kind)
+        elif kind == "bool":
+            row[column] = to_bool(value)
+        else:
+            row[column] = None if value is None or value == "" else str(value)
+    return row
+
+
+# ----------------------------------------------------------
+# Exporters: write(products) as they are produced, close() once
+# ----------------------------------------------------------
+class CsvExporter:
+    extension = ".csv"
+    media_type = "text/csv"
+    compressible = True
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=SHOPIFY_HEADERS)
+        self._writer.writeheader()
+
+    def write(self, products):
+        for item in products:
+            if isinstance(item, dict):
+                self._writer.writerow({key: flatten_value(value) for key, value in item.items()})
+        # Flushed per batch so /result can serve a partial CSV while the job runs
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlGzExporter:
+    extension = ".jsonl.gz"
+    media_type = "application/gzip"
+    compressible = False
+
+    def __init__(self, path):
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+
+    def write(self, products):
+        for item in products:
+            if isinstance(item, dict):
+                self._file.write(json.dumps(typed_row(item), ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    types = {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "str": pa.string()}
+    return pa.schema([(column, types[SHOPIFY_COLUMN_TYPES.get(column, "str")]) for column in SHOPIFY_HEADERS])
+
+
+class ParquetExporter:
+    extension = ".parquet"
+    media_type = "application/vnd.apache.parquet"
+    compressible = False  # zstd-compressed column chunks already
+
+    def __init__(self, path):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self._schema = parquet_schema()
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+        self._pending = []
+
+    def _flush(self):
+        import pyarrow as pa
+
+        if self._pending:
+            self._writer.write_table(pa.Table.from_pylist(self._pending, schema=self._schema))
+            self._pending = []
+
+    def write(self, products):
+        self._pending.extend(typed_row(item) for item in products if isinstance(item, dict))
+        if len(self._pending) >= EXPORT_BATCH_ROWS:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+EXPORTERS = {
+    "csv": CsvExporter,
+    "jsonl": JsonlGzExporter,
+    "parquet": ParquetExporter,
+}
+OPTIONAL_DEPENDENCIES = {"parquet": "pyarrow"}
+
+
+def available_formats():
+    return [name for name in EXPORTERS
+            if name not in OPTIONAL_DEPENDENCIES or find_spec(OPTIONAL_DEPENDENCIES[name])]
+
+
+def get_exporter_class(fmt):
+    fmt = (fmt or "csv").lower()
+    if fmt not in EXPORTERS:
+        raise ExportUnavailable(f"Unknown export format {fmt!r} (choose from {', '.join(EXPORTERS)})")
+    if fmt not in available_formats():
+        raise ExportUnavailable(f"{fmt} export needs {OPTIONAL_DEPENDENCIES[fmt]} installed")
+    return EXPORTERS[fmt]
+
+
+def parse_formats(value):
+    """"parquet,jsonl" -> ["parquet", "jsonl"], validated; CSV is always written and not listed."""
+    formats = [fmt.strip().lower() for fmt in (value or "").split(",") if fmt.strip()]
+    for fmt in formats:
+        get_exporter_class(fmt)
+    return [fmt for fmt in dict.fromkeys(formats) if fmt != "csv"]
+
+
+def export_path(output_file, fmt):
+    """Sibling of the job's CSV for another format: catalog.csv -> catalog.parquet."""
+    return os.path.splitext(output_file)[0] + get_exporter_class(fmt).extension
+
+
+@contextmanager
+def open_exporters(output_file, formats=()):
+    """The job's CSV exporter plus one exporter per extra format, keyed by format; closed on exit."""
+    exporters = {"csv": CsvExporter(output_file)}
+    try:
+        for fmt in formats:
+            exporters[fmt] = get_exporter_class(fmt)(export_path(output_file, fmt))
+        yield exporters
+    finally:
+        # CSV first, so the other formats never look older than it (see convert_csv)
+        for exporter in exporters.values():
+            exporter.close()
+
+
+def convert_csv(output_file, fmt):
+    """Re-export a finished job's CSV in another format (reused when already up to date)."""
+    path = export_path(output_file, fmt)
+    if fmt == "csv" or (os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(output_file)):
+        return path
+
+    exporter = get_exporter_class(fmt)(f"{path}.part")
+    try:
+        with open(output_file, newline="", encoding="utf-8") as f:
+            batch = []
+            for row in csv.DictReader(f):
+                batch.append(row)
+                if len(batch) >= EXPORT_BATCH_ROWS:
+                    exporter.write(batch)
+                    batch = []
+            exporter.write(batch)
+    finally:
+        exporter.close()
+    os.replace(f"{path}.part", path)
+    return path
@@ -0,0 +1,336 @@
+# In-process stand-ins for Groq, Serper and product pages, for offline benchmarking.
+#
+# Selected with YARDS_LLM_PROVIDER / YARDS_SEARCH_PROVIDER / YARDS_PAGE_PROVIDER=fake.
+# They replay replies recorded from live sessions (YARDS_RECORD_SESSIONS=1 appends
+# them to RECORDINGS_DIR) and synthesize small valid replies otherwise, with
+# configurable latency, server-side rate limits and injected 429s
+# (FAKE_PROVIDER_SETTINGS).
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from yards.utils.config import FAKE_PROVIDER_SETTINGS, RECORDINGS_DIR, PROMPT_TEMPLATES, LLM_MODELS
+from yards.utils.prompts import count_tokens
+from yards.utils.variants import make_handle
+
+LLM_RECORDINGS = "llm.jsonl"
+SEARCH_RECORDINGS = "search.jsonl"
+PAGE_RECORDINGS = "pages.jsonl"
+PAGE_FILES_DIR = "pages"
+
+
+# ----------------------------------------------------------
+# Recording / replay
+# ----------------------------------------------------------
+_record_lock = threading.Lock()
+
+
+def exchange_key(*parts):
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def llm_key(messages):
+    return exchange_key(*[message.content for message in messages])
+
+
+def record_exchange(filename, record, directory=RECORDINGS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _record_lock, open(os.path.join(directory, filename), "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def record_llm_exchange(messages, content, model_name):
+    record_exchange(LLM_RECORDINGS, {"key": llm_key(messages), "model": model_name, "content": content})
+
+
+def record_search(query, organic):
+    record_exchange(SEARCH_RECORDINGS, {"key": exchange_key(query), "query": query, "organic": organic})
+
+
+def record_page(url, content_type, body):
+    """Save a fetched page body under RECORDINGS_DIR/pages and index it by URL."""
+    key = exchange_key(url)
+    extension = "json" if "json" in content_type or "javascript" in content_type else "html"
+    filename = f"{PAGE_FILES_DIR}/{key[:16]}.{extension}"
+    os.makedirs(os.path.join(RECORDINGS_DIR, PAGE_FILES_DIR), exist_ok=True)
+    with open(os.path.join(RECORDINGS_DIR, filename), "w", encoding="utf-8") as f:
+        f.write(body)
+    record_exchange(PAGE_RECORDINGS, {"key": key, "url": url, "content_type": content_type, "file": filename})
+
+
+@lru_cache(maxsize=None)
+def load_recordings(filename, directory=RECORDINGS_DIR):
+    """{key: record} from a recordings file; later lines win."""
+    recordings = {}
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        return recordings
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            recordings[record.get("key")] = record
+    return recordings
+
+
+# ----------------------------------------------------------
+# Errors, limits, latency
+# ----------------------------------------------------------
+class FakeHTTPResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeAPIError(Exception):
+    """Shaped like the SDK errors: `status_code` plus a `response` with headers."""
+
+    def __init__(self, status_code, message, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = FakeHTTPResponse(status_code, headers)
+
+
+class FakeRateLimiter:
+    """Server-side sliding-window RPM/TPM limit answering 429 when exceeded."""
+
+    def __init__(self, rpm=None, tpm=None, window=60):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.requests = deque()  # (timestamp, tokens)
+        self._lock = threading.Lock()
+
+    def check(self, tokens=0):
+        now = time.monotonic()
+        with self._lock:
+            while self.requests and now - self.requests[0][0] >= self.window:
+                self.requests.popleft()
+            over_rpm = self.rpm and len(self.requests) >= self.rpm
+            over_tpm = self.tpm and sum(spent for _, spent in self.requests) + tokens > self.tpm
+            if over_rpm or over_tpm:
+                retry_after = self.requests[0][0] + self.window - now if self.requests else 1
+                raise FakeAPIError(429, "rate limit exceeded", retry_after=max(round(retry_after, 2), 0.01))
+            self.requests.append((now, tokens))
+
+
+@lru_cache(maxsize=None)
+def get_rng():
+    return random.Random(FAKE_PROVIDER_SETTINGS["seed"])
+
+
+def jittered(seconds, settings=FAKE_PROVIDER_SETTINGS):
+    spread = settings["latency_jitter"]
+    return max(seconds * (1 + get_rng().uniform(-spread, spread)), 0)
+
+
+def maybe_inject_429(settings=FAKE_PROVIDER_SETTINGS):
+    if settings["error_rate_429"] and get_rng().random() < settings["error_rate_429"]:
+        raise FakeAPIError(429, "injected rate limit", retry_after=settings["retry_after_seconds"])
+
+
+# ----------------------------------------------------------
+# Synthesized replies (no recording for the request)
+# ----------------------------------------------------------
+def synthesize_reply(system_prompt, user_input):
+    if "brand name" in system_prompt:
+        product = re.search(r'Product: "(.*)"', user_input)
+        brands = re.search(r"Possible brands: (.*)", user_input)
+        candidates = brands.group(1).split(", ") if brands else []
+        name = product.group(1).lower() if product else ""
+        return next((brand for brand in candidates if brand.lower() in name), candidates[0] if candidates else "")
+
+    if PROMPT_TEMPLATES["product_copy"].strip() in system_prompt:
+        try:
+            facts = json.loads(user_input)
+        except ValueError:
+            facts = {}
+        title = facts.get("Title") or "Product"
+        return json.dumps({
+            "Body (HTML)": f"<p>{facts.get('Description') or title}</p>",
+            "SEO Title": title[:70],
+            "SEO Description": (facts.get("Description") or title)[:320],
+            "Tags": ", ".join(filter(None, [facts.get("Vendor"), facts.get("Type"), "Cricket"])),
+            "Product Category": "Sporting Goods > Athletics > Cricket",
+            "Type": facts.get("Type") or "Cricket Equipment",
+        }, ensure_ascii=False)
+
+    # Product extraction: one object built from whatever title the scraped data carries
+    title = re.search(r"""['"]Title['"]:\s*['"]([^'"]+)""", user_input)
+    price = re.search(r"""['"]Variant Price['"]:\s*['"]?([\d.]+)""", user_input)
+    title = title.group(1) if title else "Product"
+    product = {"Handle": make_handle(title), "Title": title, "Variant Price": price.group(1) if price else ""}
+    return json.dumps({"products": [product]}, ensure_ascii=False)
+
+
+def synthesize_results(query, num):
+    site = re.search(r"site:(\S+)", query)
+    host = site.group(1) if site else "fake-shop.test"
+    slug = make_handle(re.sub(r"\s*site:\S+", "", query))
+    return [
+        {"title": query, "link": f"https://{host}/products/{slug}{f'-{i}' if i else ''}", "position": i + 1}
+        for i in range(num)
+    ]
+
+
+def synthesize_page(url):
+    """(content type, body) for a product URL nobody recorded.
+
+    Shopify `.js` URLs on the Shopify adapter's domains get product JSON with
+    two size variants; everything else an HTML page with a JSON-LD Product.
+    """
+    from urllib.parse import urlsplit
+    from yards.utils.site_adapters import ShopifyAdapter
+
+    parts = urlsplit(url)
+    host = parts.netloc.lower().removeprefix("www.")
+    handle = parts.path.rstrip("/").rsplit("/", 1)[-1].removesuffix(".js")
+    title = handle.replace("-", " ").title() or "Product"
+    price = 1000 + int(exchange_key(url)[:4], 16) % 9000
+
+    if parts.path.endswith(".js"):
+        if host not in ShopifyAdapter.domains:
+            return None
+        return "application/json", json.dumps({
+            "title": title, "handle": handle, "vendor": host.split(".")[0].upper(),
+            "description": f"<p>{title} for club and academy players.</p>",
+            "type": "Cricket Equipment", "tags": ["cricket"], "price": price * 100,
+            "images": [f"//{host}/cdn/{handle}.jpg"], "options": [{"name": "Size"}],
+            "variants": [
+                {"sku": f"{handle[:12]}-{size}".upper(), "price": price * 100, "public_title": size,
+                 "option1": size, "available": True, "weight": 1200}
+                for size in ("SH", "LH")
+            ],
+        })
+
+    product = {
+        "@context": "https://schema.org", "@type": "Product", "name": title,
+        "description": f"{title} for club and academy players.",
+        "image": [f"https://{host}/images/{handle}.jpg"],
+        "offers": {"@type": "Offer", "price": str(price), "priceCurrency": "INR"},
+    }
+    return "text/html; charset=utf-8", (
+        f'<html><head><title>{title}</title>'
+        f'<meta property="og:title" content="{title}">'
+        f'<meta name="description" content="{product["description"]}">'
+        f'<script type="application/ld+json">{json.dumps(product)}</script>'
+        f'</head><body><h1>{title}</h1><span class="price">₹{price}</span></body></html>'
+    )
+
+
+def fixture_page(url):
+    """(status, content type, body) for a URL: recorded snapshot, else synthesized."""
+    recorded = load_recordings(PAGE_RECORDINGS).get(exchange_key(url))
+    if recorded:
+        with open(os.path.join(RECORDINGS_DIR, recorded["file"]), encoding="utf-8") as f:
+            return 200, recorded["content_type"], f.read()
+    page = synthesize_page(url)
+    if page is None:
+        return 404, "text/html", "<html><body>Not found</body></html>"
+    return 200, *page
+
+
+@lru_cache(maxsize=None)
+def fixture_transport():
+    """httpx transport serving fixture_page() with simulated network latency."""
+    import httpx
+
+    settings = FAKE_PROVIDER_SETTINGS
+
+    async def handler(request):
+        await asyncio.sleep(jittered(settings["page_latency_seconds"], settings))
+        status, content_type, body = fixture_page(str(request.url))
+        return httpx.Response(status, headers={"content-type": content_type}, text=body)
+
+    return httpx.MockTransport(handler)
+
+
+async def fake_rendered_page(url, settings=FAKE_PROVIDER_SETTINGS):
+    """Browser-tier stand-in: the fixture HTML after a render-sized delay."""
+    await asyncio.sleep(jittered(settings["browser_latency_seconds"], settings))
+    status, content_type, body = fixture_page(url)
+    return body if status == 200 and "html" in content_type else None
+
+
+# ----------------------------------------------------------
+# LLM stand-in
+# ----------------------------------------------------------
+class FakeMessage:
+    type = "ai"
+
+    def __init__(self, content, usage_metadata, response_metadata):
+        self.content = content
+        self.usage_metadata = usage_metadata
+        self.response_metadata = response_metadata
+
+
+class FakeChatModel:
+    """Drop-in for the ChatGroq client as used by call_llm (`bind` + `ainvoke`).
+
+    Each (model, key) gets the model's configured RPM/TPM, so the router
+    and retry logic see realistic 429s. Latency is time to first token
+    plus output tokens at `llm_tokens_per_second`.
+    """
+
+    def __init__(self, model_name, api_key=None, temperature=0, settings=FAKE_PROVIDER_SETTINGS):
+        self.model_name = model_name
+        self.temperature = temperature
+        self.settings = settings
+        config = LLM_MODELS.get(model_name, {})
+        self.limiter = FakeRateLimiter(config.get("rpm"), config.get("tpm"))
+
+    def bind(self, **kwargs):
+        return self  # replies are JSON either way
+
+    async def ainvoke(self, messages):
+        system_prompt, user_input = messages[0].content, messages[-1].content
+        recorded = load_recordings(LLM_RECORDINGS).get(llm_key(messages))
+        content = recorded["content"] if recorded else synthesize_reply(system_prompt, user_input)
+        input_tokens = count_tokens(system_prompt) + count_tokens(user_input)
+        output_tokens = count_tokens(content)
+
+        maybe_inject_429(self.settings)
+        self.limiter.check(input_tokens + output_tokens)
+        await asyncio.sleep(
+            jittered(self.settings["llm_latency_seconds"], self.settings)
+            + output_tokens / self.settings["llm_tokens_per_second"]
+        )
+        return FakeMessage(
+            content,
+            {"input_tokens": input_tokens, "output_tokens": output_tokens,
+             "total_tokens": input_tokens + output_tokens},
+            {"model_name": self.model_name, "fake": True, "recorded": recorded is not None},
+        )
+
+
+# ----------------------------------------------------------
+# Search stand-in
+# ----------------------------------------------------------
+class FakeSearch:
+    def __init__(self, settings=FAKE_PROVIDER_SETTINGS):
+        self.settings = settings
+        self.limiter = FakeRateLimiter(rpm=settings["search_rpm"])
+
+    async def search(self, query, num):
+        maybe_inject_429(self.settings)
+        self.limiter.check()
+        await asyncio.sleep(jittered(self.settings["search_latency_seconds"], self.settings))
+        recorded = load_recordings(SEARCH_RECORDINGS).get(exchange_key(query))
+        if recorded:
+            return recorded["organic"][:num]
+        return synthesize_results(query, num)
+
+
+@lru_cache(maxsize=None)
+def get_fake_search():
+    return FakeSearch()
@@ -0,0 +1,169 @@
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+from yards.utils.config import (
+    SCRAPE_USER_AGENT,
+    SCRAPE_HTTP_TIMEOUT_SECONDS,
+    SCRAPE_HTTP_MAX_CONNECTIONS,
+    REQUIRED_SCRAPE_FIELDS,
+    PAGE_PROVIDER,
+    RECORD_SESSIONS,
+)
+from yards.utils.resilience import get_breaker, domain_of, is_unhealthy
+
+SHOPIFY_PRODUCT_PATH = re.compile(r"^(?P<prefix>.*?/products/)(?P<handle>[^/?#.]+)")
+
+
+# ----------------------------------------------------------
+# Pooled HTTP client
+# ----------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_scrape_client():
+    import httpx
+
+    transport = None
+    if PAGE_PROVIDER == "fake":
+        from yards.utils.fakes import fixture_transport
+
+        transport = fixture_transport()
+
+    return httpx.AsyncClient(
+        transport=transport,
+        headers={
+            "User-Agent": SCRAPE_USER_AGENT,
+            "Accept-Language": "en-US,en;q=0.9",
+        },
+        follow_redirects=True,
+        timeout=SCRAPE_HTTP_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=SCRAPE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=SCRAPE_HTTP_MAX_CONNECTIONS,
+        ),
+    )
+
+
+async def close_scrape_client():
+    if get_scrape_client.cache_info().currsize:
+        await get_scrape_client().aclose()
+
+
+def _record_page(url, content_type, body):
+    from yards.utils.fakes import record_page
+
+    try:
+        record_page(url, content_type, body)
+    except Exception as e:
+        print(f"[⚠️ Could not record {url}] {e}")
+
+
+def has_required_fields(product):
+    """True when a scraped product is complete enough to skip the browser."""
+    if not product:
+        return False
+    if any(not product.get(field) for field in REQUIRED_SCRAPE_FIELDS):
+        return False
+    return bool(product.get("Variant Price") or product.get("Variants"))
+
+
+# ----------------------------------------------------------
+# Tier 1: Shopify product JSON
+# ----------------------------------------------------------
+def shopify_product_json_url(url):
+    """`/products/<handle>` page URL -> `/products/<handle>.js`, else None."""
+    parts = urlsplit(url)
+    match = SHOPIFY_PRODUCT_PATH.match(parts.path)
+    if not match:
+        return None
+    path = f"{match.group('prefix')}{match.group('handle')}.js"
+    return urlunsplit((parts.scheme, parts.netloc, path, "", ""))
+
+
+def _from_cents(value):
+    return value / 100 if isinstance(value, (int, float)) else value
+
+
+def _absolute(src):
+    if isinstance(src, str) and src.startswith("//"):
+        return f"https:{src}"
+    return src
+
+
+def product_from_shopify_json(data, url):
+    """Map Shopify's /products/<handle>.js payload onto the scraped-product shape."""
+    options = [o.get("name") if isinstance(o, dict) else o for o in data.get("options") or []]
+
+    variants = []
+    for variant in data.get("variants") or []:
+        featured = variant.get("featured_image") or {}
+        variants.append({
+            "Variant Name": variant.get("name") or data.get("title"),
+            "Variant SKU": variant.get("sku"),
+            "Variant Price": _from_cents(variant.get("price")),
+            "Variant Compare At Price": _from_cents(variant.get("compare_at_price")),
+            "Size": variant.get("public_title"),
+            "Option1": variant.get("option1"),
+            "Option2": variant.get("option2"),
+            "Option3": variant.get("option3"),
+            "Variant Barcode": variant.get("barcode"),
+            "Variant Grams": variant.get("weight"),
+            "Variant Image": _absolute(featured.get("src")) if isinstance(featured, dict) else None,
+            "Available": variant.get("available"),
+            "Vendor": data.get("vendor"),
+        })
+
+    description = data.get("description") or ""
+    return {
+        "Source URL": url,
+        "Title": data.get("title"),
+        "Body (HTML)": description,
+        "Vendor": data.get("vendor"),
+        "Type": data.get("type"),
+        "Tags": data.get("tags") or [],
+        "Handle": data.get("handle"),
+        "Image Src": [_absolute(src) for src in data.get("images") or []],
+        "Variant Price": _from_cents(data.get("price")),
+        "SEO Title": data.get("title"),
+        "SEO Description": re.sub(r"<[^>]+>", " ", description).strip()[:320],
+        "Options": options,
+        "Variants": variants,
+    }
+
+
+async def fetch_shopify_product(url):
+    json_url = shopify_product_json_url(url)
+    if not json_url:
+        return None
+    try:
+        response = await get_breaker("http", domain_of(url)).call(
+            lambda: get_scrape_client().get(json_url, headers={"Accept": "application/json"}),
+            is_failure=is_unhealthy,
+        )
+        content_type = response.headers.get("content-type", "")
+        # Shopify serves .js as application/javascript; non-Shopify sites answer with HTML
+        if response.status_code != 200 or not ("json" in content_type or "javascript" in content_type):
+            return None
+        if RECORD_SESSIONS:
+            _record_page(json_url, content_type, response.text)
+        return product_from_shopify_json(response.json(), url)
+    except Exception as e:
+        print(f"[⚠️ Shopify JSON fetch failed for {url}] {e}")
+        return None
+
+
+# ----------------------------------------------------------
+# Tier 2: plain HTTP GET
+# ----------------------------------------------------------
+async def fetch_html(url):
+    """Fetch the server-rendered HTML of a page, or None if it isn't usable."""
+    try:
+        response = await get_breaker("http", domain_of(url)).call(
+            lambda: get_scrape_client().get(url), is_failure=is_unhealthy,
+        )
+        if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+            return None
+        if RECORD_SESSIONS:
+            _record_page(url, response.headers.get("content-type", ""), response.text)
+        return response.text
+    except Exception as e:
+        print(f"[⚠️ HTTP fetch failed for {url}] {e}")
+        return None
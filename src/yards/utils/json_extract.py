@@ -0,0 +1,176 @@
+import json
+import re
+from yards.utils.config import SHOPIFY_HEADERS
+
+REQUIRED_PRODUCT_FIELDS = ["Title"]
+LIST_FIELDS = {"Image Src", "Variant Image", "Tags"}
+
+# `{"products": [` style wrapper produced in JSON mode; a Shopify field holding a
+# list (`{"Image Src": [`) is a bare product instead
+WRAPPER_PREFIX = re.compile(r'\s*\{\s*"(?P<key>[^"]*)"\s*:\s*\[')
+SHOPIFY_FIELDS = set(SHOPIFY_HEADERS)
+
+
+# ----------------------------------------------------------
+# Repair helpers
+# ----------------------------------------------------------
+def repair_fragment(text: str) -> str:
+    """Fix the usual LLM slips: stray backslashes and trailing commas."""
+    text = re.sub(r'\\(?!["\\/bfnrtu])', r'\\\\', text)
+    text = re.sub(r',\s*([}\]])', r'\1', text)
+    return text
+
+
+def loads_lenient(text: str):
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return json.loads(repair_fragment(text), strict=False)
+
+
+# ----------------------------------------------------------
+# Object scanner
+# ----------------------------------------------------------
+def array_start(text: str):
+    """Index where array elements begin in `text`, or None when it holds no JSON."""
+    stripped = text.lstrip()
+    if stripped.startswith("{"):
+        match = WRAPPER_PREFIX.match(text)
+        if match and match["key"] not in SHOPIFY_FIELDS:
+            return match.end()
+        return len(text) - len(stripped)
+    match = re.search(r'[\{\[]', text)
+    if match is None:
+        return None
+    return match.start() + (text[match.start()] == "[")
+
+
+def split_objects(text: str):
+    """Pull every complete top-level object out of a JSON array in `text`.
+
+    Works on a bare array, a `{"products": [...]}` wrapper or prose with an
+    array somewhere inside it, so a reply cut off mid-array still yields
+    every object that was finished. Returns (objects, failed, truncated):
+    objects that don't parse go to `failed`, and `truncated` is the
+    unfinished trailing object, or None.
+    """
+    objects, failed = [], []
+    pos = array_start(text)
+    if pos is None:
+        return objects, failed, None
+
+    depth, start, in_string, escaped = 0, None, False, False
+    for i in range(pos, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            if depth > 0:
+                in_string = True
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                fragment = text[start:i + 1]
+                start = None
+                try:
+                    objects.append(loads_lenient(fragment))
+                except json.JSONDecodeError as e:
+                    failed.append({"fragment": fragment, "errors": [f"invalid JSON: {e.msg}"]})
+    return objects, failed, (text[start:] if start is not None else None)
+
+
+# ----------------------------------------------------------
+# Validation
+# ----------------------------------------------------------
+def validate_product(item):
+    """Check one extracted object against SHOPIFY_HEADERS.
+
+    Returns (clean_item, errors). Unknown keys are dropped, nulls become ""
+    and lists on scalar fields are joined into one string.
+    """
+    if not isinstance(item, dict):
+        return None, [f"expected an object, got {type(item).__name__}"]
+
+    errors = []
+    clean = {}
+    for key, value in item.items():
+        if key not in SHOPIFY_FIELDS:
+            continue
+        if value is None:
+            value = ""
+        if isinstance(value, dict):
+            errors.append(f'"{key}" must not be an object')
+            continue
+        if isinstance(value, list) and key not in LIST_FIELDS:
+            value = ", ".join(map(str, value))
+        clean[key] = value
+
+    for field in REQUIRED_PRODUCT_FIELDS:
+        if not str(clean.get(field, "")).strip():
+            errors.append(f'missing required field "{field}"')
+
+    return clean, errors
+
+
+def is_empty_reply(text: str) -> bool:
+    """True for a reply that explicitly lists no products (`[]`, `{"products": []}`)."""
+    try:
+        value = parse_json(text)
+    except ValueError:
+        return False
+    if isinstance(value, dict) and len(value) == 1 and not (SHOPIFY_FIELDS & value.keys()):
+        value = next(iter(value.values()))
+    return value == []
+
+
+def parse_products(text: str):
+    """Parse an LLM extraction reply into validated Shopify product rows.
+
+    Returns a dict with `products` (valid rows), `failed` (fragments with the
+    reasons they were rejected) and `truncated` (the unfinished trailing
+    object, or None).
+    """
+    items, failed, truncated = split_objects(text)
+
+    # A wrapper object whose list isn't its first key (`{"count": 2, "products": [...]}`)
+    if len(items) == 1 and isinstance(items[0], dict) and not (SHOPIFY_FIELDS & items[0].keys()):
+        nested = next((v for v in items[0].values() if isinstance(v, list)), None)
+        if nested is not None:
+            items = nested
+
+    products = []
+    for item in items:
+        clean, errors = validate_product(item)
+        if errors:
+            failed.append({"fragment": json.dumps(item, ensure_ascii=False), "errors": errors})
+        else:
+            products.append(clean)
+
+    # Nothing recognisable at all: report it so the caller's repair pass sees the reply
+    if not items and not failed and truncated is None and text.strip() and not is_empty_reply(text):
+        failed.append({"fragment": text, "errors": ["no product objects found"]})
+
+    return {"products": products, "failed": failed, "truncated": truncated}
+
+
+def parse_json(text: str):
+    """Parse the first JSON object/array in free text, tolerating common LLM slips."""
+    match = re.search(r'[\{\[]', text)
+    if not match:
+        raise ValueError("No JSON object/array found")
+    text = text[match.start():].strip()
+
+    last_brace = max(text.rfind('}'), text.rfind(']'))
+    if last_brace != -1:
+        text = text[:last_brace + 1]
+
+    return loads_lenient(text)
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import random
+import threading
+import weakref
+from functools import lru_cache
+from dotenv import load_dotenv
+from yards.utils.config import (
+    DEFAULT_LLM_MODEL,
+    LLM_MODELS,
+    LLM_MAX_CONCURRENCY,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_KEEPALIVE_SECONDS,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+    LLM_PROVIDER,
+)
+from yards.utils.metrics import RETRIES, RATE_LIMITED
+
+load_dotenv()
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Several keys (comma-separated) let the router spread load over separate rate limits
+GROQ_API_KEYS = [key.strip() for key in os.getenv("GROQ_API_KEYS", "").split(",") if key.strip()] or [GROQ_API_KEY]
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", LLM_MAX_CONCURRENCY))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_semaphores = weakref.WeakKeyDictionary()
+_semaphores_lock = threading.Lock()
+
+
+# ----------------------------------------------------------
+# Shared HTTP pools
+# ----------------------------------------------------------
+def _http_limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_http_client():
+    import httpx
+
+    return httpx.Client(limits=_http_limits())
+
+
+@lru_cache(maxsize=None)
+def get_async_http_client():
+    import httpx
+
+    return httpx.AsyncClient(limits=_http_limits())
+
+
+async def close_http_clients():
+    if get_async_http_client.cache_info().currsize:
+        await get_async_http_client().aclose()
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
+
+
+# ----------------------------------------------------------
+# Client registry
+# ----------------------------------------------------------
+def get_model_config(model_name=None):
+    return LLM_MODELS.get(model_name or DEFAULT_LLM_MODEL, LLM_MODELS[DEFAULT_LLM_MODEL])
+
+
+@lru_cache(maxsize=None)
+def get_llm(model_name=DEFAULT_LLM_MODEL, api_key=None):
+    """Return the process-wide ChatGroq client for a model (and API key).
+
+    All clients share one keep-alive connection pool. Retries are handled
+    by `invoke_with_retries`, so the SDK's own retry loop is disabled.
+    """
+    model_config = get_model_config(model_name)
+    if LLM_PROVIDER == "fake":
+        from yards.utils.fakes import FakeChatModel
+
+        return FakeChatModel(model_name, api_key, model_config["temperature"])
+
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        groq_api_key=api_key or GROQ_API_KEY,
+        model_name=model_name,
+        temperature=model_config["temperature"],
+        request_timeout=model_config["timeout"],
+        max_retries=0,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages([
+        ("system", "{system_prompt}"),
+        ("human", "{user_input}")
+    ])
+
+
+def get_semaphore():
+    """Global cap on in-flight LLM requests (one semaphore per event loop)."""
+    loop = asyncio.get_running_loop()
+    with _semaphores_lock:
+        semaphore = _semaphores.get(loop)
+        if semaphore is None:
+            semaphore = _semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENCY)
+    return semaphore
+
+
+# ----------------------------------------------------------
+# Retries
+# ----------------------------------------------------------
+def get_status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(exc):
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if get_status_code(exc) in RETRYABLE_STATUS:
+        return True
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def retry_delay(exc, attempt):
+    # Honour Retry-After on 429s, otherwise exponential backoff with full jitter
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(float(retry_after), LLM_RETRY_MAX_SECONDS) + random.uniform(0, LLM_RETRY_BASE_SECONDS)
+        except ValueError:
+            pass
+    return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+async def invoke_with_retries(llm, messages, retries=None, model_name=None, breaker=None):
+    """Invoke the model, retrying 429s / 5xx / timeouts with backoff.
+
+    With a `breaker`, only the provider request itself runs under it (and its
+    adaptive timeout); waiting for the semaphore does not count.
+    """
+    model_name = model_name or getattr(llm, "model_name", None)
+    if retries is None:
+        retries = get_model_config(model_name)["max_retries"]
+
+    attempt = 0
+    while True:
+        try:
+            async with get_semaphore():
+                if breaker is None:
+                    return await llm.ainvoke(messages)
+                return await breaker.call(
+                    lambda: llm.ainvoke(messages),
+                    ceiling=get_model_config(model_name)["timeout"],
+                    trips_on=is_retryable,
+                )
+        except Exception as e:
+            if get_status_code(e) == 429:
+                RATE_LIMITED.inc(dependency="llm")
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = retry_delay(e, attempt)
+            attempt += 1
+            RETRIES.inc(dependency="llm")
+            print(f"🔁 LLM retry {attempt}/{retries} for {model_name} in {delay:.1f}s ({type(e).__name__})")
+            await asyncio.sleep(delay)
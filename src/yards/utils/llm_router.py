@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from yards.utils.config import (
+    DEFAULT_LLM_MODEL,
+    LLM_ROUTES,
+    LLM_ROUTER_MAX_ATTEMPTS,
+    LLM_OUTPUT_TOKEN_RESERVE,
+)
+from yards.utils.metrics import LLM_FAILOVERS
+from yards.utils.resilience import get_breaker, CircuitOpen
+from yards.utils.llm_client import GROQ_API_KEYS, get_llm, get_prompt, get_model_config, is_retryable, retry_delay
+from yards.utils.prompts import count_tokens, usage_from_response
+from yards.utils.utils import call_llm
+
+RATE_WINDOW_SECONDS = 60
+
+
+class Deployment:
+    """One model behind one API key, with its own sliding-window RPM/TPM budget."""
+
+    def __init__(self, model_name, key_index, api_key, rpm=None, tpm=None):
+        self.model_name = model_name
+        self.key_index = key_index
+        self.api_key = api_key
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = deque()  # [started_at, tokens] per request in the last minute
+        self.cooldown_until = 0.0
+        self.breaker = get_breaker("llm", f"{model_name}#{key_index}")
+
+    def __repr__(self):
+        return f"{self.model_name}#{self.key_index}"
+
+    def _trim(self, now):
+        while self.window and now - self.window[0][0] >= RATE_WINDOW_SECONDS:
+            self.window.popleft()
+
+    def tokens_used(self, now):
+        self._trim(now)
+        return sum(tokens for _, tokens in self.window)
+
+    def wait_time(self, tokens, now):
+        """Seconds until this deployment can take a request of `tokens` (0 = now)."""
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        if self.breaker.retry_in(now):
+            return self.breaker.retry_in(now)
+        self._trim(now)
+        if self.rpm and len(self.window) >= self.rpm:
+            return self.window[0][0] + RATE_WINDOW_SECONDS - now
+        if self.tpm:
+            # A request larger than the whole budget only has to wait for an empty window
+            needed = min(tokens, self.tpm)
+            used = self.tokens_used(now)
+            if used + needed > self.tpm:
+                for started_at, spent in self.window:
+                    used -= spent
+                    if used + needed <= self.tpm:
+                        return started_at + RATE_WINDOW_SECONDS - now
+        return 0.0
+
+    def reserve(self, tokens, now):
+        entry = [now, tokens]
+        self.window.append(entry)
+        return entry
+
+    def release(self, entry):
+        for index, reserved in enumerate(self.window):
+            if reserved is entry:
+                del self.window[index]
+                return
+
+    def cool_down(self, seconds):
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+
+class ModelRouter:
+    """Routes LLM calls by task class across models and API keys.
+
+    Each task lists models in preference order (LLM_ROUTES). A call goes to
+    the first deployment with room in its rate window; when every deployment
+    is full the call waits for the earliest one to free up. 429s and
+    timeouts put a deployment on cooldown and the call fails over to the
+    next one, so one model's TPM limit no longer caps the whole pipeline.
+    A deployment that keeps failing is skipped while its circuit breaker
+    is open, and each call times out at the deployment's adaptive timeout.
+    """
+
+    def __init__(self, routes=LLM_ROUTES, api_keys=GROQ_API_KEYS):
+        self.routes = routes
+        self.deployments = {}
+        for models in routes.values():
+            for model_name in models:
+                if model_name in self.deployments:
+                    continue
+                config = get_model_config(model_name)
+                self.deployments[model_name] = [
+                    Deployment(model_name, index, key, config.get("rpm"), config.get("tpm"))
+                    for index, key in enumerate(api_keys)
+                ]
+
+    def candidates(self, task):
+        models = self.routes.get(task) or [DEFAULT_LLM_MODEL]
+        return [deployment for model_name in models for deployment in self.deployments.get(model_name, [])]
+
+    async def acquire(self, task, tokens, exclude=()):
+        """Pick a deployment for `task` and reserve `tokens` in its window."""
+        candidates = [d for d in self.candidates(task) if d not in exclude] or self.candidates(task)
+        while True:
+            now = time.monotonic()
+            waits = [(deployment.wait_time(tokens, now), position, deployment)
+                     for position, deployment in enumerate(candidates)]
+            ready = [(deployment.tokens_used(now), position, deployment)
+                     for wait, position, deployment in waits if wait <= 0]
+            if ready:
+                # Preferred model first; among its keys, the least loaded
+                best_model = candidates[min(position for _, position, _ in ready)].model_name
+                _, _, deployment = min(item for item in ready if item[2].model_name == best_model)
+                return deployment, deployment.reserve(tokens, now)
+            await asyncio.sleep(max(min(wait for wait, _, _ in waits), 0.05))
+
+    async def call(self, task, system_prompt, user_input, **kwargs):
+        estimate = count_tokens(system_prompt) + count_tokens(str(user_input)) + LLM_OUTPUT_TOKEN_RESERVE
+        failed = []
+        for attempt in range(1, LLM_ROUTER_MAX_ATTEMPTS + 1):
+            deployment, entry = await self.acquire(task, estimate, exclude=failed)
+            llm = get_llm(deployment.model_name, deployment.api_key)
+            try:
+                response = await call_llm(llm, get_prompt(), system_prompt, user_input, retries=0,
+                                          breaker=deployment.breaker, **kwargs)
+            except Exception as e:
+                # A failed call holds no budget; 429s put the deployment on cooldown instead
+                deployment.release(entry)
+                if attempt >= LLM_ROUTER_MAX_ATTEMPTS or not (is_retryable(e) or isinstance(e, CircuitOpen)):
+                    raise
+                if not isinstance(e, CircuitOpen):
+                    deployment.cool_down(retry_delay(e, 0))
+                failed.append(deployment)
+                LLM_FAILOVERS.inc(task=task)
+                print(f"🔀 LLM failover for {task}: {deployment} failed ({type(e).__name__}), attempt {attempt}")
+                continue
+            # Charge the window with what the call actually used (nothing for cache hits)
+            if (getattr(response, "response_metadata", None) or {}).get("cached"):
+                deployment.release(entry)
+            else:
+                input_tokens, output_tokens, _ = usage_from_response(response)
+                if input_tokens or output_tokens:
+                    entry[1] = input_tokens + output_tokens
+            return response
+
+
+@lru_cache(maxsize=None)
+def get_router():
+    return ModelRouter()
+
+
+async def call_task(task, system_prompt, user_input, **kwargs):
+    """Run one LLM call for a task class ("classify", "copy", "extract", ...) through the router.
+
+    Extra keyword arguments (json_mode, json_array, use_cache) go to call_llm.
+    """
+    return await get_router().call(task, system_prompt, user_input, **kwargs)
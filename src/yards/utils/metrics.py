@@ -0,0 +1,226 @@
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+from functools import lru_cache
+from yards.utils.events import CURRENT_JOB
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+# ----------------------------------------------------------
+# Metric types (Prometheus text exposition, no client library needed)
+# ----------------------------------------------------------
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = [*zip(labelnames, key), *extra]
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}"
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------------
+# Service metrics
+# ----------------------------------------------------------
+STAGE_SECONDS = register(Histogram(
+    "yards_stage_duration_seconds", "Time spent per pipeline stage.", ["stage"]))
+STAGE_ERRORS = register(Counter(
+    "yards_stage_errors_total", "Pipeline stage calls that raised.", ["stage"]))
+CACHE_HITS = register(Counter(
+    "yards_cache_hits_total", "Cache hits by cache (llm, result, row).", ["cache"]))
+CACHE_MISSES = register(Counter(
+    "yards_cache_misses_total", "Cache misses by cache (llm, result, row).", ["cache"]))
+RETRIES = register(Counter(
+    "yards_retries_total", "Retried calls by dependency.", ["dependency"]))
+RATE_LIMITED = register(Counter(
+    "yards_rate_limited_total", "HTTP 429 responses by dependency.", ["dependency"]))
+LLM_FAILOVERS = register(Counter(
+    "yards_llm_failovers_total", "LLM calls moved to another model/key by the router.", ["task"]))
+LLM_TOKENS = register(Histogram(
+    "yards_llm_tokens", "Tokens per LLM call.", ["model", "direction"], buckets=TOKEN_BUCKETS))
+LLM_TOKENS_TOTAL = register(Counter(
+    "yards_llm_tokens_total", "LLM tokens used.", ["model", "direction"]))
+LLM_COST = register(Counter(
+    "yards_llm_cost_usd_total", "Estimated LLM spend in USD.", ["model"]))
+CIRCUITS_OPENED = register(Counter(
+    "yards_circuits_opened_total", "Circuit breakers tripped open, by dependency.", ["dependency"]))
+FAST_FAILS = register(Counter(
+    "yards_fast_fails_total", "Calls rejected while a circuit was open.", ["dependency"]))
+TIMEOUTS = register(Counter(
+    "yards_timeouts_total", "Calls that hit their adaptive timeout.", ["dependency"]))
+HEDGED_REQUESTS = register(Counter(
+    "yards_hedged_requests_total", "Backup requests sent for slow calls.", ["dependency"]))
+JOBS = register(Counter(
+    "yards_jobs_total", "Discovery jobs by outcome.", ["status"]))
+ROWS_WRITTEN = register(Counter(
+    "yards_rows_written_total", "Shopify rows written to output CSVs."))
+
+
+# ----------------------------------------------------------
+# Spans
+# ----------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_tracer():
+    """OpenTelemetry tracer when enabled (YARDS_OTEL=1 or an OTLP endpoint is set), else None."""
+    if os.getenv("YARDS_OTEL") != "1" and not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        print(f"[⚠️ OpenTelemetry export disabled: {e}]")
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "yards")}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return trace.get_tracer("yards")
+
+
+class span:
+    """Time a pipeline stage: feeds STAGE_SECONDS/STAGE_ERRORS and, if enabled, an OTel span.
+
+    Works as `with span("parse"):` and `async with span("search", query=q):`.
+    """
+
+    def __init__(self, stage, **attributes):
+        self.stage = stage
+        self.attributes = attributes
+        self._otel = None
+        self._otel_span = None
+
+    def __enter__(self):
+        tracer = get_tracer()
+        if tracer is not None:
+            attributes = {key: str(value) for key, value in self.attributes.items() if value is not None}
+            job_id = CURRENT_JOB.get()
+            if job_id:
+                attributes["yards.job_id"] = job_id
+            self._otel = tracer.start_as_current_span(f"yards.{self.stage}", attributes=attributes)
+            self._otel_span = self._otel.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def set(self, **attributes):
+        if self._otel_span is not None:
+            for key, value in attributes.items():
+                self._otel_span.set_attribute(key, str(value))
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, stage=self.stage)
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            STAGE_ERRORS.inc(stage=self.stage)
+        if self._otel is not None:
+            self._otel.__exit__(exc_type, exc, tb)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def traced(stage):
+    """Decorator wrapping a (sync or async) function in span(stage)."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with span(stage):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,222 @@
+import os
+from yards.utils.config import (
+    SHOPIFY_HEADERS,
+    SHOPIFY_COLUMN_TYPES,
+    REQUIRED_SHOPIFY_VALUES,
+    PRODUCT_LEVEL_COLUMNS,
+    WEIGHT_UNIT_GRAMS,
+)
+
+PRICE_PATTERN = r"(-?\d[\d,]*(?:\.\d+)?)"  # first number: "Rs. 1,299.00", "$25 - $30", "-5" (rejected)
+WEIGHT_PATTERN = r"(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>[A-Za-z]*)"
+WEIGHT_UNIT_NAMES = {
+    "g": "g", "gm": "g", "gms": "g", "gram": "g", "grams": "g",
+    "kg": "kg", "kgs": "kg", "lb": "lb", "lbs": "lb", "oz": "oz",
+}
+BOOL_TEXT = {"true": "TRUE", "yes": "TRUE", "1": "TRUE", "false": "FALSE", "no": "FALSE", "0": "FALSE"}
+OPTION_VALUES = ["Option1 Value", "Option2 Value", "Option3 Value"]
+REJECT_REASON = "Reject Reason"
+# Columns parsed or grouped on; free text (Body, SEO copy) is left as written
+KEY_COLUMNS = list(dict.fromkeys([
+    "Handle", "Title", "Option1 Name", "Option2 Name", "Option3 Name", *OPTION_VALUES,
+    "Variant SKU", "Variant Weight Unit", *SHOPIFY_COLUMN_TYPES, *REQUIRED_SHOPIFY_VALUES,
+]))
+
+
+# ----------------------------------------------------------
+# Column normalizers (one vectorized pass per column)
+# ----------------------------------------------------------
+def per_distinct(transform):
+    """Run a string transform once per distinct value of a column and broadcast the result.
+
+    Catalog columns repeat heavily (blank cells, TRUE/FALSE, one title per
+    variant row), so this is usually several times cheaper than a pass
+    over every cell.
+    """
+    def apply(values):
+        import pandas as pd
+
+        codes, uniques = pd.factorize(values)
+        result = transform(pd.Series(uniques, dtype=object))
+        return pd.Series(result.to_numpy()[codes], index=values.index, dtype=result.dtype)
+    return apply
+
+
+@per_distinct
+def strip(values):
+    return values.str.strip()
+
+
+@per_distinct
+def slugify(values):
+    """Vectorized yards.utils.variants.make_handle."""
+    return values.str.lower().str.replace(r"[^a-z0-9]+", "-", regex=True).str.strip("-")
+
+
+@per_distinct
+def to_price(values):
+    import pandas as pd
+
+    number = values.str.extract(PRICE_PATTERN, expand=False).str.replace(",", "", regex=False)
+    return pd.to_numeric(number, errors="coerce").astype(float)
+
+
+@per_distinct
+def to_int(values):
+    import pandas as pd
+
+    return pd.to_numeric(values, errors="coerce").round().astype(float)
+
+
+@per_distinct
+def to_grams(values):
+    """"500", "0.5 kg", "1.2lb", "16 oz" -> grams; unknown units -> NaN."""
+    import pandas as pd
+
+    parts = values.str.extract(WEIGHT_PATTERN)
+    unit = parts["unit"].fillna("").str.lower()
+    # A bare number is already grams
+    factor = unit.map(WEIGHT_UNIT_GRAMS).where(unit != "", 1.0)
+    return (pd.to_numeric(parts["value"], errors="coerce") * factor).round().astype(float)
+
+
+@per_distinct
+def to_bool_text(values):
+    return values.str.lower().map(BOOL_TEXT).fillna(values)
+
+
+def normalize_values(df):
+    for column, kind in SHOPIFY_COLUMN_TYPES.items():
+        if column == "Variant Grams":
+            df[column] = to_grams(df[column]).astype("Int64")
+        elif kind == "int":
+            df[column] = to_int(df[column]).astype("Int64")
+        elif kind == "float":
+            df[column] = to_price(df[column])
+        elif kind == "bool":
+            df[column] = to_bool_text(df[column])
+
+    unit = df["Variant Weight Unit"].str.lower().map(WEIGHT_UNIT_NAMES).fillna("")
+    df["Variant Weight Unit"] = unit.where((unit != "") | df["Variant Grams"].isna(), "g")
+    # A compare-at price only means something above the selling price
+    not_discounted = df["Variant Compare At Price"] <= df["Variant Price"]
+    df.loc[not_discounted, "Variant Compare At Price"] = float("nan")
+    return df
+
+
+def assign_handles(df):
+    """Stable handles: the row's own handle (slugged) or its title's, one per product title.
+
+    Rows of one title that came back with different handles are regrouped
+    under the first one; different titles claiming the same handle each
+    fall back to their title's handle.
+    """
+    title_key = slugify(df["Title"])
+    handle = slugify(df["Handle"])
+    handle = handle.where(handle != "", title_key)
+
+    has_title = title_key != ""
+    handle = handle.where(~has_title, handle.groupby(title_key).transform("first"))
+    clash = title_key.where(has_title).groupby(handle).transform("nunique") > 1
+    df["Handle"] = handle.where(~clash, title_key)
+    return df
+
+
+def fill_product_fields(df):
+    """Repeat each handle's product-level fields on all its variant rows."""
+    grouped = df["Handle"] != ""
+    values = df.loc[grouped, PRODUCT_LEVEL_COLUMNS]
+    # mask() rather than replace("", nan): no silent downcasting (FutureWarning in pandas 2.2+)
+    values = values.mask(values.eq(""))
+    filled = values.groupby(df.loc[grouped, "Handle"]).transform("first").fillna("")
+    df.loc[grouped, PRODUCT_LEVEL_COLUMNS] = filled
+    return df
+
+
+# ----------------------------------------------------------
+# Post-processing
+# ----------------------------------------------------------
+def postprocess_frame(df):
+    """Normalize, regroup, dedupe and validate a Shopify product table.
+
+    Returns (clean rows grouped by handle, rejected original rows with a
+    "Reject Reason" column).
+    """
+    import pandas as pd
+
+    df = df.reindex(columns=SHOPIFY_HEADERS, fill_value="").fillna("").astype(str)
+    for column in KEY_COLUMNS:
+        df[column] = strip(df[column])
+    raw = df.copy()
+
+    df = normalize_values(df)
+    df = assign_handles(df)
+    df = fill_product_fields(df)
+
+    reasons = pd.Series("", index=df.index, dtype=object)
+
+    def reject(mask, reason):
+        reasons[mask & (reasons == "")] = reason
+
+    reject((raw["Variant Price"] != "") & (df["Variant Price"].isna() | (df["Variant Price"] < 0)),
+           "invalid Variant Price")
+    reject(df["Handle"] == "", "missing Handle")
+    reject(df["Title"] == "", "missing Title")
+
+    # One row per (handle, option values); the first one produced wins
+    keys = df[["Handle", *OPTION_VALUES]].apply(lambda column: column.str.lower())
+    kept = reasons == ""
+    reject(kept & keys[kept].duplicated(keep="first").reindex(df.index, fill_value=False), "duplicate variant")
+
+    # A product with a single variant and no options is Shopify's "Default Title"
+    kept = reasons == ""
+    size = df.loc[kept, "Handle"].map(df.loc[kept, "Handle"].value_counts())
+    single = kept & (size.reindex(df.index) == 1) & (df["Option1 Value"] == "")
+    df.loc[single, ["Option1 Name", "Option1 Value"]] = ["Title", "Default Title"]
+
+    for column in REQUIRED_SHOPIFY_VALUES:
+        values = df[column]
+        reject(values.isna() | (values.astype(str) == ""), f"missing {column}")
+
+    clean = df[reasons == ""]
+    # Shopify needs a product's variant rows next to each other
+    order = clean.groupby("Handle", sort=False).ngroup()
+    clean = clean.iloc[order.argsort(kind="stable")]
+    rejects = raw[reasons != ""].assign(**{REJECT_REASON: reasons[reasons != ""]})
+    return clean, rejects
+
+
+def rejects_path(output_file):
+    return f"{os.path.splitext(output_file)[0]}.rejects.csv"
+
+
+def postprocess_csv(output_file):
+    """Clean a finished catalog CSV in place and write its rejects next to it; returns a report."""
+    import pandas as pd
+
+    df = pd.read_csv(output_file, dtype=str, keep_default_na=False)
+    missing_columns = [column for column in SHOPIFY_HEADERS if column not in df.columns]
+    clean, rejects = postprocess_frame(df)
+
+    tmp_file = f"{output_file}.tmp"
+    clean.to_csv(tmp_file, index=False, float_format="%.2f")
+    os.replace(tmp_file, output_file)
+
+    rejects_file = rejects_path(output_file)
+    if len(rejects):
+        rejects.to_csv(rejects_file, index=False)
+    elif os.path.exists(rejects_file):
+        os.remove(rejects_file)
+
+    report = {
+        "rows_in": len(df),
+        "rows_out": len(clean),
+        "products": int(clean["Handle"].nunique()),
+        "rejected": len(rejects),
+        "reasons": {reason: int(count) for reason, count in rejects[REJECT_REASON].value_counts().items()},
+        "missing_columns": missing_columns,
+        "rejects_file": rejects_file if len(rejects) else None,
+    }
+    print(f"🧹 Post-processed {report['rows_in']} rows: {report['rows_out']} kept across "
+          f"{report['products']} products, {report['rejected']} rejected {report['reasons'] or ''}")
+    return report
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from yards.utils.config import PROFILE_INTERVAL_SECONDS, PROFILE_MAX_DEPTH, PROFILE_DIR
+from yards.utils.events import CURRENT_JOB
+
+
+# ----------------------------------------------------------
+# Stack folding
+# ----------------------------------------------------------
+def frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+def fold_frame(frame, max_depth=PROFILE_MAX_DEPTH):
+    """Innermost frame -> "outer;...;inner" (flamegraph folded stack)."""
+    names = []
+    while frame is not None and len(names) < max_depth:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def fold_await_chain(coro, max_depth=PROFILE_MAX_DEPTH):
+    """Follow a suspended coroutine down its await chain to what it is waiting on."""
+    names = []
+    while coro is not None and len(names) < max_depth:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            # Reached the leaf awaitable (Future, Task, executor future, ...)
+            # (awaiting a Future yields its FutureIter, reported as the Future itself)
+            names.append("<Future>" if type(coro).__name__ == "FutureIter" else f"<{type(coro).__name__}>")
+            break
+        names.append(frame_name(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return ";".join(names)
+
+
+# ----------------------------------------------------------
+# Profiler
+# ----------------------------------------------------------
+class JobProfiler:
+    """Low-overhead sampling profiler for one discovery job.
+
+    A background thread samples every thread's stack (sys._current_frames),
+    which shows where CPU goes: Chromium worker threads, parsing, spreadsheet
+    loading. A task on the event loop samples the job's pending asyncio tasks
+    and where each is suspended, which shows what the job is waiting on
+    (Groq, Serper, page fetches, the parse pool). Both are written as one
+    folded-stack file under "thread:<name>" and "task" roots, ready for
+    flamegraph.pl, speedscope or inferno.
+
+    Thread samples are process-wide, so concurrent jobs appear in each
+    other's thread stacks; task samples are limited to this job where the
+    interpreter exposes task contexts (Python 3.12+).
+    """
+
+    def __init__(self, job_id=None, interval=PROFILE_INTERVAL_SECONDS, max_depth=PROFILE_MAX_DEPTH):
+        self.job_id = job_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._task = None
+        self.path = None
+
+    def _add(self, stack):
+        if stack:
+            with self._lock:
+                self.stacks[stack] += 1
+
+    def _sample_threads(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._add(f"thread:{names.get(ident, ident)};{fold_frame(frame, self.max_depth)}")
+            self.samples += 1
+
+    def _belongs_to_job(self, task):
+        get_context = getattr(task, "get_context", None)
+        if self.job_id is None or get_context is None:
+            return True
+        return get_context().get(CURRENT_JOB) == self.job_id
+
+    async def _sample_tasks(self):
+        current = asyncio.current_task()
+        while True:
+            await asyncio.sleep(self.interval)
+            for task in asyncio.all_tasks():
+                if task is current or task.done() or not self._belongs_to_job(task):
+                    continue
+                self._add(f"task;{fold_await_chain(task.get_coro(), self.max_depth)}")
+
+    async def __aenter__(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_threads, name="yards-profiler", daemon=True)
+        self._thread.start()
+        self._task = asyncio.create_task(self._sample_tasks())
+        return self
+
+    async def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.to_thread(self._thread.join)
+        self.elapsed = time.perf_counter() - self._started
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+        return False
+
+    def folded(self):
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def save(self, output_file=None):
+        """Write the folded profile next to the output CSV (or into PROFILE_DIR) and return its path."""
+        if output_file:
+            path = f"{os.path.splitext(output_file)[0]}.profile.folded"
+        else:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{self.job_id or 'job'}.profile.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        print(f"🔬 Profile: {self.samples} samples over {self.elapsed:.1f}s "
+              f"every {self.interval * 1000:.0f}ms -> {path}")
+        self.path = path
+        return path
+
+
+CURRENT_PROFILER = ContextVar("yards_profiler", default=None)
+
+
+async def finish_job_profile(output_file=None):
+    """Stop the running job's profiler and write its profile; returns the path (None when not profiling).
+
+    Called before the job's terminal event, which closes its event channel,
+    so the profile is on disk by the time clients hear the job has ended.
+    """
+    profiler = CURRENT_PROFILER.get()
+    if profiler is None or profiler.path:
+        return profiler and profiler.path
+    try:
+        await profiler.stop()
+        return await asyncio.to_thread(profiler.save, output_file)
+    except Exception as e:
+        print(f"⚠️ Could not write profile for {profiler.job_id}: {e}")
+        return None
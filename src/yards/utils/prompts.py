@@ -0,0 +1,176 @@
+import json
+import math
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from yards.utils.config import (
+    PROMPT_TEMPLATES,
+    SHOPIFY_HEADERS,
+    LLM_REQUEST_TOKEN_BUDGET,
+    LLM_OUTPUT_TOKEN_RESERVE,
+)
+from yards.utils.json_extract import LIST_FIELDS
+from yards.utils.events import CURRENT_JOB, publish
+from yards.utils.metrics import LLM_TOKENS, LLM_TOKENS_TOTAL, LLM_COST
+
+CHARS_PER_TOKEN = 4      # fallback estimate when tiktoken isn't installed
+MIN_CHUNK_TOKENS = 500
+
+
+# ----------------------------------------------------------
+# Token counting
+# ----------------------------------------------------------
+@lru_cache(maxsize=None)
+def _encoding():
+    try:
+        import tiktoken
+
+        # Not Llama's tokenizer, but within a few percent on English/HTML text
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def template_token_counts():
+    """Token count of every PROMPT_TEMPLATES entry and of the assembled extraction prompt."""
+    counts = {name: count_tokens(template) for name, template in PROMPT_TEMPLATES.items()}
+    counts["<extraction system prompt>"] = count_tokens(extraction_system_prompt())
+    return counts
+
+
+# ----------------------------------------------------------
+# Prompt assembly
+# ----------------------------------------------------------
+@lru_cache(maxsize=None)
+def compact_schema(fields=tuple(SHOPIFY_HEADERS)):
+    """Field list standing in for a full example object in the prompt."""
+    lists = [field for field in fields if field in LIST_FIELDS]
+    return (
+        f"Each object has these keys: {json.dumps(list(fields), ensure_ascii=False)}\n"
+        f"{', '.join(lists)} may be arrays; every other value is a string (\"\" when unknown)."
+    )
+
+
+@lru_cache(maxsize=None)
+def extraction_system_prompt():
+    """System prompt for product extraction: output rules, extraction rules and schema.
+
+    It is byte-identical for every call, and the scraped chunk is the only
+    part of the user message, so providers with prompt caching can reuse the
+    whole prefix.
+    """
+    return "\n".join([
+        PROMPT_TEMPLATES["get_column_details"].rstrip(),
+        PROMPT_TEMPLATES["user_prompt_prod_details"].rstrip(),
+        compact_schema(),
+    ])
+
+
+def chunk_budget_tokens(system_prompt, budget=LLM_REQUEST_TOKEN_BUDGET, reserve=LLM_OUTPUT_TOKEN_RESERVE):
+    """Tokens of scraped data that fit one request next to `system_prompt`."""
+    return max(budget - reserve - count_tokens(system_prompt), MIN_CHUNK_TOKENS)
+
+
+def chunk_budget_chars(system_prompt, budget=LLM_REQUEST_TOKEN_BUDGET, reserve=LLM_OUTPUT_TOKEN_RESERVE):
+    """Characters of scraped data per request under the CHARS_PER_TOKEN estimate."""
+    return chunk_budget_tokens(system_prompt, budget, reserve) * CHARS_PER_TOKEN
+
+
+def split_to_budget(text, system_prompt, budget=LLM_REQUEST_TOKEN_BUDGET, reserve=LLM_OUTPUT_TOKEN_RESERVE):
+    """Split `text` into chunks that each fit one request next to `system_prompt`.
+
+    With tiktoken the text is cut on encoded token boundaries; without it,
+    chunks fall back to chunk_budget_chars characters.
+    """
+    encoding = _encoding()
+    if encoding is None:
+        size = chunk_budget_chars(system_prompt, budget, reserve)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    size = chunk_budget_tokens(system_prompt, budget, reserve)
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + size]) for i in range(0, len(tokens), size)]
+
+
+# ----------------------------------------------------------
+# Usage and cost
+# ----------------------------------------------------------
+def usage_from_response(response):
+    """(input, output, cached input) tokens from a LangChain chat response."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0), details.get("cache_read", 0) or 0
+
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    details = token_usage.get("prompt_tokens_details") or {}
+    return (token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0),
+            details.get("cached_tokens", 0) or 0)
+
+
+def call_cost(model_config, input_tokens, output_tokens, cached_tokens=0):
+    input_price = model_config.get("input_cost_per_million", 0)
+    cached_price = model_config.get("cached_input_cost_per_million", input_price)
+    output_price = model_config.get("output_cost_per_million", 0)
+    return ((input_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + output_tokens * output_price) / 1_000_000
+
+
+class UsageTracker:
+    """Token and cost totals per job (and for the whole process under None)."""
+
+    FIELDS = ("calls", "cache_hits", "input_tokens", "output_tokens", "cached_tokens", "cost_usd")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def add(self, job_id, **values):
+        with self._lock:
+            for key in {job_id, None}:
+                totals = self._totals[key]
+                for field, value in values.items():
+                    totals[field] += value
+
+    def totals(self, job_id=None):
+        with self._lock:
+            return dict(self._totals.get(job_id) or dict.fromkeys(self.FIELDS, 0))
+
+    def pop(self, job_id):
+        with self._lock:
+            return self._totals.pop(job_id, None) or dict.fromkeys(self.FIELDS, 0)
+
+
+USAGE = UsageTracker()
+
+
+def record_usage(model_name, model_config, response=None, cache_hit=False):
+    """Report one LLM call's tokens and cost and add them to the current job's totals."""
+    job_id = CURRENT_JOB.get()
+    if cache_hit:
+        USAGE.add(job_id, calls=1, cache_hits=1)
+        return
+
+    input_tokens, output_tokens, cached_tokens = usage_from_response(response)
+    cost = call_cost(model_config, input_tokens, output_tokens, cached_tokens)
+    USAGE.add(job_id, calls=1, input_tokens=input_tokens, output_tokens=output_tokens,
+              cached_tokens=cached_tokens, cost_usd=cost)
+    for direction, tokens in (("input", input_tokens), ("output", output_tokens), ("cached", cached_tokens)):
+        LLM_TOKENS.observe(tokens, model=model_name, direction=direction)
+        LLM_TOKENS_TOTAL.inc(tokens, model=model_name, direction=direction)
+    LLM_COST.inc(cost, model=model_name)
+    print(f"🧮 {model_name}: {input_tokens} in ({cached_tokens} cached) / {output_tokens} out tokens, ${cost:.5f}")
+    publish("llm_usage", model=model_name, input_tokens=input_tokens, output_tokens=output_tokens,
+            cached_tokens=cached_tokens, cost_usd=round(cost, 6))
+
+
+if __name__ == "__main__":
+    for name, tokens in sorted(template_token_counts().items(), key=lambda item: -item[1]):
+        print(f"{tokens:>7}  {name}")
+    print(f"{chunk_budget_tokens(extraction_system_prompt()):>7}  scraped tokens per extraction request")
@@ -0,0 +1,191 @@
+import asyncio
+import math
+import time
+from collections import deque
+from urllib.parse import urlparse
+from yards.utils.config import (
+    RESILIENCE_SETTINGS,
+    LATENCY_WINDOW,
+    LATENCY_MIN_SAMPLES,
+    TIMEOUT_PERCENTILE,
+    TIMEOUT_MULTIPLIER,
+    HEDGE_PERCENTILE,
+)
+from yards.utils.metrics import CIRCUITS_OPENED, FAST_FAILS, TIMEOUTS, HEDGED_REQUESTS
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"circuit open for {name}, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty sequence."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def domain_of(url):
+    return urlparse(url).netloc.lower().removeprefix("www.")
+
+
+def is_unhealthy(response):
+    """429s and 5xx count against a breaker; other statuses are the site's answer."""
+    status = getattr(response, "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+# ----------------------------------------------------------
+# Circuit breaker
+# ----------------------------------------------------------
+class CircuitBreaker:
+    """Breaker plus adaptive timeout for one dependency key (a model deployment, Serper, a domain).
+
+    Closed: calls go through with a timeout of TIMEOUT_MULTIPLIER x the
+    recent p99 latency. After `failure_threshold` consecutive failures the
+    circuit opens and calls fail fast for `reset_seconds`; then one probe
+    is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, dependency, key="", settings=None):
+        self.dependency = dependency
+        self.key = key
+        self.settings = settings or RESILIENCE_SETTINGS[dependency]
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def name(self):
+        return f"{self.dependency}:{self.key}" if self.key else self.dependency
+
+    # --- State ---
+    def retry_in(self, now=None):
+        """Seconds until a call may go through (0 = now)."""
+        if self.opened_at is None:
+            return 0.0
+        now = now or time.monotonic()
+        remaining = self.opened_at + self.settings["reset_seconds"] - now
+        if remaining > 0:
+            return remaining
+        # Half-open: one probe at a time
+        return self.timeout() if self.probing else 0.0
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpen; returns True when the call is the half-open probe."""
+        wait = self.retry_in()
+        if wait > 0:
+            FAST_FAILS.inc(dependency=self.dependency)
+            raise CircuitOpen(self.name, wait)
+        if self.opened_at is not None:
+            self.probing = True
+            return True
+        return False
+
+    def end_probe(self, probe):
+        """Let the next probe through once this one ended without a verdict (e.g. cancelled)."""
+        if probe:
+            self.probing = False
+
+    def record_success(self, latency):
+        self.latencies.append(latency)
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self, latency=None, probe=False):
+        # Slow failures still count as latency, so the timeout grows for a slow-but-alive site
+        if latency is not None:
+            self.latencies.append(latency)
+        self.failures += 1
+        # Only the probe's own failure re-opens; a late one from a call made before the circuit opened doesn't
+        if probe or (self.opened_at is None and self.failures >= self.settings["failure_threshold"]):
+            CIRCUITS_OPENED.inc(dependency=self.dependency)
+            print(f"🔌 Circuit open for {self.name} after {self.failures} failures, "
+                  f"retrying in {self.settings['reset_seconds']}s")
+            self.opened_at = time.monotonic()
+        self.end_probe(probe)
+
+    # --- Timing ---
+    def timeout(self, ceiling=None):
+        limit = min(self.settings["max_timeout"], ceiling) if ceiling else self.settings["max_timeout"]
+        if len(self.latencies) < LATENCY_MIN_SAMPLES:
+            return limit
+        adaptive = percentile(self.latencies, TIMEOUT_PERCENTILE) * TIMEOUT_MULTIPLIER
+        return min(limit, max(self.settings["min_timeout"], adaptive))
+
+    def hedge_delay(self):
+        if not self.settings.get("hedge") or len(self.latencies) < LATENCY_MIN_SAMPLES:
+            return None
+        return percentile(self.latencies, HEDGE_PERCENTILE)
+
+    async def _hedged(self, make_call):
+        delay = self.hedge_delay()
+        if delay is None:
+            return await make_call()
+
+        tasks = [asyncio.ensure_future(make_call())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                HEDGED_REQUESTS.inc(dependency=self.dependency)
+                tasks.append(asyncio.ensure_future(make_call()))
+            # First success wins; an error only counts once both attempts failed
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(self, make_call, ceiling=None, is_failure=None, trips_on=None):
+        """Run `make_call()` (a coroutine factory) under the breaker.
+
+        Fails fast with CircuitOpen while open, times out at the adaptive
+        timeout (capped by `ceiling`) and hedges when enabled. `is_failure`
+        flags bad results (e.g. 5xx responses); `trips_on` limits which
+        exceptions count against the circuit.
+        """
+        probe = self.before_call()
+        timeout = self.timeout(ceiling)
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._hedged(make_call), timeout)
+        except asyncio.TimeoutError:
+            TIMEOUTS.inc(dependency=self.dependency)
+            self.record_failure(time.monotonic() - started, probe=probe)
+            raise
+        except Exception as e:
+            if trips_on is None or trips_on(e):
+                self.record_failure(probe=probe)
+            else:
+                self.end_probe(probe)
+            raise
+        except BaseException:
+            # Cancelled by the caller (e.g. a merged product no longer needs this source)
+            self.end_probe(probe)
+            raise
+
+        if is_failure is not None and is_failure(result):
+            self.record_failure(time.monotonic() - started, probe=probe)
+        else:
+            self.record_success(time.monotonic() - started)
+        return result
+
+
+_breakers = {}
+
+
+def get_breaker(dependency, key=""):
+    breaker = _breakers.get((dependency, key))
+    if breaker is None:
+        breaker = _breakers[(dependency, key)] = CircuitBreaker(dependency, key)
+    return breaker
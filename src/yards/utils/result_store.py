@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from yards.utils.config import (
+    CACHE_DIR,
+    PIPELINE_VERSION,
+    PROMPT_TEMPLATES,
+    ROW_FINGERPRINT_COLUMNS,
+    ROW_RESULT_TTL_SECONDS,
+    MERGE_REQUIRED_FIELDS,
+)
+
+
+@lru_cache(maxsize=None)
+def prompt_version():
+    """Short hash of PROMPT_TEMPLATES, so prompt edits invalidate stored results."""
+    payload = json.dumps(PROMPT_TEMPLATES, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def normalize_title(title):
+    return re.sub(r"\s+", " ", str(title)).strip().lower()
+
+
+def row_fingerprint(row):
+    """Stable hash of an input row: normalized Title plus ROW_FINGERPRINT_COLUMNS."""
+    values = [normalize_title(row.get("Title", ""))]
+    for column in ROW_FINGERPRINT_COLUMNS:
+        value = row.get(column)
+        values.append("" if value is None or value != value else str(value).strip())
+    payload = json.dumps(values, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _blank(value):
+    return value is None or value != value or str(value).strip() in ("", "[]")
+
+
+def rows_complete(rows):
+    """True when every row is priced and each MERGE_REQUIRED_FIELDS value appears on some row.
+
+    Rows scraped while Serper or a site was failing tend to come back thin
+    (no images, no description); those are not worth reusing.
+    """
+    rows = [row for row in rows or [] if isinstance(row, dict)]
+    if not rows or any(_blank(row.get("Variant Price")) for row in rows):
+        return False
+    return all(any(not _blank(row.get(field)) for row in rows) for field in MERGE_REQUIRED_FIELDS)
+
+
+class ResultStore:
+    """Stores generated catalogs per upload and extracted Shopify rows per input row.
+
+    Whole files are keyed by (content hash, pipeline version, prompt version)
+    and kept as their own copy under `files_dir`, since a job's output path
+    is reused by later uploads with the same name; single rows are keyed by
+    (row fingerprint, pipeline version, prompt version), so a re-upload with
+    a few edited rows only re-processes those rows. Both are reused for
+    `row_ttl` seconds; rows only when they were stored complete (callers
+    only store whole files whose every row was).
+    """
+
+    def __init__(self, path, files_dir=None, row_ttl=ROW_RESULT_TTL_SECONDS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.files_dir = files_dir or os.path.join(os.path.dirname(path) or ".", "results")
+        self.row_ttl = row_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS catalog_results (
+                file_hash TEXT,
+                pipeline_version TEXT,
+                prompt_version TEXT,
+                source_file TEXT,
+                output_file TEXT,
+                created_at REAL,
+                complete INTEGER DEFAULT 0,
+                PRIMARY KEY (file_hash, pipeline_version, prompt_version)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS catalog_rows (
+                fingerprint TEXT,
+                pipeline_version TEXT,
+                prompt_version TEXT,
+                title TEXT,
+                rows_json TEXT,
+                updated_at REAL,
+                complete INTEGER DEFAULT 0,
+                PRIMARY KEY (fingerprint, pipeline_version, prompt_version)
+            )
+        """)
+        # Stores created before results were flagged: their catalogs and rows count as incomplete
+        for table in ("catalog_results", "catalog_rows"):
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if "complete" not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN complete INTEGER DEFAULT 0")
+        self._conn.commit()
+
+    def get(self, file_hash):
+        """Return the stored output path for an upload, if it is complete, younger than `row_ttl` and on disk."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output_file FROM catalog_results "
+                "WHERE file_hash = ? AND pipeline_version = ? AND prompt_version = ? "
+                "AND complete = 1 AND created_at >= ?",
+                (file_hash, PIPELINE_VERSION, prompt_version(), time.time() - self.row_ttl)
+            ).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+    def put(self, file_hash, source_file, output_file, complete=True):
+        """Copy a finished catalog to a path named by its upload's hash and record it; returns that path.
+
+        Incomplete catalogs are recorded but never returned by get().
+        """
+        os.makedirs(self.files_dir, exist_ok=True)
+        stored_file = os.path.join(self.files_dir, f"{file_hash}.csv")
+        shutil.copyfile(output_file, f"{stored_file}.part")
+        os.replace(f"{stored_file}.part", stored_file)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO catalog_results "
+                "(file_hash, pipeline_version, prompt_version, source_file, output_file, created_at, complete) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_hash, PIPELINE_VERSION, prompt_version(), source_file, stored_file, time.time(), int(complete))
+            )
+            self._conn.commit()
+        return stored_file
+
+    def get_rows(self, fingerprints):
+        """Return {fingerprint: [shopify rows]} for the fingerprints already extracted, complete and fresh."""
+        found = {}
+        fingerprints = list(fingerprints)
+        fresh_after = time.time() - self.row_ttl
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(fingerprints), 500):
+                batch = fingerprints[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                for fingerprint, rows_json in self._conn.execute(
+                    f"SELECT fingerprint, rows_json FROM catalog_rows "
+                    f"WHERE pipeline_version = ? AND prompt_version = ? AND complete = 1 AND updated_at >= ? "
+                    f"AND fingerprint IN ({placeholders})",
+                    (PIPELINE_VERSION, prompt_version(), fresh_after, *batch)
+                ):
+                    found[fingerprint] = json.loads(rows_json)
+        return found
+
+    def put_rows(self, fingerprint, title, rows):
+        """Store one input row's extracted rows; returns whether they were complete."""
+        complete = rows_complete(rows)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO catalog_rows "
+                "(fingerprint, pipeline_version, prompt_version, title, rows_json, updated_at, complete) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint, PIPELINE_VERSION, prompt_version(), title,
+                 json.dumps(rows, ensure_ascii=False), time.time(), int(complete))
+            )
+            self._conn.commit()
+        return complete
+
+
+@lru_cache(maxsize=None)
+def get_result_store():
+    return ResultStore(os.getenv("RESULT_STORE_PATH", os.path.join(CACHE_DIR, "results.sqlite3")))
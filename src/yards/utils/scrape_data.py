@@ -1,27 +1,39 @@
 import asyncio
 import threading
-import requests
 import os
-import json
 import re
 import csv
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-import extruct
-from urllib.parse import urljoin
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse
 from rapidfuzz import process, fuzz
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from yards.utils.utils import llm_init, call_llm
-from yards.utils.config import PROMPT_TEMPLATES
+from yards.utils.llm_router import call_task
+from yards.utils.llm_client import get_status_code
+from yards.utils.config import (
+    PROMPT_TEMPLATES,
+    SCRAPE_USER_AGENT,
+    PAGE_READY_TIMEOUT_MS,
+    BROWSER_TIMEOUT_SECONDS,
+    BLOCKED_RESOURCE_TYPES,
+    BLOCKED_REQUEST_DOMAINS,
+    PARSE_WORKERS,
+    SERPER_SEARCH_URL,
+    MAX_SOURCES_PER_TITLE,
+    TITLE_DEADLINE_SECONDS,
+    JUNK_LINK_DOMAINS,
+    SEARCH_PROVIDER,
+    PAGE_PROVIDER,
+    RECORD_SESSIONS,
+)
+from yards.utils.events import publish
+from yards.utils.metrics import span, traced, RATE_LIMITED
+from yards.utils.fetcher import get_scrape_client, fetch_shopify_product, fetch_html, has_required_fields
+from yards.utils.aggregator import rank_links, aggregate_sources
+from yards.utils.resilience import get_breaker, domain_of, is_unhealthy, CircuitOpen
 from dotenv import load_dotenv
 
 load_dotenv()
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 
-
-llm, prompt = llm_init()
-
 # ----------------------------------------------------------
 # CONFIG
 # ----------------------------------------------------------
@@ -62,6 +74,27 @@ os.makedirs(UPDATED_DIR, exist_ok=True)
 # ----------------------------------------------------------
 # Utility
 # ----------------------------------------------------------
+def warm_up(stop=None):
+    """Import the rendering/parsing stack ahead of the first scrape.
+
+    Checks the `stop` event (a threading.Event) between steps, so shutdown
+    doesn't wait for the remaining imports or start the parse pool.
+    """
+    def stopped():
+        return stop is not None and stop.is_set()
+
+    import playwright.async_api  # noqa: F401
+    if stopped():
+        return
+    import yards.utils.site_adapters  # noqa: F401
+    if PARSE_WORKERS > 0 and not stopped():
+        get_parse_pool()
+    if stopped():
+        return
+    import sklearn.feature_extraction.text  # noqa: F401
+    import sklearn.metrics.pairwise  # noqa: F401
+
+
 def get_base_url(html_content, page_url):
     base_href = re.search(r'<base\s+href=["\'](.*?)["\']', html_content, re.I)
     if base_href:
@@ -71,11 +104,15 @@ def get_base_url(html_content, page_url):
 # ----------------------------------------------------------
 # Brand Detection
 # ----------------------------------------------------------
+@traced("brand")
 async def detect_brand(product_name, brands):
     best_match, score, _ = process.extractOne(product_name, brands, scorer=fuzz.partial_ratio)
     if score >= 75:
         return best_match
 
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
     vectorizer = TfidfVectorizer().fit(brands + [product_name])
     vectors = vectorizer.transform(brands + [product_name])
     sims = cosine_similarity(vectors[-1], vectors[:-1]).flatten()
@@ -85,32 +122,106 @@ async def detect_brand(product_name, brands):
 
     prompt_text = """
     You are a product and brand expert.
-    Identify the brand for the following product:
-    Product: "{product_name}"
-    Possible brands: {brand_list}
-    Respond with ONLY the brand name from the list.
+    Identify the brand of the product in the user message.
+    Respond with ONLY the brand name from the list of possible brands.
     """
-    extractor_response = await call_llm(llm, prompt, prompt_text, {"product_name": product_name, "brand_list": ", ".join(brands)})
+    extractor_response = await call_task(
+        "classify", prompt_text, f'Product: "{product_name}"\nPossible brands: {", ".join(brands)}'
+    )
     brand = extractor_response.content.strip()
     return brand if brand in brands else None
 
 # ----------------------------------------------------------
 # Thread-safe Playwright
 # ----------------------------------------------------------
-async def fetch_page_in_thread(url: str, timeout_ms: int = 40000) -> str:
+# Readiness strategy -> (wait kind, target)
+READINESS_STRATEGIES = {
+    "jsonld": ("selector", 'script[type="application/ld+json"]'),
+    "shopify_meta": ("function", "() => !!(window.meta && window.meta.product)"),
+    "price": ("selector", '[itemprop="price"], .price, .product-price, .price-item, [data-product-price]'),
+    "domcontentloaded": (None, None),
+}
+
+
+def readiness_for(url):
+    from yards.utils.site_adapters import get_adapter
+
+    return get_adapter(url).readiness
+
+
+def is_blocked_request(resource_type, request_url):
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(request_url).netloc.lower()
+    return any(host == domain or host.endswith("." + domain) for domain in BLOCKED_REQUEST_DOMAINS)
+
+
+async def wait_until_ready(page, readiness, timeout_ms=PAGE_READY_TIMEOUT_MS):
+    """Wait for the product data a strategy needs, giving up quietly after timeout_ms."""
+    kind, target = READINESS_STRATEGIES.get(readiness, READINESS_STRATEGIES["jsonld"])
+    try:
+        if kind == "selector":
+            await page.wait_for_selector(target, state="attached", timeout=timeout_ms)
+        elif kind == "function":
+            await page.wait_for_function(target, timeout=timeout_ms)
+    except Exception:
+        print(f"[⏱️ {readiness} not ready after {timeout_ms}ms, using current DOM] {page.url}")
+
+
+async def fetch_page_in_thread(url: str, timeout_ms: int = None, readiness: str = None,
+                               block_resources: bool = True) -> str:
+    """Render a page in headless Chromium under the domain's browser circuit breaker.
+
+    The render budget adapts to the domain's recent render times (timeout_ms,
+    when given, caps it); raises CircuitOpen while the domain's renders
+    keep failing.
+    """
+    breaker = get_breaker("browser", domain_of(url))
+    budget = breaker.timeout(timeout_ms / 1000 if timeout_ms else BROWSER_TIMEOUT_SECONDS)
+    # Navigation leaves the readiness wait its share; the breaker enforces the total
+    navigation_ms = int(max(budget / 2, budget - PAGE_READY_TIMEOUT_MS / 1000) * 1000)
+    return await breaker.call(lambda: _render_page(url, navigation_ms, readiness, block_resources), ceiling=budget)
+
+
+def _settle(future, method, value):
+    # The waiting side may have timed out and cancelled the future already
+    if not future.done():
+        getattr(future, method)(value)
+
+
+async def _render_page(url, timeout_ms, readiness, block_resources):
+    if PAGE_PROVIDER == "fake":
+        from yards.utils.fakes import fake_rendered_page
+
+        return await fake_rendered_page(url)
+
     loop = asyncio.get_running_loop()
     future: asyncio.Future = loop.create_future()
+    readiness = readiness or readiness_for(url)
 
     def _worker():
+        from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+
+        async def _block(route):
+            request = route.request
+            if is_blocked_request(request.resource_type, request.url):
+                await route.abort()
+            else:
+                await route.continue_()
+
         async def _run():
             async with async_playwright() as p:
                 browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page(user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
+                page = await browser.new_page(user_agent=SCRAPE_USER_AGENT)
+                if block_resources:
+                    await page.route("**/*", _block)
                 try:
                     await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+                except PlaywrightTimeout:
+                    pass  # keep whatever has loaded; readiness wait below decides
                 except Exception:
-                    await page.goto(url, timeout=timeout_ms)
-                await page.wait_for_timeout(3000)
+                    await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+                await wait_until_ready(page, readiness)
                 html = await page.content()
                 await browser.close()
                 return html
@@ -118,103 +229,154 @@ async def fetch_page_in_thread(url: str, timeout_ms: int = 40000) -> str:
         try:
             result = asyncio.run(_run())
         except Exception as e:
-            loop.call_soon_threadsafe(future.set_exception, e)
+            loop.call_soon_threadsafe(_settle, future, "set_exception", e)
         else:
-            loop.call_soon_threadsafe(future.set_result, result)
+            loop.call_soon_threadsafe(_settle, future, "set_result", result)
 
     threading.Thread(target=_worker, daemon=True).start()
     return await future
 
-# ----------------------------------------------------------
-# Variant Extractor (from your first working code)
-# ----------------------------------------------------------
-async def extract_variants_from_shopify(soup):
-    variants = []
-
-    script_tags = soup.find_all("script", string=re.compile(r"Shopify\.product|var meta"))
-    for s in script_tags: 
-        s = s.string
-        match = re.search(r"var\s+meta\s*=\s*(\{.*?\});", s, re.S)
-        if match:
-            try:
-                shopify_json = json.loads(match.group(1))
-                product_data = shopify_json.get("product", {})
-                vendor = product_data.get("vendor")
-                for variant in product_data.get("variants", []):
-                    variants.append({
-                        "Variant Name": variant.get("name") or product_data.get("title"),
-                        "Variant SKU": variant.get("sku"),
-                        "Variant Price": variant.get("price") / 100 if isinstance(variant.get("price"), (int, float)) else variant.get("price"),
-                        "Currency": "INR",
-                        "Size": variant.get("public_title"),
-                        "Vendor": vendor
-                    })
-            except Exception as e:
-                print(f"[⚠️ Error parsing Shopify JSON] {e}")
-    return variants
-
 # ----------------------------------------------------------
 # Product Info
 # ----------------------------------------------------------
+def parse_product_html(html, url):
+    from yards.utils.site_adapters import parse_page
+
+    return parse_page(html, url)
+
+
+@lru_cache(maxsize=None)
+def get_parse_pool():
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Never fork the server: children would inherit its threads, locks and open sockets
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context(method))
+
+
+def shutdown_parse_pool():
+    if get_parse_pool.cache_info().currsize:
+        get_parse_pool().shutdown(wait=False, cancel_futures=True)
+
+
+@traced("parse")
+async def parse_product_html_async(html, url):
+    """Parse in the worker pool so the event loop keeps serving fetches."""
+    from concurrent.futures.process import BrokenProcessPool
+    from yards.utils.site_adapters import parse_page
+
+    if PARSE_WORKERS <= 0:
+        return parse_page(html, url)
+    loop = asyncio.get_running_loop()
+    pool = get_parse_pool()
+    try:
+        return await loop.run_in_executor(pool, parse_page, html, url)
+    except BrokenProcessPool:
+        print("[⚠️ Parse pool died, restarting]")
+        pool.shutdown(wait=False, cancel_futures=True)
+        # Concurrent parses see the same broken pool; only the first swaps it out
+        if get_parse_pool() is pool:
+            get_parse_pool.cache_clear()
+        return await asyncio.to_thread(parse_page, html, url)
+
+
 async def extract_product_info(url):
-    html = await fetch_page_in_thread(url)
+    from yards.utils.site_adapters import get_adapter
+
+    url = await get_adapter(url).resolve_url(url, fetch_html)
+
+    # Tier 1: Shopify stores expose the whole product as JSON
+    async with span("fetch", tier="shopify_json", url=url):
+        product = await fetch_shopify_product(url)
+    if has_required_fields(product):
+        print(f"⚡ {url} served from Shopify product JSON")
+        return product
+
+    # Tier 2: most stores ship JSON-LD / `var meta` in the initial HTML
+    async with span("fetch", tier="http", url=url):
+        html = await fetch_html(url)
+    if html:
+        product = await parse_product_html_async(html, url)
+        if has_required_fields(product):
+            print(f"⚡ {url} served from plain HTTP")
+            return product
+
+    # Tier 3: render with headless Chromium
+    try:
+        async with span("fetch", tier="browser", url=url):
+            html = await fetch_page_in_thread(url)
+    except CircuitOpen as e:
+        print(f"[⛔ Skipping render of {url}] {e}")
+        html = None
     if not html:
-        return {}
-
-    base_url = get_base_url(html, url)
-    data = extruct.extract(html, base_url=base_url, syntaxes=["json-ld", "microdata"])
-    soup = BeautifulSoup(html, "html.parser")
-
-    product = {}
-    product["Source URL"] = url
-
-    for entry in data.get("json-ld", []):
-        if entry.get("@type") == "Product":
-            product["Title"] = entry.get("name")
-            product["Body (HTML)"] = entry.get("description")
-            product["Image Src"] = entry.get("image")
-            offers = entry.get("offers", {})
-            if isinstance(offers, dict):
-                product["Variant Price"] = offers.get("price")
-                product["Currency"] = offers.get("priceCurrency")
-            break
-
-    meta_title = soup.find("meta", property="og:title")
-    meta_desc = soup.find("meta", attrs={"name": "description"})
-    product["SEO Title"] = meta_title["content"] if meta_title else product.get("Title")
-    product["SEO Description"] = meta_desc["content"] if meta_desc else product.get("Body (HTML)")
-
-    # ✅ Shopify variant extraction
-    variants = await extract_variants_from_shopify(soup)
-    if variants:
-        product["Variants"] = variants
-    else:
-        product["Variants"] = []
-
-    return product
+        return product or {}
+    return await parse_product_html_async(html, url)
 
 # ----------------------------------------------------------
 # Main: Search + Extract multiple sites
 # ----------------------------------------------------------
+async def search_serper(query, num=MAX_SOURCES_PER_TITLE):
+    """Organic Serper results for a query ([] on any failure)."""
+    headers = {"X-API-KEY": SERPER_API_KEY, "Content-Type": "application/json"}
+    try:
+        if SEARCH_PROVIDER == "fake":
+            from yards.utils.fakes import get_fake_search
+
+            async with span("search", query=query):
+                return await get_breaker("search", "fake").call(lambda: get_fake_search().search(query, num))
+
+        breaker = get_breaker("search", "serper")
+        async with span("search", query=query):
+            response = await breaker.call(
+                lambda: get_scrape_client().post(
+                    SERPER_SEARCH_URL, headers=headers, json={"q": query, "num": num},
+                ),
+                is_failure=is_unhealthy,
+            )
+        response.raise_for_status()
+        organic = response.json().get("organic", [])
+        if RECORD_SESSIONS:
+            from yards.utils.fakes import record_search
+
+            await asyncio.to_thread(record_search, query, organic)
+        return organic
+    except Exception as e:
+        if get_status_code(e) == 429:
+            RATE_LIMITED.inc(dependency="search")
+        print(f"[❌ Serper search failed for {query!r}] {e}")
+        return []
+
+
+async def scrape_product(name, max_sources=MAX_SOURCES_PER_TITLE, deadline=TITLE_DEADLINE_SECONDS):
+    """Search for one product title and merge its top sources into one product, or None."""
+    print(f"🔍 Fetching data for: {name}")
+    brand = await detect_brand(name, brands)
+    site = official_sites.get(brand)
+    official_domain = urlparse(site).netloc.lower().removeprefix("www.") if site else None
+    publish("brand_resolved", title=name, brand=brand)
+
+    # Official-site hits first, then the open web for retailers that fill the gaps
+    searches = [search_serper(name, max_sources + len(JUNK_LINK_DOMAINS))]
+    if official_domain:
+        searches.insert(0, search_serper(f"{name} site:{official_domain}", max_sources))
+    links = rank_links(await asyncio.gather(*searches), official_domain, limit=max_sources)
+    if not links:
+        publish("page_failed", title=name, error="no search results")
+        return None
+
+    try:
+        return await aggregate_sources(name, links, extract_product_info, official_domain, deadline)
+    except Exception as e:
+        print(f"[❌ Error fetching {name}] {e}")
+        publish("page_failed", title=name, error=str(e))
+    return None
+
+
 async def get_multi_source_product_pages(product_names):
     final_results = []
     for name in product_names:
-        print(f"🔍 Fetching data for: {name}")
-        brand = await detect_brand(name, brands)
-        domain = official_sites.get(brand)
-        query = f"{name} site:{domain}" if domain else name
-
-        url = "https://google.serper.dev/search"
-        headers = {"X-API-KEY": SERPER_API_KEY, "Content-Type": "application/json"}
-        payload = {"q": query, "num": 3}
-        try:
-            res = requests.post(url, headers=headers, json=payload)
-            data = res.json()
-            results = data.get("organic", [])
-            if results:
-                link = results[0].get("link")
-                prod = await extract_product_info(link)
-                final_results.append(prod)
-        except Exception as e:
-            print(f"[❌ Error fetching {name}] {e}")
+        prod = await scrape_product(name)
+        if prod is not None:
+            final_results.append(prod)
     return final_results
@@ -0,0 +1,203 @@
+import json
+import re
+import threading
+from urllib.parse import urljoin, urlparse
+from lxml import etree, html as lxml_html
+from yards.utils.json_extract import loads_lenient
+
+SHOPIFY_META = re.compile(r"var\s+meta\s*=\s*(\{.*?\});", re.S)
+# Wrappers some sites put around JSON-LD: <!-- -->, //<![CDATA[ ... //]]>, whole-line // comments
+JSONLD_LINE_COMMENT = re.compile(r"^\s*//.*$", re.M)
+JSONLD_OPENER = re.compile(r"^\s*(?:<!--|<!\[CDATA\[)")
+JSONLD_CLOSER = re.compile(r"(?:-->|\]\]>)\s*$")
+
+# lxml parsers aren't thread-safe and pages are parsed from to_thread workers: one parser per thread
+_parsers = threading.local()
+
+
+def html_parser():
+    parser = getattr(_parsers, "html", None)
+    if parser is None:
+        # Pages arrive as decoded text; feeding lxml UTF-8 bytes sidesteps encoding declarations
+        parser = _parsers.html = lxml_html.HTMLParser(encoding="utf-8")
+    return parser
+
+
+def parse_tree(html):
+    return lxml_html.fromstring(html.encode("utf-8"), parser=html_parser())
+
+
+def load_jsonld(block):
+    """Parse one JSON-LD script body as leniently as extruct did (comments, raw control characters)."""
+    text = JSONLD_LINE_COMMENT.sub("", block or "")
+    text = JSONLD_CLOSER.sub("", JSONLD_OPENER.sub("", text))
+    return loads_lenient(text.strip())
+
+
+def _jsonld_products(blocks):
+    """Yield every schema.org Product found in the page's JSON-LD blocks."""
+    for block in blocks:
+        try:
+            data = load_jsonld(block)
+        except (TypeError, ValueError):
+            continue
+        entries = data if isinstance(data, list) else [data]
+        while entries:
+            entry = entries.pop(0)
+            if not isinstance(entry, dict):
+                continue
+            if isinstance(entry.get("@graph"), list):
+                entries.extend(entry["@graph"])
+            types = entry.get("@type")
+            if types == "Product" or (isinstance(types, list) and "Product" in types):
+                yield entry
+
+
+# ----------------------------------------------------------
+# Base adapter
+# ----------------------------------------------------------
+class SiteAdapter:
+    """Extraction rules for one family of sites.
+
+    Subclasses list the domains they handle, the Playwright readiness
+    strategy for those pages and any XPath overrides. Expressions are
+    compiled once when the adapter is registered, and pages are parsed with
+    lxml so only the targeted nodes are ever walked.
+    """
+
+    domains = ()
+    readiness = "jsonld"
+    xpaths = {
+        "base_href": "//base/@href",
+        "jsonld": '//script[@type="application/ld+json"]/text()',
+        "og_title": '//meta[@property="og:title"]/@content',
+        "meta_description": '//meta[@name="description"]/@content',
+        "shopify_meta": '//script[contains(text(), "var meta")]/text()',
+    }
+
+    def __init__(self):
+        merged = {**SiteAdapter.xpaths, **self.xpaths}
+        self.compiled = {name: etree.XPath(expr) for name, expr in merged.items()}
+
+    def select(self, tree, name):
+        return self.compiled[name](tree)
+
+    def first(self, tree, name):
+        found = self.select(tree, name)
+        return found[0] if found else None
+
+    async def resolve_url(self, url, fetch_html):
+        """Turn a search hit into the product page URL (listing pages etc.)."""
+        return url
+
+    def extract_variants(self, tree):
+        variants = []
+        for script in self.select(tree, "shopify_meta"):
+            match = SHOPIFY_META.search(script)
+            if not match:
+                continue
+            try:
+                shopify_json = json.loads(match.group(1))
+                product_data = shopify_json.get("product", {})
+                vendor = product_data.get("vendor")
+                for variant in product_data.get("variants", []):
+                    price = variant.get("price")
+                    variants.append({
+                        "Variant Name": variant.get("name") or product_data.get("title"),
+                        "Variant SKU": variant.get("sku"),
+                        "Variant Price": price / 100 if isinstance(price, (int, float)) else price,
+                        "Currency": "INR",
+                        "Size": variant.get("public_title"),
+                        "Vendor": vendor
+                    })
+            except Exception as e:
+                print(f"[⚠️ Error parsing Shopify JSON] {e}")
+        return variants
+
+    def parse(self, html, url):
+        tree = parse_tree(html)
+
+        product = {}
+        product["Source URL"] = url
+
+        for entry in _jsonld_products(self.select(tree, "jsonld")):
+            product["Title"] = entry.get("name")
+            product["Body (HTML)"] = entry.get("description")
+            product["Image Src"] = entry.get("image")
+            offers = entry.get("offers", {})
+            if isinstance(offers, list) and offers:
+                offers = offers[0]
+            if isinstance(offers, dict):
+                product["Variant Price"] = offers.get("price") or offers.get("lowPrice")
+                product["Currency"] = offers.get("priceCurrency")
+            break
+
+        meta_title = self.first(tree, "og_title")
+        meta_desc = self.first(tree, "meta_description")
+        product["SEO Title"] = meta_title if meta_title else product.get("Title")
+        product["SEO Description"] = meta_desc if meta_desc else product.get("Body (HTML)")
+
+        product["Variants"] = self.extract_variants(tree)
+        return product
+
+
+ADAPTERS = {}
+DEFAULT_ADAPTER = SiteAdapter()
+
+
+def register_adapter(cls):
+    adapter = cls()
+    for domain in cls.domains:
+        ADAPTERS[domain] = adapter
+    return cls
+
+
+def get_adapter(url):
+    """Adapter for a URL's host (www. optional), falling back to the generic one."""
+    host = urlparse(url).netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return ADAPTERS.get(host, DEFAULT_ADAPTER)
+
+
+def parse_page(html, url):
+    """Worker-process entry point: raw HTML in, compact product dict out."""
+    return get_adapter(url).parse(html, url)
+
+
+# ----------------------------------------------------------
+# Site adapters (domains from scrape_data.official_sites)
+# ----------------------------------------------------------
+@register_adapter
+class ShopifyAdapter(SiteAdapter):
+    domains = ("shop.teamsg.in", "kookaburrasport.com.au", "moonwalkr.com", "payntr.com")
+    readiness = "shopify_meta"
+
+
+@register_adapter
+class SSAdapter(SiteAdapter):
+    # Magento store; search often lands on /all-products/<category>.html listings
+    domains = ("sstoncricket.com",)
+    readiness = "price"
+    xpaths = {
+        "listing_links": '//a[contains(concat(" ", normalize-space(@class), " "), " product-item-link ")]/@href',
+    }
+    listing_path = re.compile(r"/all-products/.*\.html")
+
+    async def resolve_url(self, url, fetch_html):
+        if not self.listing_path.search(url):
+            return url  # not a listing
+        try:
+            html = await fetch_html(url)
+            if html:
+                tree = parse_tree(html)
+                base = self.first(tree, "base_href") or url
+                product_link = self.first(tree, "listing_links")
+                if product_link:
+                    resolved = urljoin(base, product_link)
+                    print(f"[🔗 Resolved listing → product: {resolved}]")
+                    return resolved
+        except Exception as e:
+            print(f"[WARN] Could not resolve listing page: {e}")
+        return url
+
@@ -0,0 +1,89 @@
+import asyncio
+import os
+from yards.utils.config import READ_BATCH_ROWS
+
+
+def _iter_xlsx(file_path, columns, batch_size):
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of building the whole workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        positions = {
+            str(name).strip(): index for index, name in enumerate(header)
+            if name is not None and str(name).strip() in columns
+        }
+
+        batch = []
+        for values in rows:
+            batch.append({
+                column: values[index] if index < len(values) else None
+                for column, index in positions.items()
+            })
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        workbook.close()
+
+
+def _iter_csv(file_path, columns, batch_size):
+    import pandas as pd
+
+    with pd.read_csv(
+        file_path,
+        usecols=lambda name: name.strip() in columns,
+        chunksize=batch_size,
+        dtype=str,
+    ) as reader:
+        for chunk in reader:
+            chunk.columns = [name.strip() for name in chunk.columns]
+            yield chunk.to_dict(orient="records")
+
+
+def _iter_xls(file_path, columns, batch_size):
+    import pandas as pd
+
+    # Legacy .xls has no streaming reader; load only the needed columns
+    frame = pd.read_excel(file_path, usecols=lambda name: str(name).strip() in columns)
+    frame.columns = [str(name).strip() for name in frame.columns]
+    for start in range(0, len(frame), batch_size):
+        yield frame.iloc[start:start + batch_size].to_dict(orient="records")
+
+
+def iter_row_batches(file_path, columns, batch_size=READ_BATCH_ROWS):
+    """Yield lists of row dicts holding only `columns`, reading the file incrementally."""
+    columns = set(columns)
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".csv":
+        return _iter_csv(file_path, columns, batch_size)
+    if extension == ".xlsx":
+        return _iter_xlsx(file_path, columns, batch_size)
+    if extension == ".xls":
+        return _iter_xls(file_path, columns, batch_size)
+    raise ValueError("Unsupported file format")
+
+
+async def aiter_row_batches(file_path, columns, batch_size=READ_BATCH_ROWS):
+    """Async version of iter_row_batches; parsing runs in a worker thread."""
+    batches = iter_row_batches(file_path, columns, batch_size)
+    try:
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            yield batch
+    finally:
+        # A consumer that stops early must still release the workbook / CSV handle
+        try:
+            batches.close()
+        except ValueError:
+            # Cancelled mid-read: the worker thread still owns the generator
+            pass
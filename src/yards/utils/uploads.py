@@ -0,0 +1,71 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from datetime import datetime
+from yards.utils.config import UPLOAD_CHUNK_BYTES, MAX_UPLOAD_BYTES
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def reserve_path(upload_dir, filename, digest):
+    """Atomically claim a free name: the original one, else name_<timestamp>_<hash><ext>."""
+    name, ext = os.path.splitext(filename)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    candidates = [
+        filename,
+        f"{name}_{timestamp}_{digest[:8]}{ext}",
+        f"{name}_{timestamp}_{uuid.uuid4().hex[:8]}{ext}",
+    ]
+    for candidate in candidates:
+        path = os.path.join(upload_dir, candidate)
+        try:
+            # O_EXCL makes the existence check and the claim one atomic step
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return candidate, path
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"Could not find a free name for {filename}")
+
+
+async def save_upload(file, upload_dir, max_bytes=MAX_UPLOAD_BYTES):
+    """Stream an UploadFile to disk in fixed-size chunks.
+
+    The body is hashed while it is written to a hidden temp file, then
+    renamed over a reserved, collision-free name. Disk writes happen in a
+    worker thread so the event loop never blocks, and memory use stays at
+    one chunk regardless of the upload size.
+    """
+    filename = os.path.basename(file.filename or "upload")
+    tmp_path = os.path.join(upload_dir, f".{uuid.uuid4().hex}.part")
+    hasher = hashlib.sha256()
+    size = 0
+    file_path = None
+
+    out = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"{filename} exceeds the {max_bytes} byte upload limit")
+            hasher.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+        await asyncio.to_thread(out.close)
+
+        digest = hasher.hexdigest()
+        filename, file_path = await asyncio.to_thread(reserve_path, upload_dir, filename, digest)
+        await asyncio.to_thread(os.replace, tmp_path, file_path)
+    except BaseException:
+        out.close()
+        # The .part file, and the empty placeholder reserve_path claimed if the rename failed
+        for path in (tmp_path, file_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return {"filename": filename, "file_path": file_path, "sha256": digest, "size": size}
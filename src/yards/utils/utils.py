@@ -1,13 +1,11 @@
 from pathlib import Path
-import os, sys, json, re
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-# from yards.utils.config import GROQ_API_KEY
-from dotenv import load_dotenv
-
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
+import sys, asyncio
+from yards.utils.config import DEFAULT_LLM_MODEL, PROMPT_TEMPLATES, LLM_PROVIDER, RECORD_SESSIONS
+from yards.utils.llm_client import get_llm, get_prompt, get_model_config, invoke_with_retries
+from yards.utils.llm_cache import get_llm_cache
+from yards.utils.json_extract import parse_json
+from yards.utils.prompts import record_usage
+from yards.utils.metrics import span, CACHE_HITS, CACHE_MISSES
 
 
 def get_base_dir():
@@ -20,41 +18,58 @@ def get_base_dir():
         base_path = Path(__file__).resolve().parent.parent
         return base_path
     
-def llm_init():
-    # Initialize Groq LLM
-    llm = ChatGroq(
-        groq_api_key=GROQ_API_KEY,
-        model_name="llama-3.1-8b-instant",
-        temperature=0,
-    )
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "{system_prompt}"),
-        ("human", "{user_input}")
-    ])
+def llm_init(model_name=None):
+    # Shared, pooled Groq client from the process-wide registry
+    return get_llm(model_name or DEFAULT_LLM_MODEL), get_prompt()
 
-    return llm, prompt
 
+async def call_llm(llm, prompt, system_prompt, user_input, retries=None, use_cache=True, json_mode=False,
+                   json_array=True, breaker=None):
+    model_name = getattr(llm, "model_name", None)
+    # JSON mode only where the model supports it; prompts still ask for JSON either way
+    json_mode = json_mode and get_model_config(model_name).get("json_mode", False)
+    if json_mode and json_array:
+        # JSON mode only allows an object at the top level
+        system_prompt = f"{system_prompt}\n{PROMPT_TEMPLATES['json_mode_suffix']}"
 
-async def call_llm(llm, prompt, system_prompt, user_input):
-    response = await llm.ainvoke(prompt.format_messages(
+    messages = prompt.format_messages(
         system_prompt=system_prompt,
         user_input=user_input
-    ))
+    )
+
+    # Only deterministic (temperature 0) calls are served from the on-disk cache
+    cache = get_llm_cache() if use_cache and not getattr(llm, "temperature", 0) else None
+    if cache is not None:
+        cache_key = cache.make_key(
+            model_name,
+            [(m.type, m.content) for m in messages],
+            {"temperature": getattr(llm, "temperature", 0), "json_mode": json_mode}
+        )
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            from langchain_core.messages import AIMessage
+
+            CACHE_HITS.inc(cache="llm")
+            record_usage(model_name, get_model_config(model_name), cache_hit=True)
+            return AIMessage(content=cached, response_metadata={"cached": True})
+
+        CACHE_MISSES.inc(cache="llm")
+
+    runnable = llm.bind(response_format={"type": "json_object"}) if json_mode else llm
+    with span("llm", model=model_name):
+        response = await invoke_with_retries(runnable, messages, retries=retries, model_name=model_name,
+                                             breaker=breaker)
+    record_usage(model_name, get_model_config(model_name), response)
+
+    if cache is not None and isinstance(response.content, str):
+        await asyncio.to_thread(cache.set, cache_key, model_name, response.content)
+    if RECORD_SESSIONS and LLM_PROVIDER != "fake":
+        from yards.utils.fakes import record_llm_exchange
+
+        await asyncio.to_thread(record_llm_exchange, messages, response.content, model_name)
 
     return response
 
 
 def parse_json_output(text):
-    # Remove anything before the first { or [
-    match = re.search(r'[\{\[]', text)
-    if not match:
-        raise ValueError("No JSON object/array found")
-    text = text[match.start():].strip()
-    
-    # Optional: remove any trailing characters after the last } or ]
-    last_brace = max(text.rfind('}'), text.rfind(']'))
-    if last_brace != -1:
-        text = text[:last_brace+1]
-
-    return json.loads(text)
\ No newline at end of file
+    return parse_json(text)
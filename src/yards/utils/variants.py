@@ -0,0 +1,140 @@
+import re
+from yards.utils.config import SHOPIFY_HEADERS, VARIANT_ROW_DEFAULTS
+
+# Names used when a page lists variant values without naming the options
+DEFAULT_OPTION_NAMES = ["Size", "Color", "Style"]
+PUBLIC_TITLE_SEPARATOR = " / "
+BLOCK_TAGS = "p|div|ul|ol|li|h[1-6]|table|blockquote|section"
+HAS_BLOCK = re.compile(rf"<\s*(?:{BLOCK_TAGS}|br)\b", re.IGNORECASE)
+# <p> wrapped around content that is already block-level (<p><p>..</p></p>, <p><ul>..</ul></p>)
+REDUNDANT_P = re.compile(rf"^<p>\s*(<({BLOCK_TAGS})\b.*</\2\s*>)\s*</p>$", re.IGNORECASE | re.DOTALL)
+
+
+def make_handle(title):
+    """Shopify handle: lowercase, non-alphanumerics collapsed to '-', trimmed."""
+    return re.sub(r"[^a-z0-9]+", "-", str(title or "").lower()).strip("-")
+
+
+def clean_html_line(text):
+    """Collapse a description to one clean line (no newlines, NBSPs or mojibake)."""
+    text = str(text or "").replace("\u00a0", " ").replace("Â", "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def body_html(description):
+    """Wrap a plain description in one <p>; HTML descriptions keep their own blocks.
+
+    A redundant outer <p> around block content is unwrapped, so copy that
+    arrives as "<p><p>...</p></p>" ends up with a single paragraph.
+    """
+    text = clean_html_line(description)
+    if not text:
+        return text
+    if not HAS_BLOCK.search(text):
+        return f"<p>{text}</p>"
+    while (match := REDUNDANT_P.match(text)):
+        text = match.group(1)
+    return text
+
+
+def _blank(value):
+    return value is None or value == "" or value == []
+
+
+def _images(product):
+    images = product.get("Image Src")
+    if _blank(images):
+        return []
+    if isinstance(images, (list, tuple)):
+        return [src for src in images if isinstance(src, str) and src.startswith("http")]
+    return [images] if isinstance(images, str) and images.startswith("http") else []
+
+
+def _option_values(variant):
+    """Option1..3 values of a scraped variant (Shopify `public_title` split when absent)."""
+    values = [variant.get(f"Option{i}") for i in range(1, 4)]
+    if any(not _blank(value) for value in values):
+        return [value for value in values if not _blank(value)]
+    size = variant.get("Size")
+    if _blank(size):
+        return []
+    return [part.strip() for part in str(size).split(PUBLIC_TITLE_SEPARATOR) if part.strip()]
+
+
+def option_names(product, variants):
+    """Option names for a product: the page's own names, else DEFAULT_OPTION_NAMES."""
+    names = [name for name in product.get("Options") or [] if not _blank(name)]
+    width = max((len(_option_values(v)) for v in variants), default=0)
+    if names == ["Title"] or not width:
+        return []
+    return (names + DEFAULT_OPTION_NAMES[len(names):])[:width]
+
+
+def expand_variants(product, title=None):
+    """Map one scraped product onto Shopify CSV rows, one row per variant.
+
+    Option names/values, SKU, prices, barcode, grams and images come straight
+    from the scraped variants; product-level fields are repeated on every row
+    and VARIANT_ROW_DEFAULTS fill Published/Status and the inventory columns.
+    The catalog `title` (and its handle) wins over the scraped page's, which
+    is only used when the catalog row has none. A product without variants
+    becomes a single "Default Title" row.
+    """
+    if not product:
+        return []
+
+    catalog_title = str(title or "").strip()
+    title = catalog_title or product.get("Title") or ""
+    images = _images(product)
+    variants = [v for v in product.get("Variants") or [] if isinstance(v, dict)]
+    names = option_names(product, variants)
+
+    base = {header: "" for header in SHOPIFY_HEADERS}
+    base.update(VARIANT_ROW_DEFAULTS)
+    base.update({
+        "Handle": make_handle(title) if catalog_title else product.get("Handle") or make_handle(title),
+        "Title": title,
+        "Body (HTML)": body_html(product.get("Body (HTML)")),
+        "Vendor": product.get("Vendor") or next((v.get("Vendor") for v in variants if v.get("Vendor")), ""),
+        "Type": product.get("Type") or "",
+        "Tags": product.get("Tags") or "",
+        "Variant Price": product.get("Variant Price") or "",
+        "Image Src": images,
+        "Image Position": 1 if images else "",
+        "Image Alt Text": title if images else "",
+        "SEO Title": product.get("SEO Title") or title,
+        "SEO Description": clean_html_line(product.get("SEO Description")),
+    })
+
+    if not names:
+        return [{**base, "Option1 Name": "Title", "Option1 Value": "Default Title",
+                 "Variant SKU": (variants[0].get("Variant SKU") or "") if variants else ""}]
+
+    rows = []
+    seen = set()
+    for variant in variants:
+        values = _option_values(variant)[:len(names)]
+        if not values or tuple(values) in seen:
+            continue
+        seen.add(tuple(values))
+
+        row = dict(base)
+        for i, name in enumerate(names, start=1):
+            row[f"Option{i} Name"] = name
+            row[f"Option{i} Value"] = values[i - 1] if i <= len(values) else ""
+        for field in ("Variant SKU", "Variant Price", "Variant Compare At Price",
+                      "Variant Barcode", "Variant Grams", "Variant Image"):
+            if not _blank(variant.get(field)):
+                row[field] = variant[field]
+        if not _blank(variant.get("Variant Grams")):
+            row["Variant Weight Unit"] = "g"
+        rows.append(row)
+    return rows
+
+
+def apply_product_copy(rows, copy):
+    """Overlay LLM-written free-text fields (same for every variant) onto expanded rows."""
+    copy = {key: value for key, value in (copy or {}).items() if key in SHOPIFY_HEADERS and not _blank(value)}
+    if "Body (HTML)" in copy:
+        copy["Body (HTML)"] = body_html(copy["Body (HTML)"])
+    return [{**row, **copy} for row in rows]
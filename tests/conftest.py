@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The package lives under src/ and isn't installed; CI runs pytest from the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
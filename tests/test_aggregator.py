@@ -0,0 +1,64 @@
+import asyncio
+
+from yards.utils.aggregator import aggregate_sources, is_listing_url, merge_products, rank_links
+
+COMPLETE = {"Title": "SG Abdominal Pad", "Body (HTML)": "<p>Guard</p>", "Image Src": ["a.jpg"], "Variant Price": "499"}
+
+
+def fake_extract(delays, titles):
+    async def extract(link):
+        await asyncio.sleep(delays[link])
+        return dict(COMPLETE, Title=titles[link], **{"Source URL": link})
+    return extract
+
+
+def test_rank_links_puts_listing_pages_after_product_pages():
+    results = [[
+        {"link": "https://sgcricket.com/collections/protective-gear"},
+        {"link": "https://sportsuncle.com/sg-abdominal-pad"},
+        {"link": "https://sgcricket.com/products/abdominal-pad?variant=1"},
+        {"link": "https://www.youtube.com/watch?v=1"},
+        {"link": "https://sgcricket.com/products/abdominal-pad"},
+    ]]
+    assert rank_links(results, "sgcricket.com") == [
+        "https://sgcricket.com/products/abdominal-pad?variant=1",
+        "https://sportsuncle.com/sg-abdominal-pad",
+        "https://sgcricket.com/collections/protective-gear",
+    ]
+
+
+def test_is_listing_url():
+    assert is_listing_url("https://shop.com/collections/bats")
+    assert is_listing_url("https://shop.com/product-category/pads/")
+    assert not is_listing_url("https://shop.com/collections/bats/products/sg-bat")
+    assert not is_listing_url("https://shop.com/sg-bat")
+
+
+def test_faster_lower_ranked_source_in_same_tier_does_not_end_the_wait():
+    links = ["https://sgcricket.com/products/abdominal-pad", "https://sgcricket.com/products/other"]
+    extract = fake_extract({links[0]: 0.1, links[1]: 0.0}, {links[0]: "Rank 1", links[1]: "Rank 2"})
+
+    merged = asyncio.run(aggregate_sources("pad", links, extract, "sgcricket.com"))
+
+    assert merged["Title"] == "Rank 1"
+    assert merged["Sources"] == links
+
+
+def test_stops_once_best_ranked_source_is_complete():
+    links = ["https://sgcricket.com/products/abdominal-pad", "https://sportsuncle.com/pad"]
+    extract = fake_extract({links[0]: 0.0, links[1]: 5.0}, {links[0]: "Official", links[1]: "Retailer"})
+
+    merged = asyncio.run(aggregate_sources("pad", links, extract, "sgcricket.com"))
+
+    assert merged["Sources"] == [links[0]]
+
+
+def test_merge_products_first_non_blank_value_wins():
+    merged = merge_products([
+        {"Title": "Official", "Body (HTML)": "", "Image Src": ["a.jpg"], "Source URL": "u1"},
+        {"Title": "Retailer", "Body (HTML)": "<p>Body</p>", "Image Src": ["a.jpg", "b.jpg"], "Source URL": "u2"},
+    ])
+    assert merged["Title"] == "Official"
+    assert merged["Body (HTML)"] == "<p>Body</p>"
+    assert merged["Image Src"] == ["a.jpg", "b.jpg"]
+    assert merged["Sources"] == ["u1", "u2"]
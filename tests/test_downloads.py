@@ -0,0 +1,101 @@
+import gzip
+import os
+
+import pytest
+
+from yards.utils.downloads import (
+    FileChanged,
+    RangeNotSatisfiable,
+    accepts_gzip,
+    file_validators,
+    gzip_chunks,
+    if_range_matches,
+    iter_file,
+    iter_file_version,
+    parse_range,
+)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=0-1,5-9", None),
+    ("items=0-9", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header, size", [("bytes=1000-", 1000), ("bytes=5-2", 1000), ("bytes=-0", 1000), ("bytes=-10", 0)])
+def test_parse_range_not_satisfiable(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
+
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, *;q=0.5")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip(None)
+
+
+def test_if_range_only_matches_the_current_version(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_bytes(b"Handle,Title\n")
+    validators = file_validators(os.stat(path))
+
+    assert if_range_matches(None, validators)
+    assert if_range_matches(validators["ETag"], validators)
+    assert if_range_matches(validators["Last-Modified"], validators)
+    assert not if_range_matches("W/" + validators["ETag"], validators)
+    assert not if_range_matches("not a date", validators)
+
+    path.write_bytes(b"Handle,Title\nsg-bat,SG Bat\n")
+    assert not if_range_matches(validators["ETag"], file_validators(os.stat(path)))
+
+
+def test_iter_file_ranges_and_open_files(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(256)) * 10)
+    assert b"".join(iter_file(str(path), 10, 19, chunk_size=3)) == bytes(range(10, 20))
+    assert b"".join(iter_file(str(path), chunk_size=100)) == path.read_bytes()
+    # An open file is read only up to `end`, even if it has grown since it was stat'ed
+    with open(path, "ab") as f:
+        f.write(b"appended later")
+    assert b"".join(iter_file(open(path, "rb"), 0, 2559)) == bytes(range(256)) * 10
+
+
+def test_iter_file_version_checks_the_advertised_version(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"Handle,Title\nsg-bat,SG Bat\n")
+    stat = os.stat(path)
+    assert b"".join(iter_file_version(str(path), stat, 0, 5)) == b"Handle"
+
+    with open(path, "ab") as f:
+        f.write(b"sg-pad,SG Pad\n")
+    with pytest.raises(FileChanged):
+        b"".join(iter_file_version(str(path), stat, 0, stat.st_size - 1))
+    # A running job's CSV only grows: read it up to the advertised size
+    assert b"".join(iter_file_version(str(path), stat, 0, stat.st_size - 1, strict=False)) == (
+        b"Handle,Title\nsg-bat,SG Bat\n")
+
+
+def test_iter_file_version_opens_nothing_until_streamed(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"x")
+    stream = iter_file_version(str(path), os.stat(path))
+    os.remove(path)
+    with pytest.raises(FileNotFoundError):
+        next(stream)
+
+
+def test_gzip_chunks_round_trip():
+    chunks = [b"Handle,Title\n", b"sg-bat,SG Bat\n" * 1000]
+    assert gzip.decompress(b"".join(gzip_chunks(iter(chunks)))) == b"".join(chunks)
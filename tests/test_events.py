@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+from yards.utils.events import CHANNELS, get_channel, publish, sse_stream
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def parse(chunks):
+    return [json.loads(chunk.split("data: ", 1)[1]) for chunk in chunks if chunk.startswith("event:")]
+
+
+def test_finished_job_replays_history_and_ends():
+    async def run():
+        publish("job_started", job_id="job-1", output_file="a.csv")
+        publish("job_completed", job_id="job-1", output_file="a.csv")
+        return await collect(sse_stream("job-1", final_event={"stage": "job_completed"}))
+
+    try:
+        assert [event["stage"] for event in parse(asyncio.run(run()))] == ["job_started", "job_completed"]
+    finally:
+        CHANNELS.pop("job-1", None)
+
+
+def test_evicted_channel_sends_final_event_without_creating_one():
+    final = {"job_id": "job-2", "stage": "job_completed", "output_file": "a.csv"}
+    assert parse(asyncio.run(collect(sse_stream("job-2", final_event=final)))) == [final]
+    assert get_channel("job-2", create=False) is None
+
+
+def test_live_subscriber_gets_events_until_terminal_one():
+    async def run():
+        stream = sse_stream("job-3")
+        reader = asyncio.ensure_future(collect(stream))
+        await asyncio.sleep(0)
+        publish("rows_written", job_id="job-3", count=2)
+        publish("job_failed", job_id="job-3", error="boom")
+        return await asyncio.wait_for(reader, 1)
+
+    try:
+        assert [event["stage"] for event in parse(asyncio.run(run()))] == ["rows_written", "job_failed"]
+    finally:
+        CHANNELS.pop("job-3", None)
@@ -0,0 +1,63 @@
+from yards.utils.json_extract import parse_json, parse_products, split_objects
+
+
+def test_parses_products_wrapper():
+    result = parse_products('{"products": [{"Title": "SG Bat", "Variant Price": "100"}, {"Title": "SG Pad"}]}')
+    assert [p["Title"] for p in result["products"]] == ["SG Bat", "SG Pad"]
+    assert result["failed"] == [] and result["truncated"] is None
+
+
+def test_bare_product_with_list_first_field_is_not_a_wrapper():
+    result = parse_products('{"Image Src": ["a.jpg", "b.jpg"], "Title": "SG Bat"}')
+    assert result["products"] == [{"Image Src": ["a.jpg", "b.jpg"], "Title": "SG Bat"}]
+    assert result["failed"] == []
+
+
+def test_bare_array_in_prose():
+    result = parse_products('Here you go:\n[{"Title": "A"}, {"Title": "B"}]\nThanks')
+    assert [p["Title"] for p in result["products"]] == ["A", "B"]
+
+
+def test_truncated_reply_keeps_finished_objects():
+    result = parse_products('{"products": [{"Title": "A"}, {"Title": "B", "Body (HTML)": "<p>cut')
+    assert [p["Title"] for p in result["products"]] == ["A"]
+    assert result["truncated"].startswith('{"Title": "B"')
+
+
+def test_invalid_and_incomplete_objects_are_reported():
+    result = parse_products('[{"Title": "A",}, {"Vendor": "SG"}, {"Title": }]')
+    assert [p["Title"] for p in result["products"]] == ["A"]
+    invalid, incomplete = result["failed"]
+    assert invalid["fragment"] == '{"Title": }' and invalid["errors"][0].startswith("invalid JSON")
+    assert incomplete["errors"] == ['missing required field "Title"']
+
+
+def test_validation_drops_unknown_keys_and_joins_scalar_lists():
+    result = parse_products('[{"Title": "A", "Colour": "red", "Vendor": ["SG", "Kookaburra"], "Tags": ["x"]}]')
+    assert result["products"] == [{"Title": "A", "Vendor": "SG, Kookaburra", "Tags": ["x"]}]
+
+
+def test_unparseable_reply_is_reported_for_repair():
+    result = parse_products("Sorry, I could not find any product details.")
+    assert result["products"] == []
+    assert result["failed"][0]["errors"] == ["no product objects found"]
+
+
+def test_explicit_empty_reply_is_not_a_failure():
+    for text in ("[]", '{"products": []}', "  "):
+        assert parse_products(text) == {"products": [], "failed": [], "truncated": None}
+
+
+def test_split_objects_ignores_braces_inside_strings():
+    objects, failed, truncated = split_objects('[{"Title": "A {b}", "Body (HTML)": "\\"}"}, {"Title": "C"}]')
+    assert objects == [{"Title": "A {b}", "Body (HTML)": '"}'}, {"Title": "C"}]
+    assert failed == [] and truncated is None
+
+
+def test_wrapper_with_list_after_other_keys():
+    result = parse_products('{"count": 2, "products": [{"Title": "A"}, {"Title": "B"}]}')
+    assert [p["Title"] for p in result["products"]] == ["A", "B"]
+
+
+def test_parse_json_repairs_common_slips():
+    assert parse_json('Result: {"path": "C:\\data", "items": [1, 2,],}') == {"path": "C:\\data", "items": [1, 2]}
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from yards.utils import llm_router
+from yards.utils.llm_router import ModelRouter
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def make_router(monkeypatch, outcomes):
+    """Router over one model and two keys whose calls play back `outcomes`."""
+    calls = []
+
+    async def fake_call_llm(llm, prompt, system_prompt, user_input, **kwargs):
+        calls.append(kwargs)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(llm_router, "call_llm", fake_call_llm)
+    monkeypatch.setattr(llm_router, "get_llm", lambda model_name, api_key: None)
+    monkeypatch.setattr(llm_router, "get_prompt", lambda: None)
+    monkeypatch.setattr(llm_router, "retry_delay", lambda e, attempt: 0)
+    model = next(iter(llm_router.LLM_ROUTES.values()))[0]
+    return ModelRouter(routes={"extract": [model]}, api_keys=["key-a", "key-b"]), calls
+
+
+class Response:
+    content = "[]"
+    response_metadata = {}
+    usage_metadata = {"input_tokens": 7, "output_tokens": 3}
+
+
+def test_failed_call_releases_its_reservation(monkeypatch):
+    router, calls = make_router(monkeypatch, [RateLimited(), Response()])
+
+    asyncio.run(router.call("extract", "system", "input"))
+
+    windows = [list(d.window) for d in router.candidates("extract")]
+    assert sorted(len(window) for window in windows) == [0, 1]
+    assert all(call["breaker"] is not None for call in calls)
+
+
+def test_non_retryable_error_still_releases(monkeypatch):
+    router, _ = make_router(monkeypatch, [ValueError("bad prompt")])
+
+    with pytest.raises(ValueError):
+        asyncio.run(router.call("extract", "system", "input"))
+
+    assert all(not d.window for d in router.candidates("extract"))
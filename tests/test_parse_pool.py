@@ -0,0 +1,30 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from yards.utils import scrape_data
+
+
+class BrokenPool:
+    def __init__(self):
+        self.shutdown_calls = []
+
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self, **kwargs):
+        self.shutdown_calls.append(kwargs)
+
+
+def test_broken_pool_is_shut_down_and_replaced(monkeypatch):
+    broken = BrokenPool()
+    pools = [broken, "replacement"]
+    monkeypatch.setattr(scrape_data, "PARSE_WORKERS", 2)
+    monkeypatch.setattr(scrape_data, "get_parse_pool", lru_cache(maxsize=None)(lambda: pools.pop(0)))
+    monkeypatch.setattr("yards.utils.site_adapters.parse_page", lambda html, url: {"url": url})
+
+    result = asyncio.run(scrape_data.parse_product_html_async("<html></html>", "https://shop.test/p"))
+
+    assert result == {"url": "https://shop.test/p"}
+    assert broken.shutdown_calls == [{"wait": False, "cancel_futures": True}]
+    assert scrape_data.get_parse_pool() == "replacement"
@@ -0,0 +1,89 @@
+import warnings
+
+import pandas as pd
+import pytest
+
+from yards.utils.postprocess import postprocess_csv, postprocess_frame, slugify, to_grams, to_price
+
+
+def series(*values):
+    return pd.Series(list(values), dtype=object)
+
+
+def test_to_price_takes_the_first_number():
+    prices = to_price(series("Rs. 1,299.00", "$25 - $30", "₹499", "-5", "N/A", ""))
+    assert prices.tolist()[:4] == [1299.0, 25.0, 499.0, -5.0]
+    assert prices.iloc[4:].isna().all()
+
+
+def test_to_grams_converts_units():
+    grams = to_grams(series("500", "0.5 kg", "1.2lb", "16 oz", "12 stone", "heavy", ""))
+    assert grams.tolist()[:4] == [500.0, 500.0, 544.0, 454.0]
+    assert grams.iloc[4:].isna().all()
+
+
+def test_slugify_matches_make_handle():
+    assert slugify(series(" SG Bat (Youth) ", "")).tolist() == ["sg-bat-youth", ""]
+
+
+def catalog(rows):
+    return pd.DataFrame(rows).fillna("")
+
+
+def test_postprocess_frame_regroups_dedupes_and_rejects():
+    df = catalog([
+        {"Title": "SG Pad", "Handle": "protective-gear", "Option1 Name": "Size", "Option1 Value": "Youth",
+         "Variant Price": "Rs. 299", "Variant Grams": "0.1 kg", "Body (HTML)": "<p>Pad</p>"},
+        {"Title": "SG Pad", "Handle": "", "Option1 Name": "Size", "Option1 Value": "Mens", "Variant Price": "349"},
+        {"Title": "SG Pad", "Handle": "", "Option1 Name": "Size", "Option1 Value": "youth", "Variant Price": "299"},
+        {"Title": "SG Bat", "Handle": "", "Variant Price": "free"},
+        {"Title": "SG Ball", "Handle": "", "Variant Price": "450"},
+    ])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        clean, rejects = postprocess_frame(df)
+
+    assert clean["Handle"].tolist() == ["protective-gear", "protective-gear", "sg-ball"]
+    assert clean["Option1 Value"].tolist() == ["Youth", "Mens", "Default Title"]
+    assert clean["Variant Grams"].iloc[0] == 100
+    assert clean["Variant Grams"].iloc[1:].isna().all()
+    assert clean["Variant Weight Unit"].iloc[0] == "g"
+    # Product-level fields are repeated on every variant row
+    assert clean["Body (HTML)"].tolist()[:2] == ["<p>Pad</p>", "<p>Pad</p>"]
+    assert sorted(rejects["Reject Reason"]) == ["duplicate variant", "invalid Variant Price"]
+    # Rejects keep the row as it was written
+    assert "free" in rejects["Variant Price"].tolist()
+
+
+def test_compare_at_price_only_kept_above_price():
+    df = catalog([
+        {"Title": "A", "Variant Price": "100", "Variant Compare At Price": "120"},
+        {"Title": "B", "Variant Price": "100", "Variant Compare At Price": "90"},
+    ])
+    clean, _ = postprocess_frame(df)
+    assert clean["Variant Compare At Price"].iloc[0] == 120.0
+    assert pd.isna(clean["Variant Compare At Price"].iloc[1])
+
+
+def test_postprocess_csv_writes_clean_file_and_rejects(tmp_path):
+    output_file = tmp_path / "catalog.csv"
+    catalog([
+        {"Title": "SG Ball", "Variant Price": "450"},
+        {"Title": "", "Variant Price": "10"},
+    ]).to_csv(output_file, index=False)
+
+    report = postprocess_csv(str(output_file))
+
+    assert (report["rows_in"], report["rows_out"], report["rejected"]) == (2, 1, 1)
+    # A row without a title has nothing to derive a handle from
+    assert report["reasons"] == {"missing Handle": 1}
+    written = pd.read_csv(output_file, dtype=str, keep_default_na=False)
+    assert written["Variant Price"].tolist() == ["450.00"]
+    assert pd.read_csv(report["rejects_file"])["Reject Reason"].tolist() == ["missing Handle"]
+
+
+@pytest.mark.parametrize("price", ["-5", "abc"])
+def test_invalid_prices_are_rejected(price):
+    _, rejects = postprocess_frame(catalog([{"Title": "A", "Variant Price": price}]))
+    assert rejects["Reject Reason"].tolist() == ["invalid Variant Price"]
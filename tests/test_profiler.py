@@ -0,0 +1,28 @@
+import asyncio
+import os
+
+from yards.utils.profiler import CURRENT_PROFILER, JobProfiler, finish_job_profile
+
+
+def test_finish_job_profile_writes_once_before_the_job_exits(tmp_path):
+    output_file = str(tmp_path / "catalog.csv")
+
+    async def run():
+        profiler = JobProfiler("job-1", interval=0.001)
+        CURRENT_PROFILER.set(profiler)
+        async with profiler:
+            await asyncio.sleep(0.01)
+            path = await finish_job_profile(output_file)
+            assert os.path.exists(path)
+            assert await finish_job_profile(output_file) == path
+        return path
+
+    assert asyncio.run(run()) == str(tmp_path / "catalog.profile.folded")
+
+
+def test_finish_job_profile_without_profiler():
+    async def run():
+        CURRENT_PROFILER.set(None)
+        return await finish_job_profile("catalog.csv")
+
+    assert asyncio.run(run()) is None
@@ -0,0 +1,32 @@
+import re
+
+from yards.utils import prompts
+from yards.utils.prompts import CHARS_PER_TOKEN, MIN_CHUNK_TOKENS, chunk_budget_tokens, split_to_budget
+
+
+class WordEncoding:
+    """Stand-in for a tiktoken encoding: one token per word (with its leading space)."""
+
+    def encode(self, text, disallowed_special=()):
+        return re.findall(r"\s*\S+", text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+def test_split_cuts_on_token_boundaries_with_tiktoken(monkeypatch):
+    monkeypatch.setattr(prompts, "_encoding", lambda: WordEncoding())
+    text = " ".join(f"word{i}" for i in range(MIN_CHUNK_TOKENS * 2 + 10))
+
+    chunks = split_to_budget(text, "system", budget=0, reserve=0)
+
+    assert "".join(chunks) == text
+    assert [len(WordEncoding().encode(chunk)) for chunk in chunks] == [MIN_CHUNK_TOKENS, MIN_CHUNK_TOKENS, 10]
+
+
+def test_split_falls_back_to_char_estimate(monkeypatch):
+    monkeypatch.setattr(prompts, "_encoding", lambda: None)
+    size = chunk_budget_tokens("system") * CHARS_PER_TOKEN
+    text = "x" * (size + 5)
+
+    assert [len(chunk) for chunk in split_to_budget(text, "system")] == [size, 5]
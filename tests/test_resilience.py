@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+from yards.utils.resilience import CircuitBreaker, CircuitOpen, domain_of, percentile
+
+SETTINGS = {"min_timeout": 0.05, "max_timeout": 1.0, "failure_threshold": 3, "reset_seconds": 30, "hedge": True}
+
+
+def breaker(**overrides):
+    return CircuitBreaker("http", "example.com", settings={**SETTINGS, **overrides})
+
+
+async def fail():
+    raise ConnectionError("down")
+
+
+async def succeed():
+    return "ok"
+
+
+def elapse_reset(b):
+    b.opened_at -= b.settings["reset_seconds"]
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    b = breaker()
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            asyncio.run(b.call(fail))
+    assert b.opened_at is not None
+
+    with pytest.raises(CircuitOpen) as error:
+        asyncio.run(b.call(succeed))
+    assert 0 < error.value.retry_in <= 30
+
+
+def test_success_resets_the_failure_count():
+    b = breaker()
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            asyncio.run(b.call(fail))
+    assert asyncio.run(b.call(succeed)) == "ok"
+    with pytest.raises(ConnectionError):
+        asyncio.run(b.call(fail))
+    assert b.opened_at is None and b.failures == 1
+
+
+def test_half_open_probe_closes_or_reopens():
+    b = breaker(failure_threshold=1)
+    with pytest.raises(ConnectionError):
+        asyncio.run(b.call(fail))
+
+    # A failed probe re-opens at once
+    elapse_reset(b)
+    with pytest.raises(ConnectionError):
+        asyncio.run(b.call(fail))
+    assert b.retry_in() > 0
+
+    # A successful probe closes it
+    elapse_reset(b)
+    assert asyncio.run(b.call(succeed)) == "ok"
+    assert b.opened_at is None and b.retry_in() == 0
+
+
+def test_only_one_probe_at_a_time():
+    b = breaker(failure_threshold=1)
+    b.record_failure()
+    elapse_reset(b)
+    assert b.before_call() is True
+    with pytest.raises(CircuitOpen):
+        b.before_call()
+
+
+def test_late_failure_from_before_the_open_does_not_end_the_probe():
+    b = breaker(failure_threshold=1)
+    b.record_failure()
+    elapse_reset(b)
+    opened_at = b.opened_at
+    probe = b.before_call()
+
+    # A call admitted while the circuit was still closed fails after the probe started
+    b.record_failure()
+    assert b.probing and b.opened_at == opened_at
+    with pytest.raises(CircuitOpen):
+        b.before_call()
+
+    # The probe's own failure re-opens the circuit
+    b.record_failure(probe=probe)
+    assert not b.probing and b.opened_at > opened_at
+
+
+async def not_found():
+    raise ValueError("404")
+
+
+def test_results_and_exceptions_can_be_excluded_or_flagged():
+    b = breaker(failure_threshold=1)
+    with pytest.raises(ValueError):
+        asyncio.run(b.call(not_found, trips_on=lambda e: not isinstance(e, ValueError)))
+    assert b.opened_at is None
+
+    asyncio.run(b.call(succeed, is_failure=lambda result: result == "ok"))
+    assert b.opened_at is not None
+
+
+def test_timeout_adapts_to_recent_latency():
+    b = breaker()
+    assert b.timeout() == 1.0
+    assert b.timeout(ceiling=0.5) == 0.5
+    for _ in range(20):
+        b.record_success(0.1)
+    assert b.timeout() == pytest.approx(0.2)
+
+    # Never below min_timeout, however fast the dependency has been
+    fast = breaker()
+    for _ in range(20):
+        fast.record_success(0.001)
+    assert fast.timeout() == 0.05
+
+
+def test_slow_call_times_out_and_counts_as_failure():
+    b = breaker(max_timeout=0.05)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(b.call(slow))
+    assert b.failures == 1
+
+
+def test_hedged_request_wins_when_first_attempt_stalls():
+    b = breaker()
+    for _ in range(20):
+        b.record_success(0.01)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            await asyncio.sleep(0.5)
+            return "slow"
+        return "hedged"
+
+    assert asyncio.run(b.call(flaky)) == "hedged"
+    assert len(attempts) == 2
+
+
+def test_helpers():
+    assert percentile([5, 1, 3, 2, 4], 0.5) == 3
+    assert percentile([1, 2, 3], 0.99) == 3
+    assert domain_of("https://WWW.Example.com/products/x") == "example.com"
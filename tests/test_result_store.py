@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import time
+
+from yards.utils.config import PIPELINE_VERSION
+from yards.utils.result_store import ResultStore, prompt_version, row_fingerprint, rows_complete
+
+COMPLETE = [{"Title": "SG Pad", "Body (HTML)": "<p>Pad</p>", "Image Src": "a.jpg", "Variant Price": "299"},
+            {"Title": "SG Pad", "Variant Price": "349"}]
+
+
+def make_store(tmp_path, **kwargs):
+    return ResultStore(str(tmp_path / "results.sqlite3"), **kwargs)
+
+
+def test_rows_complete():
+    assert rows_complete(COMPLETE)
+    assert not rows_complete([])
+    assert not rows_complete([{"Title": "SG Pad", "Variant Price": "299"}])
+    assert not rows_complete([*COMPLETE, {"Title": "SG Pad", "Variant Price": ""}])
+
+
+def test_row_fingerprint_ignores_title_case_and_spacing():
+    assert row_fingerprint({"Title": "SG  Pad ", "SKU Code": "1"}) == row_fingerprint({"Title": "sg pad", "SKU Code": 1})
+    assert row_fingerprint({"Title": "SG Pad", "SKU Code": "1"}) != row_fingerprint({"Title": "SG Pad", "SKU Code": "2"})
+
+
+def test_only_complete_fresh_rows_are_reused(tmp_path):
+    store = make_store(tmp_path)
+    assert store.put_rows("good", "SG Pad", COMPLETE)
+    assert not store.put_rows("thin", "SG Bat", [{"Title": "SG Bat", "Variant Price": "100"}])
+    assert store.get_rows(["good", "thin", "missing"]) == {"good": COMPLETE}
+
+    store.row_ttl = -1
+    assert store.get_rows(["good"]) == {}
+
+
+def test_catalog_is_kept_under_its_hash_and_expires(tmp_path):
+    store = make_store(tmp_path)
+    output_file = tmp_path / "catalog.csv"
+    output_file.write_text("Handle\nsg-pad\n")
+
+    stored = store.put("abc", "upload.csv", str(output_file))
+    output_file.write_text("Handle\nother-upload\n")
+    assert store.get("abc") == stored
+    assert open(stored).read() == "Handle\nsg-pad\n"
+
+    store.row_ttl = -1
+    assert store.get("abc") is None
+
+
+def test_missing_catalog_file_is_a_miss(tmp_path):
+    store = make_store(tmp_path)
+    output_file = tmp_path / "catalog.csv"
+    output_file.write_text("Handle\n")
+    os.remove(store.put("abc", "upload.csv", str(output_file)))
+    assert store.get("abc") is None
+
+
+def test_incomplete_catalog_is_never_served(tmp_path):
+    store = make_store(tmp_path)
+    output_file = tmp_path / "catalog.csv"
+    output_file.write_text("Handle\n")
+    store.put("abc", "upload.csv", str(output_file))
+    store.put("abc", "upload.csv", str(output_file), complete=False)
+    assert store.get("abc") is None
+
+
+def test_results_from_before_completeness_flags_are_not_reused(tmp_path):
+    path = tmp_path / "results.sqlite3"
+    output_file = tmp_path / "catalog.csv"
+    output_file.write_text("Handle\n")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE catalog_results (file_hash TEXT, pipeline_version TEXT, prompt_version TEXT, "
+                 "source_file TEXT, output_file TEXT, created_at REAL, "
+                 "PRIMARY KEY (file_hash, pipeline_version, prompt_version))")
+    conn.execute("INSERT INTO catalog_results VALUES (?, ?, ?, ?, ?, ?)",
+                 ("old", PIPELINE_VERSION, prompt_version(), "upload.csv", str(output_file), time.time()))
+    conn.commit()
+    conn.close()
+
+    assert ResultStore(str(path)).get("old") is None
@@ -0,0 +1,36 @@
+import threading
+
+from yards.utils.site_adapters import _jsonld_products, load_jsonld, parse_tree
+
+
+def test_load_jsonld_tolerates_comment_wrappers_and_raw_control_characters():
+    assert load_jsonld('<!--\n{"@type": "Product", "name": "SG\nBat", "sku": "a\tb"}\n-->') == {
+        "@type": "Product", "name": "SG\nBat", "sku": "a\tb"}
+    assert load_jsonld('//<![CDATA[\n{"url": "https://shop.com/x",}\n//]]>') == {"url": "https://shop.com/x"}
+
+
+def test_jsonld_products_walks_graphs_and_skips_broken_blocks():
+    blocks = [
+        "not json",
+        '{"@graph": [{"@type": "Organization"}, {"@type": ["Product", "Thing"], "name": "SG Pad"}]}',
+        '[{"@type": "Product", "name": "SG Bat"}]',
+    ]
+    assert [product["name"] for product in _jsonld_products(blocks)] == ["SG Pad", "SG Bat"]
+
+
+def test_parse_tree_from_many_threads():
+    errors = []
+
+    def parse():
+        try:
+            for _ in range(100):
+                assert parse_tree("<html><body><h1>SG Bat</h1></body></html>").findtext(".//h1") == "SG Bat"
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=parse) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
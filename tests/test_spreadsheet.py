@@ -0,0 +1,49 @@
+import asyncio
+
+from openpyxl import Workbook
+
+from yards.utils import spreadsheet
+from yards.utils.spreadsheet import aiter_row_batches, iter_row_batches
+
+
+def write_xlsx(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Title", "Vendor", "Notes"])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def test_xlsx_batches_keep_only_requested_columns(tmp_path):
+    path = str(tmp_path / "catalog.xlsx")
+    write_xlsx(path, [["Bat", "SG", "x"], ["Pad", "SG", "y"], ["Ball", None, "z"]])
+
+    batches = list(iter_row_batches(path, ["Title", "Vendor"], batch_size=2))
+
+    assert batches == [[{"Title": "Bat", "Vendor": "SG"}, {"Title": "Pad", "Vendor": "SG"}],
+                       [{"Title": "Ball", "Vendor": None}]]
+
+
+def test_stopping_early_closes_the_reader(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.csv")
+    rows = "Title,Vendor\n" + "".join(f"Item {i},SG\n" for i in range(10))
+    (tmp_path / "catalog.csv").write_text(rows)
+    closed = []
+
+    def tracked(*args):
+        try:
+            yield from iter_row_batches(*args)
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(spreadsheet, "iter_row_batches", tracked)
+
+    async def first_batch():
+        batches = aiter_row_batches(path, ["Title"], batch_size=3)
+        batch = await batches.__anext__()
+        await batches.aclose()
+        return batch
+
+    assert [row["Title"] for row in asyncio.run(first_batch())] == ["Item 0", "Item 1", "Item 2"]
+    assert closed == [True]
@@ -0,0 +1,74 @@
+import pytest
+
+from yards.utils.variants import apply_product_copy, body_html, expand_variants, make_handle
+
+SCRAPED = {
+    "Handle": "protective-gear",
+    "Title": "Protective Gear",
+    "Body (HTML)": "<p>Moulded abdominal guard.</p>",
+    "Image Src": ["https://cdn.example.com/pad.jpg", "not-a-url"],
+    "Options": ["Size"],
+    "Variants": [
+        {"Option1": "Youth", "Variant SKU": "AP-Y", "Variant Price": "299", "Variant Grams": 60},
+        {"Option1": "Mens", "Variant SKU": "AP-M", "Variant Price": "349"},
+        {"Option1": "Youth", "Variant SKU": "AP-Y2", "Variant Price": "299"},
+    ],
+}
+
+
+@pytest.mark.parametrize("description, expected", [
+    ("Moulded  abdominal\nguard.", "<p>Moulded abdominal guard.</p>"),
+    ("<p>Moulded abdominal guard.</p>", "<p>Moulded abdominal guard.</p>"),
+    ("<p><p>Moulded abdominal guard.</p></p>", "<p>Moulded abdominal guard.</p>"),
+    ("<p> <ul><li>Youth</li></ul> </p>", "<ul><li>Youth</li></ul>"),
+    ("<p>One</p><p>Two</p>", "<p>One</p><p>Two</p>"),
+    ("<strong>Light</strong> and strong", "<p><strong>Light</strong> and strong</p>"),
+    ("", ""),
+    (None, ""),
+])
+def test_body_html(description, expected):
+    assert body_html(description) == expected
+
+
+def test_make_handle():
+    assert make_handle("Abdominal Pad SG TOURNAMENT (Youth)") == "abdominal-pad-sg-tournament-youth"
+
+
+def test_catalog_title_wins_over_scraped_title():
+    rows = expand_variants(SCRAPED, "Abdominal Pad SG TOURNAMENT Youth")
+    assert {row["Title"] for row in rows} == {"Abdominal Pad SG TOURNAMENT Youth"}
+    assert {row["Handle"] for row in rows} == {"abdominal-pad-sg-tournament-youth"}
+
+
+def test_scraped_title_used_when_catalog_title_is_blank():
+    rows = expand_variants(SCRAPED, "  ")
+    assert rows[0]["Title"] == "Protective Gear"
+    assert rows[0]["Handle"] == "protective-gear"
+
+
+def test_one_row_per_distinct_variant():
+    rows = expand_variants(SCRAPED, "Abdominal Pad")
+    assert [(row["Option1 Name"], row["Option1 Value"], row["Variant SKU"]) for row in rows] == [
+        ("Size", "Youth", "AP-Y"), ("Size", "Mens", "AP-M"),
+    ]
+    assert rows[0]["Variant Weight Unit"] == "g" and rows[1]["Variant Weight Unit"] == ""
+    assert rows[0]["Image Src"] == ["https://cdn.example.com/pad.jpg"]
+    assert rows[0]["Published"] == "TRUE"
+
+
+def test_product_without_variants_is_default_title():
+    rows = expand_variants({"Title": "SG Bat", "Variant Price": "100"}, "SG Bat")
+    assert len(rows) == 1
+    assert (rows[0]["Option1 Name"], rows[0]["Option1 Value"]) == ("Title", "Default Title")
+
+
+def test_public_title_is_split_into_options():
+    product = {"Options": ["Size", "Colour"], "Variants": [{"Size": "SH / White"}, {"Size": "LH / White"}]}
+    rows = expand_variants(product, "SG Gloves")
+    assert [(row["Option1 Value"], row["Option2 Value"]) for row in rows] == [("SH", "White"), ("LH", "White")]
+
+
+def test_apply_product_copy_normalizes_body():
+    rows = apply_product_copy(expand_variants(SCRAPED, "Pad"), {"Body (HTML)": "<p><p>New copy</p></p>", "Bogus": "x"})
+    assert {row["Body (HTML)"] for row in rows} == {"<p>New copy</p>"}
+    assert "Bogus" not in rows[0]